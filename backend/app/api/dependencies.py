@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from sqlalchemy.orm import Session
@@ -6,29 +6,63 @@ from ..core.config import settings
 from ..db import session as db_session
 from ..services import admin_service
 from ..db.models.admin import Admin, AdminRole
+from ..db.schemas.admin import LinkScope
+from typing import Optional
 
 # This tells FastAPI where to look for the token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/verify-otp")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/verify-otp", auto_error=False)
 
-def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = Depends(db_session.get_db)) -> Admin:
+def get_current_admin(token: str = Depends(oauth2_scheme), db: Session = Depends(db_session.get_db)) -> admin_service.CachedAdmin:
     """
-    Decodes the JWT token, verifies the user, and returns the Admin object.
+    Decodes the JWT token, verifies the user, and returns a cached snapshot
+    of the admin (id, email, role, is_active). The session is only used on
+    a cache miss.
+    """
+    return authenticate_token(token, db)
+
+def get_current_admin_from_link(scope: LinkScope):
+    """
+    Builds a dependency like get_current_admin that also accepts a `token`
+    query parameter, for plain links (e.g. receipt images) and EventSource,
+    which cannot set headers. The query parameter only takes a short-lived
+    link token for `scope` (POST /auth/link-token), never the access token
+    itself, so URLs that end up in logs and browser history expire quickly.
+    The session is closed before the response starts, so long downloads and
+    event streams do not hold a database connection.
+    """
+    def dependency(
+        header_token: Optional[str] = Depends(optional_oauth2_scheme),
+        token: Optional[str] = Query(None, description=f"Link token for {scope.value} (POST /auth/link-token)."),
+        db: Session = Depends(db_session.get_db, scope="function"),
+    ) -> admin_service.CachedAdmin:
+        if header_token:
+            return authenticate_token(header_token, db)
+        return authenticate_token(token, db, scope=scope.value)
+    return dependency
+
+def authenticate_token(token: Optional[str], db: Session, scope: Optional[str] = None) -> admin_service.CachedAdmin:
+    """
+    Resolves a JWT to its (active) admin, or raises 401. Access tokens carry
+    no scope; link tokens are only accepted for their own `scope`.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    if not token:
+        raise credentials_exception
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        if email is None or payload.get("scope") != scope:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    admin = admin_service.get_admin_by_email(db, email=email)
-    if admin is None:
+    admin = admin_service.get_authenticated_admin(db, email=email)
+    if admin is None or not admin.is_active:
         raise credentials_exception
     return admin
 
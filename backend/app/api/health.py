@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from functools import lru_cache
+from pathlib import Path
+from ..db.session import get_db
+
+router = APIRouter()
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+@lru_cache(maxsize=1)
+def expected_schema_revision() -> str | None:
+    """The newest migration shipped with this build (None if migrations are not shipped)."""
+    if not ALEMBIC_INI.exists():
+        return None
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+@router.get("/health")
+def health():
+    """Liveness: the process is up and serving requests. No dependencies are checked."""
+    return {"status": "ok"}
+
+@router.get("/ready")
+def ready(db: Session = Depends(get_db)):
+    """
+    Readiness: the database is reachable and migrated to the revision this
+    build expects. Returns 503 until both hold.
+    """
+    try:
+        revision = db.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except Exception:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "detail": "Database unreachable or not migrated"})
+
+    expected = expected_schema_revision()
+    if expected is not None and revision != expected:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "detail": f"Schema at {revision}, expected {expected}"},
+        )
+    return {"status": "ready", "schema_revision": revision}
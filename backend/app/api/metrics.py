@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
+from ..core.config import settings
+from ..core import metrics
+import hmac, ipaddress
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_allowed_networks = [ipaddress.ip_network(item.strip(), strict=False) for item in settings.METRICS_ALLOW_IPS.split(",") if item.strip()]
+
+def _client_allowed(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in _allowed_networks)
+
+def require_scraper(request: Request):
+    """
+    Lets through clients from METRICS_ALLOW_IPS (the real client address,
+    see FORWARDED_ALLOW_IPS) and requests carrying METRICS_TOKEN. Others get
+    a 404, as if the endpoint did not exist.
+    """
+    if request.client and _client_allowed(request.client.host):
+        return
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if settings.METRICS_TOKEN and scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return
+    raise HTTPException(status_code=404, detail="Not Found")
+
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_scraper)])
+def prometheus_metrics():
+    """Prometheus scrape endpoint for this worker (see core/metrics.py)."""
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
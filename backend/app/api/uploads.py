@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, Response
+from mimetypes import guess_type
+from typing import Optional
+from ..core.config import settings
+from ..services import receipt_storage
+from ..db.schemas.admin import LinkScope
+from .dependencies import get_current_admin_from_link
+import os, re
+
+# Receipt delivery
+# ----------------
+# Stored receipts are named after their SHA-256, so their bytes never change:
+# they get a strong ETag derived from the hash and `immutable` caching, and
+# browsers revalidate nothing. Derived images and legacy (pre-sharding)
+# files can be replaced, so they get a short max-age and mtime-based ETags.
+#
+# By default the app streams files itself (with Range support). With
+# UPLOADS_X_ACCEL_PREFIX set, it only checks the request and answers with an
+# X-Accel-Redirect so nginx sends the bytes, e.g.:
+#
+#     location /_protected_uploads/ {
+#         internal;
+#         alias /app/uploads/;
+#     }
+#
+# and UPLOADS_X_ACCEL_PREFIX=/_protected_uploads/. With
+# UPLOADS_REQUIRE_AUTH=true, every file needs an admin access token in the
+# Authorization header or an "uploads" link token as ?token= (see
+# POST /auth/link-token), and responses are only cacheable by the browser.
+
+router = APIRouter()
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+MUTABLE_MAX_AGE = 3600
+
+_content_addressed_re = re.compile(r"^([0-9a-f]{64})(\.[a-z0-9]{1,10})?$")
+
+def _resolve(path: str) -> tuple[str, str]:
+    """Returns (relative path, absolute path) for a request path, or 404."""
+    relpath = os.path.normpath(path)
+    if relpath.startswith("..") or os.path.isabs(relpath) or os.path.basename(relpath).startswith("."):
+        raise HTTPException(status_code=404, detail="Not Found")
+    full_path = os.path.join(receipt_storage.UPLOAD_DIRECTORY, relpath)
+    if not os.path.isfile(full_path):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return relpath, full_path
+
+def _cache_headers(relpath: str, stat_result: os.stat_result) -> dict:
+    scope = "private" if settings.UPLOADS_REQUIRE_AUTH else "public"
+    match = _content_addressed_re.match(os.path.basename(relpath))
+    if match:
+        etag = f'"{match.group(1)}"'
+        cache_control = f"{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        cache_control = f"{scope}, max-age={MUTABLE_MAX_AGE}"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+_auth = [Depends(get_current_admin_from_link(LinkScope.uploads))] if settings.UPLOADS_REQUIRE_AUTH else []
+
+@router.api_route("/{path:path}", methods=["GET", "HEAD"], dependencies=_auth, include_in_schema=False)
+def serve_upload(path: str, request: Request):
+    relpath, full_path = _resolve(path)
+    stat_result = os.stat(full_path)
+    headers = _cache_headers(relpath, stat_result)
+
+    if _not_modified(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    media_type: Optional[str] = guess_type(full_path)[0] or "application/octet-stream"
+    if settings.UPLOADS_X_ACCEL_PREFIX:
+        # nginx serves the body (and Range requests) from its internal location
+        headers["X-Accel-Redirect"] = settings.UPLOADS_X_ACCEL_PREFIX.rstrip("/") + "/" + relpath.replace(os.sep, "/")
+        return Response(headers=headers, media_type=media_type)
+
+    return FileResponse(full_path, headers=headers, media_type=media_type, stat_result=stat_result)
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from ....db.session import get_db
 from ....services import admin_service
+from ....core.admission import submission_admission
 from ....db.schemas.admin import Admin, AdminCreate
 from ...dependencies import require_global_admin
 
@@ -27,4 +28,37 @@ def create_new_admin(
     
     return admin_service.create_admin(db=db, admin=admin_in)
 
+@router.post("/{admin_id}/deactivate", response_model=Admin)
+def deactivate_admin(
+    admin_id: int,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(require_global_admin)
+):
+    """
+    Deactivate an admin. Their tokens are rejected from the next request on.
+    Only accessible by global admins.
+    """
+    if admin_id == current_admin.id:
+        raise HTTPException(status_code=400, detail="You cannot deactivate yourself.")
+    admin = admin_service.deactivate_admin(db, admin_id=admin_id)
+    if admin is None:
+        raise HTTPException(status_code=404, detail="Admin not found.")
+    return admin
+
+@router.get("/cache-stats")
+def admin_cache_stats(current_admin: Admin = Depends(require_global_admin)):
+    """
+    Hit/miss counters of this worker's authenticated-admin cache. Misses are
+    the requests that needed a database lookup.
+    """
+    return admin_service.admin_cache_stats()
+
+@router.get("/admission-stats")
+def admission_stats(current_admin: Admin = Depends(require_global_admin)):
+    """
+    In-flight submissions and rejection counters of this worker's
+    admission control.
+    """
+    return submission_admission.stats()
+
 # You can add other admin management endpoints here, e.g., for listing or deleting admins.
@@ -1,9 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
-from ....db.schemas.admin import OTPRequest, OTPVerify, Token
-from ....core.security import generate_otp, store_otp, send_otp_email, verify_otp, create_access_token
+from ....db.schemas.admin import OTPRequest, OTPVerify, Token, LinkScope, LinkToken
+from ....core.security import generate_otp, store_otp, send_otp_email, verify_otp, create_access_token, create_link_token
+from ....core.config import settings
 from ....services import admin_service 
 from ....db.session import get_db 
+from ...dependencies import get_current_admin
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -16,7 +21,7 @@ def request_otp(otp_request: OTPRequest, db: Session = Depends(get_db)):
 
     if not admin or not admin.is_active:
         # Note: We don't reveal if the user exists for security reasons.
-        print(f"Login attempt for non-existent or inactive admin: {otp_request.email}")
+        logger.info("Login attempt for non-existent or inactive admin", extra={"email": otp_request.email})
         return {"message": "If an account with this email exists, an OTP has been sent."}
 
     otp = generate_otp()
@@ -42,3 +47,17 @@ def verify_otp_and_login(otp_verify: OTPVerify, db: Session = Depends(get_db)):
     access_token = create_access_token(data={"sub": admin.email, "role": admin.role.value})
     
     return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.post("/link-token", response_model=LinkToken)
+def issue_link_token(scope: LinkScope, current_admin = Depends(get_current_admin)):
+    """
+    Issues a short-lived token for URLs that cannot carry the Authorization
+    header (?token= on the dashboard stream or receipt links). It only works
+    for `scope` and expires after LINK_TOKEN_EXPIRE_SECONDS.
+    """
+    return {
+        "token": create_link_token(current_admin.email, scope.value),
+        "scope": scope,
+        "expires_in": settings.LINK_TOKEN_EXPIRE_SECONDS,
+    }
@@ -1,17 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from ....db.session import get_db
-from ....services import dashboard_service
+from ....db.session import get_db, get_read_db
+from ....services import dashboard_service, dashboard_feed, submission_service, winner_selection
+from ....core.config import settings
 from ....db.schemas.dashboard import DashboardStats
 from ....db.schemas.submission import Submission # Import the Submission schema for the response
-from ...dependencies import get_current_admin
+from ....db.schemas.draw import Draw, DrawRequest, DrawWithWinners, DrawVerification
+from ...dependencies import get_current_admin, get_current_admin_from_link
 from ....db.models.admin import Admin
+from ....db.schemas.admin import LinkScope
 
 router = APIRouter()
 
 @router.get("/stats", response_model=DashboardStats)
 def handle_get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_admin: Admin = Depends(get_current_admin) # Protects the endpoint
 ):
     """
@@ -20,6 +24,21 @@ def handle_get_dashboard_stats(
     stats = dashboard_service.get_dashboard_stats(db)
     return stats
 
+@router.get("/stream")
+def handle_dashboard_stream(current_admin: Admin = Depends(get_current_admin_from_link(LinkScope.dashboard_stream))):
+    """
+    Protected Server-Sent Events feed of the dashboard: a "stats" snapshot
+    on connect, then "delta" events (per-emirate increments, the new totals
+    and recent entries) as submissions arrive. Takes a dashboard_stream link
+    token as a query parameter, since EventSource cannot set headers.
+    """
+    return StreamingResponse(
+        dashboard_feed.hub.stream(settings.DASHBOARD_STREAM_MAX_SECONDS),
+        media_type="text/event-stream",
+        # X-Accel-Buffering: nginx would otherwise hold events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/generate-winner", response_model=Submission)
 def handle_generate_winner(
     db: Session = Depends(get_db),
@@ -28,10 +47,76 @@ def handle_generate_winner(
     """
     Protected endpoint to select and return a single random winner.
     """
-    winner = dashboard_service.select_random_winner(db)
+    winner = dashboard_service.select_random_winner(db, drawn_by=current_admin.email)
     if not winner:
         raise HTTPException(
             status_code=404,
             detail="No submissions found to select a winner from.",
         )
-    return winner
+    return submission_service.submission_payloads([winner])[0]
+
+def _draw_response(db: Session, draw) -> DrawWithWinners:
+    return DrawWithWinners(
+        **Draw.model_validate(draw).model_dump(),
+        winners=submission_service.submission_payloads(winner_selection.get_winners(db, draw)),
+    )
+
+@router.post("/draws", response_model=DrawWithWinners, status_code=201)
+def handle_create_draw(
+    draw_in: DrawRequest,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin) # Protects the endpoint
+):
+    """
+    Protected endpoint to draw one or more winners without replacement,
+    optionally per emirate. The seed is recorded so the draw can be audited.
+    """
+    try:
+        draw = winner_selection.draw_winners(
+            db,
+            k=draw_in.winners,
+            per_emirate=draw_in.per_emirate,
+            emirate=draw_in.emirate,
+            seed=draw_in.seed,
+            drawn_by=current_admin.email,
+        )
+    except winner_selection.DrawError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return _draw_response(db, draw)
+
+@router.get("/draws/{draw_id}", response_model=DrawWithWinners)
+def handle_get_draw(
+    draw_id: int,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin) # Protects the endpoint
+):
+    """
+    Protected endpoint to retrieve a recorded draw and its winners.
+    """
+    draw = winner_selection.get_draw(db, draw_id)
+    if not draw:
+        raise HTTPException(status_code=404, detail="Draw not found.")
+    return _draw_response(db, draw)
+
+@router.get("/draws/{draw_id}/verify", response_model=DrawVerification)
+def handle_verify_draw(
+    draw_id: int,
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(get_current_admin) # Protects the endpoint
+):
+    """
+    Protected endpoint that replays a recorded draw from its seed and
+    reports whether it yields the same winners, and whether the rows it
+    chose from are unchanged.
+    """
+    draw = winner_selection.get_draw(db, draw_id)
+    if not draw:
+        raise HTTPException(status_code=404, detail="Draw not found.")
+    replayed = winner_selection.replay_draw(db, draw)
+    return DrawVerification(
+        draw_id=draw.id,
+        reproducible=replayed == draw.winner_ids,
+        recorded_winner_ids=draw.winner_ids,
+        replayed_winner_ids=replayed,
+        eligible_unchanged=winner_selection.eligible_unchanged(db, draw),
+    )
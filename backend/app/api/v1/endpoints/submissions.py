@@ -1,59 +1,219 @@
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from ....db.session import get_db
-from ....services import submission_service
-from ....db.schemas.submission import Submission, SubmissionCreate, SubmissionOut
-from ...dependencies import get_current_admin
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import datetime, timezone
+from enum import Enum
+import io
+from ....db.session import get_db, get_read_db, get_async_db
+from ....services import submission_service, export_service, ingest_service, receipt_similarity
+from ....db.schemas.submission import Submission, SubmissionCreate, SubmissionOut, IngestResult, DuplicateCluster
+from ...dependencies import get_current_admin, require_global_admin
 from ....db.models.admin import Admin
 from ....core.config import settings
+from ....core.responses import FastJSONResponse
 from app.services import submission_service
 from app.core.config import settings
 
 router = APIRouter()
 
-@router.post("/", response_model=SubmissionOut, status_code=201)
-def handle_create_submission(
-    name: str = Form(...),
-    email: str = Form(...),
-    mobile: str = Form(...),
-    emirates_id: str = Form(...),
-    emirate: str = Form(...),
-    receipt: UploadFile = File(...),
-    db: Session = Depends(get_db),
-):
-    submission_in = SubmissionCreate(
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+
+INGEST_MAX_REPORTED_ERRORS = 1000
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv",
+    ExportFormat.ndjson: "application/x-ndjson",
+}
+
+def _build_submission(name: str, email: str, mobile: str, emirates_id: str, emirate: str) -> SubmissionCreate:
+    return SubmissionCreate(
         name=name, email=email, mobile=mobile, emirates_id=emirates_id, emirate=emirate
     )
 
-    if settings.ENFORCE_UNIQUE_EMAIL and submission_service.get_submission_by_email(db, email=submission_in.email):
-        raise HTTPException(status_code=400, detail="A submission with this email already exists.")
-    if settings.ENFORCE_UNIQUE_MOBILE and submission_service.get_submission_by_mobile(db, mobile=submission_in.mobile):
-        raise HTTPException(status_code=400, detail="A submission with this mobile number already exists.")
+if settings.USE_ASYNC_DB:
+    @router.post("/", response_model=SubmissionOut, status_code=201)
+    async def handle_create_submission(
+        name: str = Form(...),
+        email: str = Form(...),
+        mobile: str = Form(...),
+        emirates_id: str = Form(...),
+        emirate: str = Form(...),
+        receipt: UploadFile = File(...),
+        db: AsyncSession = Depends(get_async_db),
+    ):
+        submission_in = _build_submission(name, email, mobile, emirates_id, emirate)
 
-    receipt_url, receipt_hash = submission_service.save_receipt_file(receipt)
+        try:
+            # Before the receipt is stored, so a duplicate leaves nothing on disk
+            await submission_service.ensure_unique_async(db, submission_in)
+            receipt_url, receipt_hash = await submission_service.save_receipt_file_async(receipt, db=db)
+            return await submission_service.create_submission_async(
+                db=db,
+                submission=submission_in,
+                receipt_url=receipt_url,
+                receipt_hash=receipt_hash,
+            )
+        except submission_service.DuplicateSubmissionError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+else:
+    @router.post("/", response_model=SubmissionOut, status_code=201)
+    def handle_create_submission(
+        name: str = Form(...),
+        email: str = Form(...),
+        mobile: str = Form(...),
+        emirates_id: str = Form(...),
+        emirate: str = Form(...),
+        receipt: UploadFile = File(...),
+        db: Session = Depends(get_db),
+    ):
+        submission_in = _build_submission(name, email, mobile, emirates_id, emirate)
 
-    db_submission = submission_service.create_submission(
-        db=db,
-        submission=submission_in,
-        receipt_url=receipt_url,
-        receipt_hash=receipt_hash,
-    )
+        try:
+            # Before the receipt is stored, so a duplicate leaves nothing on disk
+            submission_service.ensure_unique(db, submission_in)
+            receipt_url, receipt_hash = submission_service.save_receipt_file(receipt, db=db)
+            db_submission = submission_service.create_submission(
+                db=db,
+                submission=submission_in,
+                receipt_url=receipt_url,
+                receipt_hash=receipt_hash,
+            )
+        except submission_service.DuplicateSubmissionError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    # With model_config.from_attributes=True on SubmissionOut,
-    # FastAPI + Pydantic v2 will serialize the ORM object automatically.
-    return db_submission
+        # With model_config.from_attributes=True on SubmissionOut,
+        # FastAPI + Pydantic v2 will serialize the ORM object automatically.
+        return db_submission
 
 
 @router.get("/", response_model=List[Submission])
 def handle_get_all_submissions(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    skip: Optional[int] = Query(None, ge=0, description="Deprecated offset paging; prefer cursor."),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Opaque token from a previous page's X-Next-Cursor header."),
+    emirate: Optional[str] = None,
+    submitted_from: Optional[datetime] = None,
+    submitted_to: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
     current_admin: Admin = Depends(get_current_admin)
 ):
     """
     Protected endpoint for admins to retrieve all user submissions.
+    Pages are keyed on (submitted_at, id); the token for the next page is
+    returned in the X-Next-Cursor header and is absent on the last page.
+    Rows come from our own table, so they are encoded directly rather than
+    re-validated against the response model.
     """
-    submissions = submission_service.get_submissions(db, skip=skip, limit=limit)
-    return submissions
\ No newline at end of file
+    if skip is not None and cursor is None and not (emirate or submitted_from or submitted_to):
+        return FastJSONResponse(submission_service.get_submissions(db, skip=skip, limit=limit))
+
+    try:
+        submissions, next_cursor = submission_service.get_submissions_page(
+            db,
+            limit=limit,
+            cursor=cursor,
+            emirate=emirate,
+            submitted_from=submitted_from,
+            submitted_to=submitted_to,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor.")
+
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return FastJSONResponse(submissions, headers=headers)
+
+
+@router.get("/names", response_model=List[str])
+def handle_get_submission_names(
+    sample: int = Query(settings.NAMES_SAMPLE_SIZE, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Protected endpoint returning a random sample of entrant names for the
+    winner animation. The payload size is fixed by `sample`, not table size.
+    """
+    return FastJSONResponse(submission_service.get_sample_submission_names(db, sample_size=sample))
+
+
+@router.get("/duplicates", response_model=List[DuplicateCluster])
+def handle_get_duplicate_receipts(
+    max_distance: Optional[int] = Query(None, ge=0, le=64, description="Only count pairs this close; defaults to DUPLICATE_MAX_DISTANCE."),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Protected endpoint listing suspected duplicate receipts: clusters of
+    stored receipts that look alike (re-photographed, cropped, recompressed),
+    largest first, with the submissions that used each one.
+    """
+    return receipt_similarity.find_clusters(db, max_distance=max_distance, skip=skip, limit=limit)
+
+
+@router.get("/export")
+def handle_export_submissions(
+    format: ExportFormat = ExportFormat.csv,
+    emirate: Optional[str] = None,
+    submitted_from: Optional[datetime] = None,
+    submitted_to: Optional[datetime] = None,
+    current_admin: Admin = Depends(get_current_admin)
+):
+    """
+    Protected endpoint that streams every matching submission as CSV or
+    NDJSON. Rows are read through a server-side cursor and sent as they are
+    decrypted, so memory stays flat regardless of table size.
+    """
+    filters = dict(emirate=emirate, submitted_from=submitted_from, submitted_to=submitted_to)
+    rows = export_service.iter_csv(**filters) if format == ExportFormat.csv else export_service.iter_ndjson(**filters)
+    filename = f"submissions-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{format.value}"
+    return StreamingResponse(
+        rows,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/ingest", response_model=IngestResult)
+def handle_ingest_submissions(
+    entries: UploadFile = File(..., description="CSV: name,email,mobile,emirates_id,emirate,receipt[,submitted_at]"),
+    receipts: UploadFile = File(..., description="Zip archive holding the receipts named in the CSV"),
+    db: Session = Depends(get_db),
+    current_admin: Admin = Depends(require_global_admin)
+):
+    """
+    Protected endpoint that loads an offline batch (kiosks, partner
+    retailers) in chunked transactions. Rows that fail validation or
+    uniqueness are reported by CSV line and skipped; the rest are loaded.
+    Batches over INGEST_HTTP_MAX_ROWS rows (or the upload size limits) are
+    refused with 413; load those with `python -m app.commands.ingest`.
+    """
+    too_large = "Batch too large for upload; load it with `python -m app.commands.ingest` on the server."
+    if entries.size is not None and entries.size > settings.INGEST_HTTP_MAX_CSV_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"CSV is over {settings.INGEST_HTTP_MAX_CSV_MB} MB. {too_large}")
+    if receipts.size is not None and receipts.size > settings.INGEST_HTTP_MAX_ARCHIVE_MB * 1024 * 1024:
+        raise HTTPException(status_code=413, detail=f"Receipts archive is over {settings.INGEST_HTTP_MAX_ARCHIVE_MB} MB. {too_large}")
+
+    csv_file = io.TextIOWrapper(entries.file, encoding="utf-8-sig", newline="")
+    try:
+        if ingest_service.count_rows(csv_file) > settings.INGEST_HTTP_MAX_ROWS:
+            raise HTTPException(status_code=413, detail=f"CSV has over {settings.INGEST_HTTP_MAX_ROWS} rows. {too_large}")
+        report = ingest_service.ingest(db, csv_file, receipts.file)
+    except ingest_service.IngestFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        csv_file.detach()
+
+    return IngestResult(
+        rows=report.rows,
+        inserted=report.inserted,
+        failed=len(report.errors),
+        seconds=report.seconds,
+        rows_per_second=report.rows_per_second,
+        errors=[{"line": error.line, "error": error.error} for error in report.errors[:INGEST_MAX_REPORTED_ERRORS]],
+    )
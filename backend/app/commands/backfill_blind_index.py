@@ -0,0 +1,89 @@
+"""
+Fills the email/mobile blind-index columns for existing submissions.
+
+    python -m app.commands.backfill_blind_index [--email] [--mobile] [--batch-size N]
+
+Without flags it backfills whichever fields ENFORCE_UNIQUE_EMAIL and
+ENFORCE_UNIQUE_MOBILE enable. Run it before turning enforcement on for a
+table that already has rows. When several existing rows share a value, the
+oldest keeps the blind index and the later ones are reported and left
+unset, since the unique index cannot hold them all.
+"""
+import argparse
+from sqlalchemy import bindparam, select
+from ..db.session import SessionLocal
+from ..db.models.submission import Submission
+from ..services import encryption
+from ..core.config import settings
+
+FIELDS = {
+    "email": (Submission.email, Submission.email_bidx, encryption.email_blind_index),
+    "mobile": (Submission.mobile, Submission.mobile_bidx, encryption.mobile_blind_index),
+}
+
+def backfill_field(db, field: str, batch_size: int = 1000) -> tuple[int, list[int]]:
+    """Returns (rows updated, ids of duplicate rows left without a blind index)."""
+    value_column, bidx_column, make_bidx = FIELDS[field]
+    table = Submission.__table__
+    update = (
+        table.update()
+        .where(table.c.id == bindparam("b_id"))
+        .values({bidx_column.key: bindparam("b_bidx")})
+    )
+    updated, duplicates = 0, []
+    last_id = 0
+
+    while True:
+        rows = db.execute(
+            select(Submission.id, value_column)
+            .where(Submission.id > last_id, bidx_column.is_(None))
+            .order_by(Submission.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        digests = {row.id: make_bidx(row[1]) for row in rows}
+        taken = set(db.scalars(select(bidx_column).where(bidx_column.in_(set(digests.values())))))
+        params = []
+        for submission_id, digest in digests.items():
+            if digest in taken:
+                duplicates.append(submission_id)
+                continue
+            taken.add(digest)
+            params.append({"b_id": submission_id, "b_bidx": digest})
+
+        if params:
+            db.execute(update, params)
+        db.commit()
+        updated += len(params)
+        print(f"... {field}: {updated} rows indexed (up to id {last_id})")
+
+    return updated, duplicates
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", action="store_true", help="Backfill email_bidx.")
+    parser.add_argument("--mobile", action="store_true", help="Backfill mobile_bidx.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    fields = [name for name, wanted in (("email", args.email), ("mobile", args.mobile)) if wanted]
+    if not fields:
+        fields = [name for name, enforced in (("email", settings.ENFORCE_UNIQUE_EMAIL), ("mobile", settings.ENFORCE_UNIQUE_MOBILE)) if enforced]
+    if not fields:
+        parser.error("Nothing to do: pass --email/--mobile or enable ENFORCE_UNIQUE_EMAIL/ENFORCE_UNIQUE_MOBILE.")
+
+    db = SessionLocal()
+    try:
+        for field in fields:
+            updated, duplicates = backfill_field(db, field, batch_size=args.batch_size)
+            print(f"{field}: {updated} rows indexed, {len(duplicates)} duplicates left unset")
+            if duplicates:
+                print(f"{field} duplicate submission ids: {', '.join(map(str, duplicates))}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
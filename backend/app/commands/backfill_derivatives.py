@@ -0,0 +1,101 @@
+"""
+Renders missing receipt thumbnails and review images, and records the
+perceptual hashes used for duplicate detection.
+
+    python -m app.commands.backfill_derivatives [--workers N] [--batch-size N] [--force]
+
+Walks every submission with a receipt_hash in id order and renders the
+derivatives (see services/receipt_derivatives.py) of each distinct receipt
+that does not have them or a fingerprint (services/receipt_similarity.py)
+yet. With --force, it re-renders existing ones too, for example after
+changing the sizes. Receipts that are not images are counted and skipped.
+"""
+import argparse, os, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import select
+from ..db.session import SessionLocal
+from ..db.models.submission import Submission
+from ..db.models.receipt_fingerprint import ReceiptFingerprint
+from ..core.config import settings
+from ..services import receipt_derivatives, receipt_similarity, receipt_storage
+
+def _iter_receipts(db, batch_size: int):
+    """Yields (receipt_hash, path) once per distinct stored receipt."""
+    seen = set()
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Submission.id, Submission.receipt_hash, Submission.receipt_url)
+            .where(Submission.id > last_id, Submission.receipt_hash.is_not(None))
+            .order_by(Submission.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        for row in rows:
+            if row.receipt_hash in seen:
+                continue
+            seen.add(row.receipt_hash)
+            path = receipt_storage.path_for_url(row.receipt_url)
+            stored = receipt_storage.find_stored(row.receipt_hash)
+            if stored:
+                path = os.path.join(receipt_storage.UPLOAD_DIRECTORY, stored)
+            yield row.receipt_hash, path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--force", action="store_true", help="Re-render receipts that already have derivatives.")
+    args = parser.parse_args()
+
+    if not receipt_derivatives.pillow_available():
+        parser.error("Pillow is not installed; nothing can be rendered.")
+
+    rendered = skipped = not_images = missing = 0
+    started = time.monotonic()
+    db = SessionLocal()
+    try:
+        fingerprinted = set(db.scalars(select(ReceiptFingerprint.receipt_hash))) if settings.DUPLICATE_DETECTION_ENABLED else None
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            in_flight = deque()
+
+            def collect_oldest():
+                nonlocal rendered, not_images
+                file_hash, future = in_flight.popleft()
+                phash = future.result()
+                if phash is not None:
+                    rendered += 1
+                    if fingerprinted is not None and file_hash not in fingerprinted:
+                        receipt_similarity.record(file_hash, phash)
+                else:
+                    not_images += 1
+                if (rendered + not_images) % 500 == 0:
+                    rate = (rendered + not_images) / (time.monotonic() - started)
+                    print(f"... {rendered} rendered, {not_images} not images, {rate:,.0f} receipts/s")
+
+            for file_hash, path in _iter_receipts(db, args.batch_size):
+                if not path or not os.path.isfile(path):
+                    missing += 1
+                    continue
+                done = receipt_derivatives.has_derivatives(file_hash) and (fingerprinted is None or file_hash in fingerprinted)
+                if not args.force and done:
+                    skipped += 1
+                    continue
+                in_flight.append((file_hash, pool.submit(receipt_derivatives.render_derivatives, path, file_hash)))
+                if len(in_flight) >= 4 * args.workers:
+                    collect_oldest()
+            while in_flight:
+                collect_oldest()
+    finally:
+        db.close()
+
+    print(
+        f"{rendered} rendered, {skipped} already done, {not_images} not images, "
+        f"{missing} files missing in {time.monotonic() - started:.1f}s"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Creates the global admin (GLOBAL_ADMIN_EMAIL) if it does not exist yet.
+
+    python -m app.commands.bootstrap
+
+Run once per deploy after `python -m app.commands.migrate`, before starting
+the API. This used to happen in every worker's startup hook.
+"""
+import argparse
+from ..db.session import SessionLocal
+from ..services import admin_service
+from ..core.logging_config import configure_logging
+
+def main():
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+
+    configure_logging()
+    db = SessionLocal()
+    try:
+        admin_service.create_global_admin_if_not_exists(db)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
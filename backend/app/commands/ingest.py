@@ -0,0 +1,61 @@
+"""
+Loads an offline batch of submissions (kiosks, partner retailers).
+
+    python -m app.commands.ingest entries.csv receipts.zip [--batch-size N] [--workers N] [--errors errors.csv] [--skip-derivatives]
+
+The CSV needs the columns name, email, mobile, emirates_id, emirate and
+receipt (a file name inside the zip archive); an optional submitted_at
+column (ISO 8601) keeps the time the entry was collected. Rows that fail
+validation or uniqueness are skipped and listed (line and reason), on
+stdout or in the --errors file; everything else is loaded in chunked
+transactions. Loading the same file twice loads it twice unless
+ENFORCE_UNIQUE_EMAIL / ENFORCE_UNIQUE_MOBILE is on.
+
+With --skip-derivatives, run `python -m app.commands.backfill_derivatives`
+afterwards to render the thumbnails.
+"""
+import argparse, csv, os, sys
+from ..db.session import SessionLocal
+from ..services import ingest_service
+from ..services.receipt_derivatives import shutdown_pool
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("entries", help="CSV file of entries.")
+    parser.add_argument("receipts", help="Zip archive of the receipts the CSV names.")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows per transaction (default INGEST_BATCH_SIZE).")
+    parser.add_argument("--workers", type=int, default=None, help="Validation/encryption processes (default: CPU count).")
+    parser.add_argument("--errors", help="Write rejected rows (line, error) to this CSV instead of stdout.")
+    parser.add_argument("--skip-derivatives", action="store_true", help="Do not queue thumbnail rendering.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        with open(args.entries, newline="", encoding="utf-8-sig") as csv_file, open(args.receipts, "rb") as receipts:
+            report = ingest_service.ingest(
+                db, csv_file, receipts,
+                batch_size=args.batch_size,
+                workers=args.workers or os.cpu_count() or 1,
+                queue_derivatives=not args.skip_derivatives,
+            )
+    except ingest_service.IngestFormatError as e:
+        sys.exit(f"error: {e}")
+    finally:
+        db.close()
+        # Lets queued thumbnail renders finish before exiting
+        shutdown_pool(wait=True)
+
+    if report.errors:
+        out = open(args.errors, "w", newline="") if args.errors else sys.stdout
+        writer = csv.writer(out)
+        writer.writerow(["line", "error"])
+        writer.writerows([error.line, error.error] for error in report.errors)
+        if args.errors:
+            out.close()
+    print(
+        f"{report.rows} rows read, {report.inserted} inserted, {len(report.errors)} rejected "
+        f"in {report.seconds:.1f}s ({report.rows_per_second:,.0f} rows/s)"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Brings the database schema up to date (alembic upgrade head).
+
+    python -m app.commands.migrate
+
+Databases created by the old create_all-at-import code have the baseline
+tables but no alembic_version table, and 0001_baseline would fail on them
+with "relation already exists". Such a database (a `submissions` table
+but no `alembic_version`) is stamped 0001_baseline first, then upgraded
+as usual. Run once per deploy, before app.commands.bootstrap.
+"""
+import argparse
+from pathlib import Path
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from ..db.session import engine
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+BASELINE_REVISION = "0001_baseline"
+
+def is_unversioned_legacy_schema() -> bool:
+    tables = set(inspect(engine).get_table_names())
+    return "submissions" in tables and "alembic_version" not in tables
+
+def main():
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "migrations"))
+    if is_unversioned_legacy_schema():
+        print(f"Existing schema without migration history; stamping {BASELINE_REVISION}")
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
+if __name__ == "__main__":
+    main()
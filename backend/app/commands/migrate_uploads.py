@@ -0,0 +1,141 @@
+"""
+Rehomes receipts from the legacy flat upload directory into the
+content-addressed, sharded layout and points submissions at the new URLs.
+
+    python -m app.commands.migrate_uploads [--dry-run] [--prune-legacy]
+
+By default each legacy file name is kept as a hard link to the sharded copy,
+so receipt URLs handed out before the migration keep resolving. With
+--prune-legacy the old names are removed as well, but only after every
+submission has been repointed, so an interrupted run never leaves rows
+naming a missing file and can simply be run again.
+"""
+import argparse, os
+from sqlalchemy import bindparam, select
+from ..db.session import SessionLocal
+from ..db.models.submission import Submission
+from ..services import receipt_storage
+
+BATCH_SIZE = 500
+
+def _legacy_files(upload_dir: str):
+    with os.scandir(upload_dir) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and not entry.name.startswith("."):
+                yield entry.name
+
+def _rehome(name: str, dry_run: bool) -> tuple[str, str, bool]:
+    """
+    Moves one legacy file into the store, keeping its name as a hard link.
+    Returns (file_hash, new_url, deduplicated).
+    """
+    upload_dir = receipt_storage.UPLOAD_DIRECTORY
+    legacy_path = os.path.join(upload_dir, name)
+    file_hash = receipt_storage.hash_file(legacy_path)
+    stored = receipt_storage.find_stored(file_hash)
+    deduplicated = stored is not None
+    relpath = stored or receipt_storage.receipt_relpath(file_hash, receipt_storage.normalize_ext(name))
+
+    if not dry_run:
+        # The legacy name never goes missing, even if the run is interrupted
+        target = os.path.join(upload_dir, relpath)
+        if not deduplicated:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.link(legacy_path, target)
+        elif not os.path.samefile(target, legacy_path):
+            tmp_path = os.path.join(upload_dir, f"{receipt_storage.TEMP_PREFIX}{name}")
+            os.link(target, tmp_path)
+            os.replace(tmp_path, legacy_path)
+
+    return file_hash, receipt_storage.receipt_url(relpath), deduplicated
+
+def _update_urls(db, updates: list[dict]):
+    """Repoints every submission with a given receipt_hash at its sharded URL."""
+    table = Submission.__table__
+    db.execute(
+        table.update()
+        .where(table.c.receipt_hash == bindparam("b_hash"))
+        .values(receipt_url=bindparam("b_url")),
+        updates,
+    )
+    db.commit()
+
+def _update_unhashed(db, url_map: dict[str, tuple[str, str]]):
+    """Older rows may lack receipt_hash; match those on their legacy URL."""
+    rows = db.query(Submission.id, Submission.receipt_url).filter(Submission.receipt_hash.is_(None)).all()
+    table = Submission.__table__
+    updates = [
+        {"b_id": row.id, "b_url": url_map[row.receipt_url][1], "b_hash": url_map[row.receipt_url][0]}
+        for row in rows if row.receipt_url in url_map
+    ]
+    if updates:
+        db.execute(
+            table.update()
+            .where(table.c.id == bindparam("b_id"))
+            .values(receipt_url=bindparam("b_url"), receipt_hash=bindparam("b_hash")),
+            updates,
+        )
+        db.commit()
+    return len(updates)
+
+def _prune_legacy(db, names: list[str]) -> int:
+    """Removes legacy names that no submission's receipt_url still uses."""
+    removed = 0
+    for start in range(0, len(names), BATCH_SIZE):
+        batch = {f"{receipt_storage.UPLOAD_URL_PREFIX}/{name}": name for name in names[start:start + BATCH_SIZE]}
+        in_use = set(db.scalars(select(Submission.receipt_url).where(Submission.receipt_url.in_(batch))))
+        for url, name in batch.items():
+            if url not in in_use:
+                os.unlink(os.path.join(receipt_storage.UPLOAD_DIRECTORY, name))
+                removed += 1
+    return removed
+
+def migrate(dry_run: bool = False, prune: bool = False) -> dict:
+    upload_dir = receipt_storage.UPLOAD_DIRECTORY
+    stats = {"files": 0, "deduplicated": 0, "unhashed_rows": 0, "pruned": 0}
+    url_map: dict[str, tuple[str, str]] = {}
+    pending: list[dict] = []
+
+    db = SessionLocal()
+    try:
+        for name in _legacy_files(upload_dir):
+            if name.startswith(receipt_storage.TEMP_PREFIX):
+                continue
+            file_hash, new_url, deduplicated = _rehome(name, dry_run)
+            url_map[f"{receipt_storage.UPLOAD_URL_PREFIX}/{name}"] = (file_hash, new_url)
+            pending.append({"b_hash": file_hash, "b_url": new_url})
+            stats["files"] += 1
+            stats["deduplicated"] += deduplicated
+
+            if len(pending) >= BATCH_SIZE and not dry_run:
+                _update_urls(db, pending)
+                pending = []
+                print(f"... {stats['files']} files rehomed")
+
+        if not dry_run:
+            if pending:
+                _update_urls(db, pending)
+            stats["unhashed_rows"] = _update_unhashed(db, url_map)
+            # Only now that every row has its new URL
+            if prune:
+                names = [url[len(receipt_storage.UPLOAD_URL_PREFIX) + 1:] for url in url_map]
+                stats["pruned"] = _prune_legacy(db, names)
+    finally:
+        db.close()
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would move without touching files or rows.")
+    parser.add_argument("--prune-legacy", action="store_true", help="Remove the legacy file names once all rows are repointed.")
+    args = parser.parse_args()
+
+    stats = migrate(dry_run=args.dry_run, prune=args.prune_legacy)
+    print(
+        f"Rehomed {stats['files']} files ({stats['deduplicated']} duplicates collapsed), "
+        f"backfilled {stats['unhashed_rows']} rows without receipt_hash, "
+        f"removed {stats['pruned']} legacy names."
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Removes stored receipts that no submission refers to, with their
+thumbnails and review images.
+
+    python -m app.commands.prune_receipts [--min-age-minutes N] [--dry-run]
+
+Receipts are content-addressed and shared, so nothing deletes them inline:
+a web upload or an ingest can reuse a stored copy before the row that
+refers to it is committed. Such files are left behind when the database
+then rejects the row (a concurrent entry claimed the same email or mobile
+first). This sweep only considers files that have not been stored or
+reused for --min-age-minutes (default 60), and checks the receipt_hash
+references again right before removing each batch.
+
+Legacy flat-named files (see migrate_uploads) are left alone.
+"""
+import argparse, os, time
+from sqlalchemy import select
+from ..db.session import SessionLocal
+from ..db.models.submission import Submission
+from ..services import receipt_derivatives, receipt_storage
+
+BATCH_SIZE = 500
+
+def _stored_receipts(min_age: float):
+    """Yields (receipt_hash, path) for content-addressed files untouched for min_age seconds."""
+    cutoff = time.time() - min_age
+    for dirpath, dirnames, filenames in os.walk(receipt_storage.UPLOAD_DIRECTORY):
+        if dirpath == receipt_storage.UPLOAD_DIRECTORY:
+            dirnames[:] = [name for name in dirnames if name != receipt_derivatives.DERIVED_DIR]
+            continue
+        for name in filenames:
+            file_hash = name[:64]
+            if not receipt_storage._hash_re.match(file_hash):
+                continue
+            path = os.path.join(dirpath, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    yield file_hash, path
+            except FileNotFoundError:
+                pass
+
+def _unreferenced(db, batch):
+    referenced = set(db.scalars(
+        select(Submission.receipt_hash).where(Submission.receipt_hash.in_({file_hash for file_hash, _ in batch}))
+    ))
+    return [(file_hash, path) for file_hash, path in batch if file_hash not in referenced]
+
+def _remove(batch, min_age: float) -> int:
+    cutoff = time.time() - min_age
+    removed = 0
+    for file_hash, path in batch:
+        try:
+            # Reused since it was listed
+            if os.stat(path).st_mtime >= cutoff:
+                continue
+            os.unlink(path)
+        except FileNotFoundError:
+            continue
+        removed += 1
+        for variant in receipt_derivatives.VARIANTS:
+            try:
+                os.unlink(receipt_derivatives.derivative_path(file_hash, variant))
+            except FileNotFoundError:
+                pass
+    return removed
+
+def prune(min_age: float, dry_run: bool):
+    removed = checked = 0
+    db = SessionLocal()
+    try:
+        batch = []
+
+        def flush():
+            nonlocal removed, checked
+            checked += len(batch)
+            candidates = _unreferenced(db, batch)
+            db.rollback()
+            if dry_run:
+                for _, path in candidates:
+                    print(f"would remove {path}")
+                removed += len(candidates)
+            elif candidates:
+                # Re-checked right before removal: a row may have been
+                # committed since the files were listed
+                removed += _remove(_unreferenced(db, candidates), min_age)
+                db.rollback()
+            batch.clear()
+
+        for item in _stored_receipts(min_age):
+            batch.append(item)
+            if len(batch) >= BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    finally:
+        db.close()
+    print(f"{checked} old receipts checked, {removed} unreferenced {'to remove' if dry_run else 'removed'}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--min-age-minutes", type=float, default=60, help="Only remove files untouched for this long.")
+    parser.add_argument("--dry-run", action="store_true", help="List the files without removing them.")
+    args = parser.parse_args()
+    if args.min_age_minutes < 1:
+        parser.error("--min-age-minutes must be at least 1, or receipts of entries still being saved could go.")
+    prune(args.min_age_minutes * 60, args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Rebuilds the per-emirate dashboard counters from the submissions table.
+
+    python -m app.commands.reconcile_stats
+
+Run it once after deploying the counters, and any time they are suspected
+to have drifted (e.g. after rows were deleted by hand).
+"""
+import argparse
+from ..db.session import SessionLocal
+from ..services import dashboard_service
+
+def main():
+    argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter).parse_args()
+
+    db = SessionLocal()
+    try:
+        counts = dashboard_service.reconcile_counters(db)
+    finally:
+        db.close()
+
+    for emirate, count in sorted(counts.items()):
+        print(f"{emirate}: {count}")
+    print(f"Total: {sum(counts.values())}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""
+Re-encrypts submission PII under the active encryption key.
+
+    python -m app.commands.rotate_keys [--batch-size N] [--workers N] [--checkpoint PATH] [--restart]
+
+Rotation steps:
+  1. Pin BLIND_INDEX_KEY if it is not set yet. Blind indexes default to a
+     key derived from SECRET_KEY and would stop matching otherwise.
+  2. Add the new key to ENCRYPTION_KEYS, keeping the old one as
+     "0:<old SECRET_KEY>", point ENCRYPTION_KEY_ID at the new key, and
+     deploy. New submissions now use the new key, and old rows still decrypt.
+  3. Run this command. It works through the table in id batches and commits
+     each one separately, so the site keeps taking submissions. Each update
+     is conditional on the ciphertext it read, which means a row changed in
+     the meantime is skipped rather than overwritten (run again to pick it up).
+  4. Once a run reports nothing left to rotate, remove the old key.
+
+Progress is written to the checkpoint file after every batch. A restarted run
+resumes from there unless --restart is given or the active key changed.
+Rows inserted after the run started already use the new key, so the run stops
+at the highest id it saw at start.
+"""
+import argparse, json, os, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import and_, bindparam, func, select
+from ..db.session import SessionLocal
+from ..db.models.submission import Submission, ENCRYPTED_FIELDS
+from ..services.encryption import Keyring, get_keyring
+
+DEFAULT_CHECKPOINT = ".rotate_keys.checkpoint"
+
+table = Submission.__table__
+COLUMNS = [table.c[field] for field in ENCRYPTED_FIELDS]
+
+_worker_keyring = None
+
+def _init_worker(secrets: dict, active_id: int):
+    global _worker_keyring
+    _worker_keyring = Keyring(secrets, active_id)
+
+def _reencrypt(rows: list) -> list:
+    """
+    Runs in a worker process. Takes (id, *ciphertexts) tuples and returns
+    update parameters for the rows that have at least one stale value.
+    """
+    keyring = _worker_keyring
+    params = []
+    for row in rows:
+        submission_id, ciphertexts = row[0], row[1:]
+        if all(value is None or keyring.key_id(value) == keyring.active_id for value in ciphertexts):
+            continue
+        param = {"b_id": submission_id}
+        for field, value in zip(ENCRYPTED_FIELDS, ciphertexts):
+            param[f"b_old_{field}"] = value
+            param[f"b_new_{field}"] = None if value is None else keyring.encrypt(keyring.decrypt(value))
+        params.append(param)
+    return params
+
+def _update_statement():
+    # Optimistic: only rows whose ciphertext is still what we read are updated
+    return (
+        table.update()
+        .where(and_(table.c.id == bindparam("b_id"), *[column == bindparam(f"b_old_{column.key}") for column in COLUMNS]))
+        .values({column.key: bindparam(f"b_new_{column.key}") for column in COLUMNS})
+    )
+
+def _load_checkpoint(path: str, active_id: int) -> dict | None:
+    try:
+        with open(path) as fh:
+            state = json.load(fh)
+    except FileNotFoundError:
+        return None
+    return state if state.get("key_id") == active_id else None
+
+def _save_checkpoint(path: str, state: dict):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(state, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+def _read_batches(db, last_id: int, max_id: int, batch_size: int):
+    while last_id < max_id:
+        rows = db.execute(
+            select(table.c.id, *COLUMNS)
+            .where(table.c.id > last_id, table.c.id <= max_id)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        # Close the read transaction so batches never hold a long snapshot
+        db.commit()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield last_id, len(rows), [tuple(row) for row in rows]
+
+def rotate(db, checkpoint: str, batch_size: int = 500, workers: int | None = None, restart: bool = False) -> dict:
+    keyring = get_keyring()
+    state = None if restart else _load_checkpoint(checkpoint, keyring.active_id)
+    if state is None:
+        max_id = db.scalar(select(func.max(table.c.id))) or 0
+        state = {"key_id": keyring.active_id, "max_id": max_id, "last_id": 0, "scanned": 0, "rotated": 0, "skipped": 0}
+    else:
+        print(f"Resuming after id {state['last_id']} (of {state['max_id']})")
+    db.commit()
+
+    update = _update_statement()
+    workers = workers or os.cpu_count() or 1
+    started = time.monotonic()
+    scanned_at_start = state["scanned"]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(keyring.secrets, keyring.active_id)) as pool:
+        in_flight = deque()
+        batches = _read_batches(db, state["last_id"], state["max_id"], batch_size)
+
+        def apply_oldest():
+            last_id, count, future = in_flight.popleft()
+            params = future.result()
+            if params:
+                result = db.execute(update, params)
+                matched = result.rowcount if result.rowcount >= 0 else len(params)
+                state["rotated"] += matched
+                state["skipped"] += len(params) - matched
+            db.commit()
+            state["last_id"] = last_id
+            state["scanned"] += count
+            _save_checkpoint(checkpoint, state)
+
+            elapsed = time.monotonic() - started
+            rate = (state["scanned"] - scanned_at_start) / elapsed if elapsed else 0.0
+            print(f"... up to id {last_id}/{state['max_id']}: {state['scanned']} scanned, {state['rotated']} re-encrypted, {rate:,.0f} rows/s")
+
+        # Keep a bounded number of batches in flight and apply them in id
+        # order, so the checkpoint never gets ahead of committed work
+        for last_id, count, rows in batches:
+            in_flight.append((last_id, count, pool.submit(_reencrypt, rows)))
+            if len(in_flight) >= 2 * workers:
+                apply_oldest()
+        while in_flight:
+            apply_oldest()
+
+    state["elapsed_seconds"] = round(time.monotonic() - started, 3)
+    return state
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=None, help="Crypto worker processes (default: CPU count).")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help=f"Progress file (default: {DEFAULT_CHECKPOINT}).")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        state = rotate(db, args.checkpoint, batch_size=args.batch_size, workers=args.workers, restart=args.restart)
+    finally:
+        db.close()
+
+    elapsed = state["elapsed_seconds"]
+    print(
+        f"Key {state['key_id']}: {state['scanned']} rows scanned, {state['rotated']} re-encrypted, "
+        f"{state['skipped']} changed concurrently (re-run to retry) in {elapsed:.1f}s"
+    )
+
+if __name__ == "__main__":
+    main()
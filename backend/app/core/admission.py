@@ -0,0 +1,139 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+from .config import settings
+from . import metrics
+
+# Admission control
+# -----------------
+# Guards expensive endpoints (submission uploads) during traffic spikes.
+# Requests are turned away early and cheaply instead of queueing on the DB
+# pool and disk:
+#   * a global cap on in-flight requests -> 503 + Retry-After
+#   * a token bucket per client address  -> 429 + Retry-After
+# The client address is scope["client"], so the middleware must sit inside
+# ProxyHeadersMiddleware (added before it) to see the real client IP.
+# All state is per process and only touched from the event loop.
+
+class AdmissionController:
+    def __init__(self, rate_per_second: float, burst: float, max_in_flight: int, max_clients: int = 100_000, retry_after: int = 1):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_clients = max_clients
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.rejected_rate_limited = 0
+        self.rejected_overloaded = 0
+        # client -> (tokens, last refill), least recently seen first
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    def _take_token(self, client: str) -> Optional[int]:
+        """Returns None if the client may proceed, else seconds until it may retry."""
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        retry_after = None
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = max(1, math.ceil((1 - tokens) / self.rate))
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def admit(self, client: str) -> tuple[int, int] | None:
+        """
+        Returns None and counts the request as in flight if it is admitted,
+        otherwise (status code, retry-after seconds).
+        """
+        if self.in_flight >= self.max_in_flight:
+            self.rejected_overloaded += 1
+            return 503, self.retry_after
+        retry_after = self._take_token(client)
+        if retry_after is not None:
+            self.rejected_rate_limited += 1
+            return 429, retry_after
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.admitted += 1
+        return None
+
+    def release(self):
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_in_flight": self.max_in_flight,
+            "admitted": self.admitted,
+            "rejected_rate_limited": self.rejected_rate_limited,
+            "rejected_overloaded": self.rejected_overloaded,
+            "tracked_clients": len(self._buckets),
+        }
+
+_REJECT_DETAIL = {
+    429: "Too many submissions from this address. Please try again shortly.",
+    503: "We are receiving a lot of submissions right now. Please try again shortly.",
+}
+
+class AdmissionControlMiddleware:
+    """Pure ASGI middleware applying an AdmissionController to matching requests."""
+
+    def __init__(self, app, controller: AdmissionController, paths: Iterable[str], methods: Iterable[str] = ("POST",)):
+        self.app = app
+        self.controller = controller
+        self.paths = {path.rstrip("/") for path in paths}
+        self.methods = set(methods)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.methods or scope["path"].rstrip("/") not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        rejection = self.controller.admit(client[0] if client else "unknown")
+        if rejection is not None:
+            await self._reject(send, *rejection)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    @staticmethod
+    async def _reject(send, status_code: int, retry_after: int):
+        body = json.dumps({"detail": _REJECT_DETAIL[status_code]}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+submission_admission = AdmissionController(
+    rate_per_second=settings.SUBMISSION_RATE_PER_MINUTE / 60,
+    burst=settings.SUBMISSION_BURST,
+    max_in_flight=settings.SUBMISSION_MAX_IN_FLIGHT,
+    max_clients=settings.ADMISSION_MAX_CLIENTS,
+)
+
+@metrics.register_collector
+def _admission_metrics():
+    stats = submission_admission.stats()
+    yield metrics.Sample("admission_in_flight", "gauge", "Submissions currently admitted and in progress.", stats["in_flight"])
+    yield metrics.Sample("admission_max_in_flight", "gauge", "Configured in-flight submission cap.", stats["max_in_flight"])
+    yield metrics.Sample("admission_tracked_clients", "gauge", "Client addresses with a token bucket.", stats["tracked_clients"])
+    yield metrics.Sample("admission_requests_total", "counter", "Submission admission decisions.", stats["admitted"], {"decision": "admitted"})
+    yield metrics.Sample("admission_requests_total", "counter", "Submission admission decisions.", stats["rejected_rate_limited"], {"decision": "rate_limited"})
+    yield metrics.Sample("admission_requests_total", "counter", "Submission admission decisions.", stats["rejected_overloaded"], {"decision": "overloaded"})
@@ -15,16 +15,37 @@ class Settings:
     DB_PORT: str = os.getenv("DB_PORT", "5432")
     DB_NAME: str = os.getenv("DB_NAME", "app")
     
-    # Assemble the database URL from the individual components
-    DATABASE_URL: str = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    # Assemble the database URL from the individual components (or take it whole)
+    DATABASE_URL: str = os.getenv("DATABASE_URL") or f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+    # Async driver URL, used when USE_ASYNC_DB is on
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    USE_ASYNC_DB: bool = get_bool_env("USE_ASYNC_DB", False)
+
+    # Optional read replica for read-only admin endpoints (see db/replica.py).
+    # Reads fall back to the primary while it lags more than
+    # REPLICA_MAX_LAG_SECONDS or does not answer.
+    READ_DATABASE_URL: str = os.getenv("READ_DATABASE_URL", "")
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+    REPLICA_CHECK_INTERVAL_SECONDS: float = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "2"))
 
     # Global Admin Email
     GLOBAL_ADMIN_EMAIL: str = os.getenv("GLOBAL_ADMIN_EMAIL", "elias@digitaljunkies.ae")
 
+    # --- Reverse Proxy Settings ---
+    # Peers allowed to set X-Forwarded-For/-Proto (comma-separated IPs or
+    # CIDRs). Anyone else could pick their own client address and dodge the
+    # per-IP limits. docker-compose sets the compose network's gateway, where
+    # the host's nginx connects from; never use "*" with the port exposed.
+    FORWARDED_ALLOW_IPS: str = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
     # JWT Settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 8 # 8 hours
+    # Lifetime of the single-purpose tokens put in URLs (event streams,
+    # receipt links), which cannot carry an Authorization header
+    LINK_TOKEN_EXPIRE_SECONDS: int = int(os.getenv("LINK_TOKEN_EXPIRE_SECONDS", 60))
 
     # Google Tag Manager ID
     GTM_ID: str = os.getenv("GTM_ID", "")
@@ -33,8 +54,126 @@ class Settings:
     SENDGRID_API_KEY: str = os.getenv("SENDGRID_API_KEY")
     EMAILS_FROM_EMAIL: str = os.getenv("EMAILS_FROM_EMAIL", "noreply@yourdomain.com")
 
+    # --- Email Delivery Settings ---
+    # "sendgrid", "smtp", "file" or "console"; empty picks sendgrid when
+    # SENDGRID_API_KEY is set and console otherwise
+    EMAIL_TRANSPORT: str = os.getenv("EMAIL_TRANSPORT", "")
+    EMAIL_FILE_PATH: str = os.getenv("EMAIL_FILE_PATH", "/tmp/outbox")
+    SMTP_HOST: str = os.getenv("SMTP_HOST", "localhost")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "1025"))
+    EMAIL_QUEUE_SIZE: int = int(os.getenv("EMAIL_QUEUE_SIZE", "1000"))
+    EMAIL_WORKERS: int = int(os.getenv("EMAIL_WORKERS", "2"))
+    EMAIL_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+    EMAIL_RETRY_BACKOFF_SECONDS: float = float(os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", "1"))
+
     # Set these to 'True' or 'False' in your .env files
     ENFORCE_UNIQUE_EMAIL: bool = get_bool_env("ENFORCE_UNIQUE_EMAIL", False)
     ENFORCE_UNIQUE_MOBILE: bool = get_bool_env("ENFORCE_UNIQUE_MOBILE", False)
 
+    # PII encryption keys as "id:secret,id:secret". Key 0 is SECRET_KEY unless
+    # listed here; new values are written with ENCRYPTION_KEY_ID (default:
+    # the highest id). Set BLIND_INDEX_KEY and list "0:<old SECRET_KEY>"
+    # before changing SECRET_KEY, or existing data can no longer be read.
+    ENCRYPTION_KEYS: str = os.getenv("ENCRYPTION_KEYS", "")
+    ENCRYPTION_KEY_ID: int | None = int(os.environ["ENCRYPTION_KEY_ID"]) if os.getenv("ENCRYPTION_KEY_ID") else None
+
+    # Key for the email/mobile blind indexes; derived from SECRET_KEY if unset
+    BLIND_INDEX_KEY: str = os.getenv("BLIND_INDEX_KEY", "")
+
+    # --- Receipt Upload Settings ---
+    # IMPORTANT: this path must be the SAME directory we mount as a Docker volume
+    UPLOAD_DIRECTORY: str = os.getenv("UPLOAD_DIRECTORY", "/app/uploads")
+    MAX_RECEIPT_SIZE_MB: int = int(os.getenv("MAX_RECEIPT_SIZE_MB", "20"))
+    # Rows per transaction in bulk ingest (services/ingest_service.py)
+    INGEST_BATCH_SIZE: int = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+    # Largest batch POST /submissions/ingest takes; bigger ones go through
+    # `python -m app.commands.ingest`
+    INGEST_HTTP_MAX_ROWS: int = int(os.getenv("INGEST_HTTP_MAX_ROWS", "5000"))
+    INGEST_HTTP_MAX_CSV_MB: int = int(os.getenv("INGEST_HTTP_MAX_CSV_MB", "5"))
+    INGEST_HTTP_MAX_ARCHIVE_MB: int = int(os.getenv("INGEST_HTTP_MAX_ARCHIVE_MB", "500"))
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(64 * 1024)))
+    # Set (e.g. "/_protected_uploads/") to let nginx send receipt bytes via X-Accel-Redirect
+    UPLOADS_X_ACCEL_PREFIX: str = os.getenv("UPLOADS_X_ACCEL_PREFIX", "")
+    # Require an admin token (header, or an "uploads" link token as ?token=) to fetch receipts
+    UPLOADS_REQUIRE_AUTH: bool = get_bool_env("UPLOADS_REQUIRE_AUTH", False)
+
+    # --- Receipt Derivative Settings ---
+    # Thumbnails and review-sized copies rendered in a process pool (needs Pillow)
+    DERIVATIVES_ENABLED: bool = get_bool_env("DERIVATIVES_ENABLED", True)
+    DERIVATIVE_WORKERS: int = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+    THUMBNAIL_SIZE: int = int(os.getenv("THUMBNAIL_SIZE", "320"))
+    THUMBNAIL_QUALITY: int = int(os.getenv("THUMBNAIL_QUALITY", "70"))
+    REVIEW_IMAGE_SIZE: int = int(os.getenv("REVIEW_IMAGE_SIZE", "1600"))
+    REVIEW_IMAGE_QUALITY: int = int(os.getenv("REVIEW_IMAGE_QUALITY", "82"))
+
+    # --- Duplicate Receipt Settings ---
+    # Derivative workers also compute a perceptual hash of each receipt;
+    # receipts whose hashes differ in at most DUPLICATE_MAX_DISTANCE of 64
+    # bits are reported as suspected duplicates
+    DUPLICATE_DETECTION_ENABLED: bool = get_bool_env("DUPLICATE_DETECTION_ENABLED", True)
+    DUPLICATE_MAX_DISTANCE: int = int(os.getenv("DUPLICATE_MAX_DISTANCE", "8"))
+
+    # --- Admin Export Settings ---
+    # Rows fetched (and decrypted) per server-side cursor batch
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+    # --- Dashboard Settings ---
+    # How long /dashboard/stats may be served from the in-process cache
+    DASHBOARD_STATS_TTL_SECONDS: float = float(os.getenv("DASHBOARD_STATS_TTL_SECONDS", "5"))
+    # Live feed (/dashboard/stream, see services/dashboard_feed.py): at most
+    # one event per interval, totals re-read from the database every resync
+    # period, and each stream closed after MAX seconds (clients reconnect)
+    DASHBOARD_STREAM_INTERVAL_SECONDS: float = float(os.getenv("DASHBOARD_STREAM_INTERVAL_SECONDS", "1"))
+    DASHBOARD_STREAM_RESYNC_SECONDS: float = float(os.getenv("DASHBOARD_STREAM_RESYNC_SECONDS", "5"))
+    DASHBOARD_STREAM_MAX_SECONDS: float = float(os.getenv("DASHBOARD_STREAM_MAX_SECONDS", "600"))
+    DASHBOARD_STREAM_QUEUE_SIZE: int = int(os.getenv("DASHBOARD_STREAM_QUEUE_SIZE", "16"))
+
+    # --- Winner Draw Settings ---
+    # Draws only include submissions made at least this long before the
+    # draw, so none of them can still be uncommitted (and turn up on replay)
+    DRAW_SETTLE_SECONDS: int = int(os.getenv("DRAW_SETTLE_SECONDS", "60"))
+
+    # --- Winner Animation Settings ---
+    # Names sent to the spinner animation, and how long that sample is cached
+    NAMES_SAMPLE_SIZE: int = int(os.getenv("NAMES_SAMPLE_SIZE", "200"))
+    NAMES_CACHE_TTL_SECONDS: float = float(os.getenv("NAMES_CACHE_TTL_SECONDS", "60"))
+
+    # --- OTP Settings ---
+    # Where pending login codes live: "sql" (shared by all workers and hosts),
+    # "file" (shared by the workers on one host, under OTP_STORE_PATH) or
+    # "memory" (single worker only)
+    OTP_STORE: str = os.getenv("OTP_STORE", "sql")
+    OTP_STORE_PATH: str = os.getenv("OTP_STORE_PATH", "/dev/shm/aaf-otp")
+    OTP_TTL_SECONDS: int = int(os.getenv("OTP_TTL_SECONDS", "600"))
+    OTP_SWEEP_INTERVAL_SECONDS: float = float(os.getenv("OTP_SWEEP_INTERVAL_SECONDS", "60"))
+
+    # --- Submission Admission Control ---
+    # Per client IP token bucket (many users can share a carrier NAT address,
+    # so keep this generous) and a per-worker cap on concurrent submissions
+    ADMISSION_CONTROL_ENABLED: bool = get_bool_env("ADMISSION_CONTROL_ENABLED", True)
+    SUBMISSION_RATE_PER_MINUTE: float = float(os.getenv("SUBMISSION_RATE_PER_MINUTE", "30"))
+    SUBMISSION_BURST: float = float(os.getenv("SUBMISSION_BURST", "10"))
+    SUBMISSION_MAX_IN_FLIGHT: int = int(os.getenv("SUBMISSION_MAX_IN_FLIGHT", "32"))
+    ADMISSION_MAX_CLIENTS: int = int(os.getenv("ADMISSION_MAX_CLIENTS", "100000"))
+
+    # --- Admin Auth Cache Settings ---
+    # Authenticated admins are cached per worker for this long. Changes made
+    # through admin_service apply at once in the worker that made them and
+    # within the TTL everywhere else.
+    ADMIN_CACHE_TTL_SECONDS: float = float(os.getenv("ADMIN_CACHE_TTL_SECONDS", "30"))
+    ADMIN_CACHE_SIZE: int = int(os.getenv("ADMIN_CACHE_SIZE", "1024"))
+
+    # --- Observability Settings ---
+    # LOG_FORMAT is "json" (one object per line, for log shippers) or "text"
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
+    # Prometheus scrape endpoint at /metrics. Only answered for clients in
+    # METRICS_ALLOW_IPS (comma-separated IPs or CIDRs) or with
+    # "Authorization: Bearer <METRICS_TOKEN>"; everyone else gets a 404
+    METRICS_ENABLED: bool = get_bool_env("METRICS_ENABLED", True)
+    METRICS_ALLOW_IPS: str = os.getenv("METRICS_ALLOW_IPS", "127.0.0.1,::1")
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+    # Requests slower than this are logged with their SQL counts
+    SLOW_REQUEST_MS: float = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,44 @@
+from datetime import datetime, timezone
+from typing import Optional
+from .config import settings
+import json, logging, sys
+
+# Attributes every LogRecord has; anything else on a record came from
+# `extra=` and is emitted as a field of its own.
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any extras."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RESERVED})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Plain lines for local development, with extras appended as key=value."""
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = " ".join(f"{key}={value}" for key, value in vars(record).items() if key not in _RESERVED)
+        return f"{line} {extras}" if extras else line
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None):
+    """
+    Sends the `app.*` loggers to stdout in LOG_FORMAT. Safe to call more
+    than once; uvicorn's own loggers are left alone.
+    """
+    logger = logging.getLogger("app")
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter() if (fmt or settings.LOG_FORMAT) == "json" else TextFormatter())
+    logger.handlers = [handler]
+    logger.setLevel((level or settings.LOG_LEVEL).upper())
+    logger.propagate = False
@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+import uuid
+from dataclasses import dataclass, asdict
+from email.message import EmailMessage as MIMEMessage
+from typing import Optional
+from .config import settings
+from . import metrics
+
+# Outgoing email
+# --------------
+# Requests hand messages to an EmailDispatcher and return at once. A few
+# daemon threads drain a bounded queue and deliver through a transport,
+# retrying transient failures with exponential backoff. Transports
+# (EMAIL_TRANSPORT):
+#   sendgrid - SendGrid v3 API over one pooled keep-alive HTTP client
+#   smtp     - plain SMTP, e.g. to a local catch-all sink in development
+#   file     - one JSON file per message under EMAIL_FILE_PATH, for tests
+#   console  - log the message (the default without SENDGRID_API_KEY)
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class EmailMessage:
+    to: str
+    subject: str
+    html: str
+
+class TransientEmailError(Exception):
+    """Delivery failed in a way that is worth retrying."""
+
+class EmailTransport:
+    def send(self, message: EmailMessage):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class SendGridTransport(EmailTransport):
+    API_URL = "https://api.sendgrid.com/v3/mail/send"
+
+    def __init__(self, api_key: str, from_email: str, timeout: float = 10.0):
+        import httpx  # only needed when SendGrid is actually used
+
+        self._httpx = httpx
+        self.from_email = from_email
+        self._client = httpx.Client(
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=timeout,
+            limits=httpx.Limits(max_keepalive_connections=4, max_connections=8),
+        )
+
+    def send(self, message: EmailMessage):
+        payload = {
+            "personalizations": [{"to": [{"email": message.to}]}],
+            "from": {"email": self.from_email},
+            "subject": message.subject,
+            "content": [{"type": "text/html", "value": message.html}],
+        }
+        try:
+            response = self._client.post(self.API_URL, json=payload)
+        except self._httpx.TransportError as e:
+            raise TransientEmailError(str(e)) from e
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransientEmailError(f"SendGrid returned {response.status_code}")
+        response.raise_for_status()
+
+    def close(self):
+        self._client.close()
+
+class SMTPTransport(EmailTransport):
+    def __init__(self, host: str, port: int, from_email: str, timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.from_email = from_email
+        self.timeout = timeout
+
+    def send(self, message: EmailMessage):
+        mime = MIMEMessage()
+        mime["From"] = self.from_email
+        mime["To"] = message.to
+        mime["Subject"] = message.subject
+        mime.set_content(message.html, subtype="html")
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                smtp.send_message(mime)
+        except (OSError, smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError) as e:
+            raise TransientEmailError(str(e)) from e
+
+class FileTransport(EmailTransport):
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def send(self, message: EmailMessage):
+        name = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}.json"
+        tmp_path = os.path.join(self.directory, f".{name}")
+        with open(tmp_path, "w") as fh:
+            json.dump(asdict(message), fh)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+class ConsoleTransport(EmailTransport):
+    def send(self, message: EmailMessage):
+        logger.info("Simulated email", extra={"to": message.to, "subject": message.subject, "html": message.html})
+
+def create_transport(name: Optional[str] = None) -> EmailTransport:
+    name = name or ("sendgrid" if settings.SENDGRID_API_KEY else "console")
+    if name == "sendgrid":
+        return SendGridTransport(settings.SENDGRID_API_KEY, settings.EMAILS_FROM_EMAIL)
+    if name == "smtp":
+        return SMTPTransport(settings.SMTP_HOST, settings.SMTP_PORT, settings.EMAILS_FROM_EMAIL)
+    if name == "file":
+        return FileTransport(settings.EMAIL_FILE_PATH)
+    if name == "console":
+        return ConsoleTransport()
+    raise ValueError(f"Unknown EMAIL_TRANSPORT {name!r}; expected 'sendgrid', 'smtp', 'file' or 'console'")
+
+_STOP = object()
+
+class EmailDispatcher:
+    def __init__(
+        self,
+        transport: EmailTransport,
+        queue_size: int = 1000,
+        workers: int = 2,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+    ):
+        self.transport = transport
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._stats_lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"email-dispatcher-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, message: EmailMessage) -> bool:
+        """Queues a message without blocking. Returns False if the queue is full."""
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            logger.error("Email queue full, dropping message", extra={"to": message.to})
+            return False
+
+    def _deliver(self, message: EmailMessage):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                self.transport.send(message)
+                return True
+            except TransientEmailError as e:
+                if attempt == self.max_attempts:
+                    logger.error("Giving up on email", extra={"to": message.to, "attempts": attempt, "error": str(e)})
+                    return False
+                # Exponential backoff with full jitter
+                delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+                time.sleep(random.uniform(0, delay))
+            except Exception as e:
+                logger.exception("Error sending email", extra={"to": message.to})
+                return False
+
+    def _run(self):
+        while True:
+            message = self._queue.get()
+            try:
+                if message is _STOP:
+                    return
+                delivered = self._deliver(message)
+                with self._stats_lock:
+                    if delivered:
+                        self.sent += 1
+                    else:
+                        self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {"queued": self._queue.qsize(), "sent": self.sent, "failed": self.failed, "dropped": self.dropped}
+
+    def close(self, timeout: float = 10.0):
+        """Delivers what is already queued (up to `timeout`) and stops the workers."""
+        deadline = time.monotonic() + timeout
+        for _ in self._threads:
+            try:
+                self._queue.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self.transport.close()
+
+_dispatcher: Optional[EmailDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher() -> EmailDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = EmailDispatcher(
+                    create_transport(settings.EMAIL_TRANSPORT),
+                    queue_size=settings.EMAIL_QUEUE_SIZE,
+                    workers=settings.EMAIL_WORKERS,
+                    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+                    backoff=settings.EMAIL_RETRY_BACKOFF_SECONDS,
+                )
+    return _dispatcher
+
+@metrics.register_collector
+def _email_metrics():
+    # Only reports once something has been sent; scraping never starts workers
+    if _dispatcher is None:
+        return
+    stats = _dispatcher.stats()
+    yield metrics.Sample("email_queue_depth", "gauge", "Emails waiting for delivery.", stats["queued"])
+    for outcome in ("sent", "failed", "dropped"):
+        yield metrics.Sample("email_messages_total", "counter", "Emails by final outcome.", stats[outcome], {"outcome": outcome})
+
+def shutdown_dispatcher(timeout: float = 10.0):
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher is not None:
+        dispatcher.close(timeout)
@@ -0,0 +1,324 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import bisect, logging, threading, time
+
+# Process-local metrics in the Prometheus text format (served at /metrics,
+# see api/metrics.py). Three parts:
+#
+#   * Counter / Gauge / Histogram: labelled series updated as things happen
+#     (requests, queries, uploads).
+#   * Collectors: callables run at scrape time that report state owned by
+#     other modules (pool usage, admin cache, admission control, email).
+#   * MetricsMiddleware + instrument_engine: per-route latency and per-request
+#     SQL query counts/time, tied together through a context variable.
+#
+# Each worker process keeps its own numbers; scrape every worker (or run one
+# per container, as the Dockerfile does).
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+SIZE_BUCKETS = (16e3, 64e3, 256e3, 1e6, 2e6, 5e6, 10e6, 20e6)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+@dataclass
+class Sample:
+    """One series reported by a collector."""
+    name: str
+    type_name: str
+    documentation: str
+    value: float
+    labels: Optional[Dict[str, str]] = None
+
+Collector = Callable[[], Iterable[Sample]]
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def register_collector(self, collector: Collector) -> Collector:
+        """Adds a scrape-time collector; usable as a decorator."""
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.render())
+
+        # Collector samples sharing a name are grouped under one HELP/TYPE
+        grouped: Dict[str, List[Sample]] = {}
+        for collector in self._collectors:
+            try:
+                for sample in collector():
+                    grouped.setdefault(sample.name, []).append(sample)
+            except Exception:
+                logger.exception("Metrics collector %s failed", getattr(collector, "__name__", collector))
+        for name, samples in grouped.items():
+            lines.append(f"# HELP {name} {samples[0].documentation}")
+            lines.append(f"# TYPE {name} {samples[0].type_name}")
+            for sample in samples:
+                labels = sample.labels or {}
+                lines.append(f"{name}{_format_labels(list(labels), list(labels.values()))} {_format_value(sample.value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+register_collector = REGISTRY.register_collector
+
+# --- HTTP ---
+
+http_requests = Counter("http_requests_total", "HTTP requests handled.", ("method", "route", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "Time to produce the full HTTP response.", ("method", "route"))
+http_request_queries = Histogram("http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "route"), buckets=QUERY_COUNT_BUCKETS)
+http_request_query_duration = Histogram("http_request_db_query_seconds", "Total SQL time per HTTP request.", ("method", "route"))
+http_requests_in_progress = Gauge("http_requests_in_progress", "HTTP requests currently being handled.")
+
+# --- Database ---
+
+db_queries = Counter("db_queries_total", "SQL statements executed.", ("engine",))
+db_query_duration = Histogram("db_query_duration_seconds", "Time per SQL statement.", ("engine",))
+db_pool_checkout_wait = Histogram("db_pool_checkout_wait_seconds", "Time spent getting a connection from the pool.", ("engine",))
+
+# --- Uploads ---
+
+upload_bytes = Histogram("receipt_upload_bytes", "Size of stored receipt uploads.", buckets=SIZE_BUCKETS)
+upload_duration = Histogram("receipt_upload_seconds", "Time to copy and hash a receipt upload into storage.")
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    query_seconds: float = 0.0
+
+# Set by MetricsMiddleware for the duration of a request. Sync endpoints run
+# in a copied context, so they share the same RequestStats object.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+SLOW_REQUEST_SECONDS = 1.0
+
+def route_template(scope) -> Optional[str]:
+    """
+    The matched route's full path template, e.g. /api/v1/dashboard/draws/{draw_id}.
+    The route object may only know its path relative to an included
+    router, so the prefix is recovered from the request path.
+    """
+    route = scope.get("route")
+    path_format = getattr(route, "path_format", None)
+    if path_format is None:
+        return None
+    try:
+        matched = path_format.format(**scope.get("path_params", {}))
+    except (KeyError, IndexError, ValueError):
+        return route.path
+    path = scope["path"]
+    prefix = path[:-len(matched)] if matched and path.endswith(matched) else ""
+    return prefix + route.path
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording per-route latency, status and SQL usage.
+    Routes are labelled by their path template, so ids never become labels.
+    """
+    def __init__(self, app, slow_request_seconds: float = SLOW_REQUEST_SECONDS):
+        self.app = app
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status = 500
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                streaming = any(name == b"content-type" and value.startswith(b"text/event-stream") for name, value in message.get("headers", ()))
+            await send(message)
+
+        http_requests_in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_progress.dec()
+            current_request.reset(token)
+            route_label = route_template(scope) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method=method, route=route_label, status=status)
+            http_request_duration.observe(elapsed, method=method, route=route_label)
+            http_request_queries.observe(stats.queries, method=method, route=route_label)
+            http_request_query_duration.observe(stats.query_seconds, method=method, route=route_label)
+            # Event streams are meant to stay open
+            if elapsed >= self.slow_request_seconds and not streaming:
+                logger.warning(
+                    "Slow request",
+                    extra={"method": method, "route": route_label, "status": status,
+                           "duration_ms": round(elapsed * 1000, 1), "db_queries": stats.queries,
+                           "db_ms": round(stats.query_seconds * 1000, 1)},
+                )
+
+def timed_pool(base: type) -> type:
+    """
+    A subclass of the pool class `base` that records how long each
+    checkout waited (pool exhausted, connect, pre-ping) in
+    db_pool_checkout_wait_seconds. Pass it as create_engine(poolclass=...);
+    instrument_engine labels it.
+    """
+    class TimedPool(base):
+        metrics_label = "default"
+
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                return super().connect()
+            finally:
+                db_pool_checkout_wait.observe(time.perf_counter() - start, engine=self.metrics_label)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+def instrument_engine(engine, label: str):
+    """
+    Counts and times every statement run on `engine` (and, inside a request,
+    adds them to the request's totals). Also reports its pool usage.
+    Accepts sync engines and the .sync_engine of async ones.
+    """
+    from sqlalchemy import event
+
+    if hasattr(engine.pool, "metrics_label"):
+        type(engine.pool).metrics_label = label
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        db_queries.inc(engine=label)
+        db_query_duration.observe(elapsed, engine=label)
+        stats = current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    @register_collector
+    def _pool_usage():
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return
+        labels = {"engine": label}
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        yield Sample("db_pool_size", "gauge", "Configured pool size (excluding overflow).", pool.size(), labels)
+        yield Sample("db_pool_checked_out", "gauge", "Connections currently checked out.", pool.checkedout(), labels)
+        yield Sample("db_pool_overflow", "gauge", "Overflow connections currently open.", max(pool.overflow(), 0), labels)
+        yield Sample("db_pool_utilization", "gauge", "Checked-out connections over pool capacity.", pool.checkedout() / capacity if capacity else 0, labels)
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,237 @@
+import fcntl
+import hashlib
+import hmac
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
+from .config import settings
+from ..db.models.otp import OTPCode
+
+# OTP stores
+# ----------
+# request-otp and verify-otp may be served by different workers, so where
+# codes live is pluggable (OTP_STORE):
+#   memory - this process only, swept by a background thread. Fine for a
+#            single worker and for development.
+#   file   - one small file per email under OTP_STORE_PATH (ideally tmpfs
+#            such as /dev/shm) with flock-based locking. Shared by all the
+#            workers on one host.
+#   sql    - the otp_codes table. Shared by every worker on every host.
+# Every backend stores a keyed hash of the code rather than the code, and
+# consumes it on the first successful verification.
+
+def _code_hash(email: str, otp: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), f"{email}:{otp}".encode(), hashlib.sha256).hexdigest()
+
+class OTPStore:
+    """Interface shared by the OTP backends."""
+
+    def put(self, email: str, otp: str, ttl: float):
+        """Stores a code for `email`, replacing any earlier one."""
+        raise NotImplementedError
+
+    def consume(self, email: str, otp: str) -> bool:
+        """Returns True and deletes the code if it matches and has not expired."""
+        raise NotImplementedError
+
+    def sweep(self) -> int:
+        """Deletes expired codes and returns how many were removed."""
+        raise NotImplementedError
+
+class MemoryOTPStore(OTPStore):
+    def __init__(self, sweep_interval: float = 60.0):
+        self.sweep_interval = sweep_interval
+        self._codes: dict[str, tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._sweeper: Optional[threading.Thread] = None
+
+    def _start_sweeper(self):
+        # Started lazily so importing the module never spawns a thread
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_forever, name="otp-sweeper", daemon=True)
+            self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+    def put(self, email: str, otp: str, ttl: float):
+        with self._lock:
+            self._codes[email] = (time.monotonic() + ttl, _code_hash(email, otp))
+            self._start_sweeper()
+
+    def consume(self, email: str, otp: str) -> bool:
+        with self._lock:
+            entry = self._codes.get(email)
+            if entry is None:
+                return False
+            expires_at, code_hash = entry
+            if expires_at <= time.monotonic():
+                del self._codes[email]
+                return False
+            if not hmac.compare_digest(code_hash, _code_hash(email, otp)):
+                return False
+            del self._codes[email]
+            return True
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [email for email, (expires_at, _) in self._codes.items() if expires_at <= now]
+            for email in expired:
+                del self._codes[email]
+        return len(expired)
+
+class FileOTPStore(OTPStore):
+    """
+    Codes are files named after a hash of the email, holding
+    "<expiry epoch> <code hash>". An exclusive flock on a lock file in the
+    same directory serialises every operation across processes.
+    """
+
+    def __init__(self, directory: str, sweep_interval: float = 60.0):
+        self.directory = directory
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._lock_path = os.path.join(directory, ".lock")
+
+    def _path(self, email: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(email.encode()).hexdigest())
+
+    def _locked(self):
+        lock = open(self._lock_path, "a")
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        return lock
+
+    @staticmethod
+    def _read(path: str) -> Optional[tuple[float, str]]:
+        try:
+            with open(path) as fh:
+                expires_at, code_hash = fh.read().split()
+            return float(expires_at), code_hash
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, email: str, otp: str, ttl: float):
+        path = self._path(email)
+        with self._locked():
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as fh:
+                fh.write(f"{time.time() + ttl} {_code_hash(email, otp)}")
+            os.replace(tmp_path, path)
+        # No long-lived thread here: every worker sweeps on its way past
+        if time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+            self.sweep()
+
+    def consume(self, email: str, otp: str) -> bool:
+        path = self._path(email)
+        with self._locked():
+            entry = self._read(path)
+            if entry is None:
+                return False
+            expires_at, code_hash = entry
+            if expires_at <= time.time():
+                os.unlink(path)
+                return False
+            if not hmac.compare_digest(code_hash, _code_hash(email, otp)):
+                return False
+            os.unlink(path)
+            return True
+
+    def sweep(self) -> int:
+        removed = 0
+        now = time.time()
+        with self._locked():
+            for name in os.listdir(self.directory):
+                if name.startswith("."):
+                    continue
+                path = os.path.join(self.directory, name)
+                entry = self._read(path)
+                if entry is None or entry[0] <= now:
+                    try:
+                        os.unlink(path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+        return removed
+
+class SQLOTPStore(OTPStore):
+    """
+    Codes in the otp_codes table. Each operation is a single statement in
+    its own short session, so concurrent workers cannot both consume one
+    code. Expired rows are swept opportunistically on put.
+    """
+
+    def __init__(self, session_factory, sweep_interval: float = 60.0):
+        self.session_factory = session_factory
+        self.sweep_interval = sweep_interval
+        self._next_sweep = 0.0
+
+    def put(self, email: str, otp: str, ttl: float):
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        db = self.session_factory()
+        try:
+            insert = sqlite.insert if db.get_bind().dialect.name == "sqlite" else postgresql.insert
+            stmt = insert(OTPCode).values(email=email, code_hash=_code_hash(email, otp), expires_at=expires_at)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[OTPCode.email],
+                set_={"code_hash": stmt.excluded.code_hash, "expires_at": stmt.excluded.expires_at},
+            ))
+            db.commit()
+        finally:
+            db.close()
+        if time.monotonic() >= self._next_sweep:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+            self.sweep()
+
+    def consume(self, email: str, otp: str) -> bool:
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                delete(OTPCode).where(
+                    OTPCode.email == email,
+                    OTPCode.code_hash == _code_hash(email, otp),
+                    OTPCode.expires_at > datetime.now(timezone.utc),
+                )
+            )
+            db.commit()
+            return result.rowcount == 1
+        finally:
+            db.close()
+
+    def sweep(self) -> int:
+        db = self.session_factory()
+        try:
+            result = db.execute(delete(OTPCode).where(OTPCode.expires_at <= datetime.now(timezone.utc)))
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+def create_otp_store(backend: str) -> OTPStore:
+    if backend == "memory":
+        return MemoryOTPStore(settings.OTP_SWEEP_INTERVAL_SECONDS)
+    if backend == "file":
+        return FileOTPStore(settings.OTP_STORE_PATH, settings.OTP_SWEEP_INTERVAL_SECONDS)
+    if backend == "sql":
+        from ..db.session import SessionLocal
+        return SQLOTPStore(SessionLocal, settings.OTP_SWEEP_INTERVAL_SECONDS)
+    raise ValueError(f"Unknown OTP_STORE {backend!r}; expected 'memory', 'file' or 'sql'")
+
+_store: Optional[OTPStore] = None
+_store_lock = threading.Lock()
+
+def get_otp_store() -> OTPStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = create_otp_store(settings.OTP_STORE)
+    return _store
@@ -0,0 +1,16 @@
+from fastapi.responses import Response
+import orjson
+
+class FastJSONResponse(Response):
+    """
+    JSON encoded with orjson, for payloads the service layer has already
+    built from trusted rows (dicts, lists, str, int, datetime). Returning it
+    from a route skips FastAPI's response_model validation and encoding; keep
+    response_model on the route so the OpenAPI schema stays accurate.
+
+    UTC datetimes are written with a "Z" suffix, as Pydantic does.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Boolean, DateTime, JSON, func
+from ..base import Base
+
+class WinnerDraw(Base):
+    """
+    Audit record of a winner draw. The seed, id bounds and cutoff are
+    enough to replay the draw and get the same winners, as long as the
+    eligible rows are unchanged; their count and id sum are recorded so a
+    replay can tell.
+    """
+    __tablename__ = "winner_draws"
+
+    id = Column(Integer, primary_key=True, index=True)
+    seed = Column(String, nullable=False)
+    winners_per_stratum = Column(Integer, nullable=False)
+    per_emirate = Column(Boolean, nullable=False, default=False)
+    emirate = Column(String, nullable=True)
+
+    # Only submissions with id_min <= id <= id_max took part in the draw
+    id_min = Column(Integer, nullable=False)
+    id_max = Column(Integer, nullable=False)
+    # ... and were submitted at or before the cutoff (NULL on older draws)
+    cutoff = Column(DateTime(timezone=True), nullable=True)
+    eligible_count = Column(Integer, nullable=True)
+    eligible_id_sum = Column(BigInteger, nullable=True)
+
+    winner_ids = Column(JSON, nullable=False)
+    drawn_by = Column(String, nullable=True)
+    drawn_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, DateTime
+from ..base import Base
+
+class OTPCode(Base):
+    """
+    Pending login code for an admin, shared by every API worker. Only a
+    keyed hash of the code is stored, and rows past expires_at are swept.
+    """
+    __tablename__ = "otp_codes"
+
+    email = Column(String, primary_key=True)
+    code_hash = Column(String(64), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
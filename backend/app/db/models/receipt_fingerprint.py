@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, SmallInteger, String, BigInteger, DateTime, ForeignKey, func
+from ..base import Base
+
+class ReceiptFingerprint(Base):
+    """
+    Perceptual hash of one stored receipt image, keyed by the receipt's
+    SHA-256 (see services/receipt_similarity.py).
+    """
+    __tablename__ = "receipt_fingerprints"
+
+    id = Column(Integer, primary_key=True)
+    receipt_hash = Column(String(64), nullable=False, unique=True)
+    # 64-bit dHash, stored as a signed BIGINT
+    phash = Column(BigInteger, nullable=False)
+    # Lowest fingerprint id of its near-duplicate cluster; NULL while it has no match
+    cluster_id = Column(Integer, nullable=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ReceiptMatch(Base):
+    """
+    Two fingerprints within DUPLICATE_MAX_DISTANCE bits of each other.
+    Each pair is stored once, with fingerprint_id > match_id.
+    """
+    __tablename__ = "receipt_matches"
+
+    fingerprint_id = Column(Integer, ForeignKey("receipt_fingerprints.id", ondelete="CASCADE"), primary_key=True)
+    match_id = Column(Integer, ForeignKey("receipt_fingerprints.id", ondelete="CASCADE"), primary_key=True)
+    distance = Column(SmallInteger, nullable=False)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, BigInteger
+from ..base import Base
+
+class EmirateSubmissionCount(Base):
+    """
+    Running submission count per emirate, bumped in the same transaction as
+    each insert so dashboard stats never have to scan `submissions`.
+    """
+    __tablename__ = "emirate_submission_counts"
+
+    emirate = Column(String, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
@@ -1,22 +1,59 @@
-from sqlalchemy import Column, Integer, String, DateTime, func
-from sqlalchemy_utils import EncryptedType
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, Index, func, text
+from datetime import datetime, timezone
 from ..base import Base 
-from ...core.config import settings
+from ...services.encryption import encrypted_property
 
-encryption_key = settings.SECRET_KEY
+# PII columns hold AES ciphertext (same format as the sqlalchemy_utils
+# EncryptedType they replaced, plus an optional key-id prefix). The raw bytes
+# are mapped as `_<field>` and decrypted lazily through the plaintext
+# `<field>` attribute.
+ENCRYPTED_FIELDS = ("name", "email", "mobile", "emirates_id")
 
 class Submission(Base):
     __tablename__ = "submissions"
 
     id = Column(Integer, primary_key=True, index=True)
     
-    name = Column(EncryptedType(String, encryption_key), nullable=False)
-    email = Column(EncryptedType(String, encryption_key), index=True, nullable=False)
-    mobile = Column(EncryptedType(String, encryption_key), index=True, nullable=False)
-    emirates_id = Column(EncryptedType(String, encryption_key), nullable=False)
+    _name = Column("name", LargeBinary, nullable=False)
+    _email = Column("email", LargeBinary, index=True, nullable=False)
+    _mobile = Column("mobile", LargeBinary, index=True, nullable=False)
+    _emirates_id = Column("emirates_id", LargeBinary, nullable=False)
+
+    name = encrypted_property("name")
+    email = encrypted_property("email")
+    mobile = encrypted_property("mobile")
+    emirates_id = encrypted_property("emirates_id")
     emirate = Column(String, index=True, nullable=False)
+
+    # Keyed HMACs of the normalised email/mobile (see services/encryption.py).
+    # Only set while ENFORCE_UNIQUE_EMAIL / ENFORCE_UNIQUE_MOBILE is on, so the
+    # partial unique indexes below enforce exactly what the settings ask for.
+    email_bidx = Column(String(64), nullable=True)
+    mobile_bidx = Column(String(64), nullable=True)
     
     receipt_url = Column(String, nullable=False)
     receipt_hash = Column(String, index=True, nullable=True) 
     
-    submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Set by the app, not the server default: SQLite's CURRENT_TIMESTAMP has
+    # no fraction ("2026-10-18 07:44:34") while bound datetimes are stored
+    # as "...34.000000", and the two do not compare correctly as text, so
+    # keyset cursors would skip rows. The server default only covers rows
+    # inserted outside the app.
+    submitted_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now())
+
+    __table_args__ = (
+        # Keyset pagination for the admin listing walks (submitted_at, id),
+        # optionally narrowed to one emirate.
+        Index("ix_submissions_submitted_at_id", "submitted_at", "id"),
+        Index("ix_submissions_emirate_submitted_at_id", "emirate", "submitted_at", "id"),
+        # Per-emirate id bounds and probes for stratified winner draws
+        Index("ix_submissions_emirate_id", "emirate", "id"),
+        Index(
+            "uq_submissions_email_bidx", "email_bidx", unique=True,
+            postgresql_where=text("email_bidx IS NOT NULL"), sqlite_where=text("email_bidx IS NOT NULL"),
+        ),
+        Index(
+            "uq_submissions_mobile_bidx", "mobile_bidx", unique=True,
+            postgresql_where=text("mobile_bidx IS NOT NULL"), sqlite_where=text("mobile_bidx IS NOT NULL"),
+        ),
+    )
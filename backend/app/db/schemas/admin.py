@@ -1,5 +1,6 @@
 from pydantic import BaseModel, EmailStr, ConfigDict
 from ..models.admin import AdminRole
+import enum
 
 # Schema for requesting an OTP
 class OTPRequest(BaseModel):
@@ -15,6 +16,17 @@ class Token(BaseModel):
     access_token: str
     token_type: str
 
+# What a link token may be used for
+class LinkScope(str, enum.Enum):
+    dashboard_stream = "dashboard_stream"
+    uploads = "uploads"
+
+# Schema for a link token response
+class LinkToken(BaseModel):
+    token: str
+    scope: LinkScope
+    expires_in: int
+
 # Base schema for an Admin user
 class AdminBase(BaseModel):
     email: EmailStr
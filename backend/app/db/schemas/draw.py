@@ -0,0 +1,41 @@
+from pydantic import BaseModel, Field, ConfigDict
+from datetime import datetime
+from typing import List, Optional
+from .submission import Submission
+
+# Schema for requesting a draw
+class DrawRequest(BaseModel):
+    winners: int = Field(1, ge=1, le=100, description="Winners to draw (per emirate when per_emirate is set).")
+    per_emirate: bool = False
+    emirate: Optional[str] = None
+    seed: Optional[str] = Field(None, max_length=128, description="Leave empty to use a fresh random seed.")
+
+# Schema for returning a recorded draw
+class Draw(BaseModel):
+    id: int
+    seed: str
+    winners_per_stratum: int
+    per_emirate: bool
+    emirate: Optional[str] = None
+    id_min: int
+    id_max: int
+    cutoff: Optional[datetime] = None
+    eligible_count: Optional[int] = None
+    winner_ids: List[int]
+    drawn_by: Optional[str] = None
+    drawn_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class DrawWithWinners(Draw):
+    winners: List[Submission]
+
+# Schema for the result of replaying a draw
+class DrawVerification(BaseModel):
+    draw_id: int
+    reproducible: bool
+    # False when rows were added to or removed from the eligible set since
+    # the draw (None for draws recorded without its size)
+    eligible_unchanged: Optional[bool] = None
+    recorded_winner_ids: List[int]
+    replayed_winner_ids: List[int]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 
 # Schema for the data coming from the frontend form
 class SubmissionCreate(BaseModel):
@@ -33,9 +33,35 @@ class Submission(BaseModel):
     emirates_id: str
     emirate: str
     receipt_url: str
+    # Downscaled copies for the admin grid; None until rendered or for non-images
+    thumbnail_url: Optional[str] = None
+    review_url: Optional[str] = None
     submitted_at: datetime
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Result of a bulk ingest (POST /submissions/ingest)
+class IngestRowError(BaseModel):
+    line: int
+    error: str
+
+class IngestResult(BaseModel):
+    rows: int
+    inserted: int
+    failed: int
+    seconds: float
+    rows_per_second: float
+    # Capped; `failed` has the full count
+    errors: List[IngestRowError]
+
+class DuplicateReceipt(BaseModel):
+    receipt_hash: str
+    receipt_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    submission_ids: List[int]
 
-model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+class DuplicateCluster(BaseModel):
+    """Receipts that look alike (perceptual hashes within max_distance bits)."""
+    receipts: List[DuplicateReceipt]
+    submissions: int
+    max_distance: int
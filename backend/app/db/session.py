@@ -1,10 +1,57 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from ..core.config import settings
+from ..core import metrics
+from .replica import ReplicaMonitor, replica_reads
 
-engine = create_engine(settings.DATABASE_URL)
+engine = create_engine(settings.DATABASE_URL, poolclass=metrics.timed_pool(QueuePool))
+metrics.instrument_engine(engine, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Optional async engine for the submission pipeline (USE_ASYNC_DB=true).
+# Only built when enabled so the async driver is not required otherwise.
+async_engine = None
+AsyncSessionLocal = None
+if settings.USE_ASYNC_DB:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    async_engine = create_async_engine(settings.ASYNC_DATABASE_URL, poolclass=metrics.timed_pool(AsyncAdaptedQueuePool))
+    metrics.instrument_engine(async_engine.sync_engine, "primary_async")
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Optional read replica for read-only admin endpoints (READ_DATABASE_URL).
+# Its own pool, so long exports never hold primary connections.
+read_engine = None
+ReadSessionLocal = None
+replica = None
+if settings.READ_DATABASE_URL:
+    # Fail fast when the replica host is down instead of waiting on TCP
+    connect_args = {"connect_timeout": 2} if make_url(settings.READ_DATABASE_URL).get_backend_name() == "postgresql" else {}
+    read_engine = create_engine(
+        settings.READ_DATABASE_URL,
+        poolclass=metrics.timed_pool(QueuePool),
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+    metrics.instrument_engine(read_engine, "replica")
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+    replica = ReplicaMonitor(read_engine, settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_CHECK_INTERVAL_SECONDS)
+    metrics.register_collector(replica.collect)
+
+def read_session() -> Session:
+    """
+    A session for read-only work: on the replica when one is configured,
+    reachable and caught up, otherwise on the primary.
+    """
+    if replica is not None and replica.usable():
+        replica_reads.inc(target="replica")
+        return ReadSessionLocal()
+    replica_reads.inc(target="primary")
+    return SessionLocal()
+
 # Dependency to get a DB session
 def get_db():
     db = SessionLocal()
@@ -12,3 +59,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency for read-only endpoints; never write through it
+def get_read_db():
+    db = read_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
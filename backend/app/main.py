@@ -1,40 +1,69 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware # Import the middleware
 from .api.v1.routes import api_router
-from .db.base import Base
-from .db.session import engine, SessionLocal
-from .services import admin_service
-from fastapi.staticfiles import StaticFiles
-import os
-
-
-# Create all database tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Back to School Campaign API")
-UPLOAD_DIRECTORY = os.getenv("UPLOAD_DIRECTORY", "/app/uploads")
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIRECTORY), name="uploads")
-
-# --- ADD THIS MIDDLEWARE ---
-# This tells FastAPI to trust the X-Forwarded-Proto header sent by your Nginx proxy.
-app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
-# -------------------------
-
-# Use the full /api/v1 prefix to match the Nginx location block
-app.include_router(api_router, prefix="/api/v1")
-
-@app.on_event("startup")
-def on_startup():
-    """
-    Event handler for application startup.
-    Creates the global admin if it doesn't exist.
-    """
-    db = SessionLocal()
-    try:
-        admin_service.create_global_admin_if_not_exists(db)
-    finally:
-        db.close()
-
-@app.get('/')
-def root():
-    return {"message": "Hello from backend!"}
+from .api import health, uploads, metrics as metrics_api
+from .core.config import settings
+from .core.logging_config import configure_logging
+from .core.metrics import MetricsMiddleware
+from .core.mailer import shutdown_dispatcher
+from .core.admission import AdmissionControlMiddleware, submission_admission
+from .services.receipt_derivatives import shutdown_pool
+from .services import receipt_storage, receipt_similarity
+import threading
+
+# Importing this module does no database work. The schema is managed by
+# Alembic and the global admin by app.commands.bootstrap, both run once per
+# deploy before the workers start (see docker-compose.yml):
+#
+#     python -m app.commands.migrate && python -m app.commands.bootstrap
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.DUPLICATE_DETECTION_ENABLED and settings.DERIVATIVES_ENABLED:
+        # In the background, so a large table does not hold up startup
+        threading.Thread(target=receipt_similarity.load_index, name="similarity-index", daemon=True).start()
+    yield
+    # Gives queued emails (e.g. OTPs) a chance to go out before exit
+    shutdown_dispatcher()
+    # Renders still queued are picked up later by the backfill command
+    shutdown_pool(wait=False)
+
+def create_app() -> FastAPI:
+    configure_logging()
+    app = FastAPI(title="Back to School Campaign API", lifespan=lifespan)
+
+    # Shed submission bursts early. Added before ProxyHeadersMiddleware so it
+    # runs inside it and sees the real client address.
+    if settings.ADMISSION_CONTROL_ENABLED:
+        app.add_middleware(
+            AdmissionControlMiddleware,
+            controller=submission_admission,
+            paths=["/api/v1/submissions"],
+        )
+
+    # Outermost of the app's own middleware, so rejected submissions are
+    # counted and timed too
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware, slow_request_seconds=settings.SLOW_REQUEST_MS / 1000)
+
+    # Take the client address and scheme from X-Forwarded-* headers, but
+    # only when they come from the Nginx proxy (FORWARDED_ALLOW_IPS)
+    app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=settings.FORWARDED_ALLOW_IPS)
+
+    # Use the full /api/v1 prefix to match the Nginx location block
+    app.include_router(api_router, prefix="/api/v1")
+    # Receipts and their derivatives (see api/uploads.py)
+    app.include_router(uploads.router, prefix=receipt_storage.UPLOAD_URL_PREFIX, tags=["Uploads"])
+    # Liveness/readiness probes live outside /api/v1 for the orchestrator
+    app.include_router(health.router, tags=["Health"])
+    if settings.METRICS_ENABLED:
+        app.include_router(metrics_api.router, tags=["Health"])
+
+    @app.get('/')
+    def root():
+        return {"message": "Hello from backend!"}
+
+    return app
+
+app = create_app()
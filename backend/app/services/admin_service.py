@@ -1,18 +1,73 @@
 from sqlalchemy.orm import Session
+from dataclasses import dataclass
 from ..db.models.admin import Admin, AdminRole
 from ..db.schemas.admin import AdminCreate
+from ..core.cache import TTLCache
 from ..core.config import settings
+from ..core import metrics
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class CachedAdmin:
+    """Detached snapshot of an admin's identity and role, safe to share between requests."""
+    id: int
+    email: str
+    role: AdminRole
+    is_active: bool
+
+# Authenticated admins keyed by token subject (email), so protected requests
+# don't each need a query. Only found admins are cached.
+_admin_cache = TTLCache(maxsize=settings.ADMIN_CACHE_SIZE, ttl=settings.ADMIN_CACHE_TTL_SECONDS)
 
 def get_admin_by_email(db: Session, email: str) -> Admin | None:
     """Fetches an admin by their email address."""
     return db.query(Admin).filter(Admin.email == email).first()
 
+def get_authenticated_admin(db: Session, email: str) -> CachedAdmin | None:
+    """Returns the admin for a token subject, from the cache when possible."""
+    cached = _admin_cache.get(email)
+    if cached is not None:
+        return cached
+    admin = get_admin_by_email(db, email=email)
+    if admin is None:
+        return None
+    cached = CachedAdmin(id=admin.id, email=admin.email, role=admin.role, is_active=bool(admin.is_active))
+    _admin_cache.set(email, cached)
+    return cached
+
+def invalidate_admin(email: str):
+    _admin_cache.invalidate(email)
+
+def admin_cache_stats() -> dict:
+    return _admin_cache.stats()
+
+@metrics.register_collector
+def _admin_cache_metrics():
+    stats = admin_cache_stats()
+    yield metrics.Sample("admin_cache_entries", "gauge", "Admins currently in the auth cache.", stats["size"])
+    yield metrics.Sample("admin_cache_hits_total", "counter", "Auth cache hits.", stats["hits"])
+    yield metrics.Sample("admin_cache_misses_total", "counter", "Auth cache misses.", stats["misses"])
+
 def create_admin(db: Session, admin: AdminCreate) -> Admin:
     """Creates a new admin in the database."""
     db_admin = Admin(email=admin.email, role=admin.role)
     db.add(db_admin)
     db.commit()
     db.refresh(db_admin)
+    invalidate_admin(db_admin.email)
+    return db_admin
+
+def deactivate_admin(db: Session, admin_id: int) -> Admin | None:
+    """Marks an admin inactive; their existing tokens stop working."""
+    db_admin = db.get(Admin, admin_id)
+    if db_admin is None:
+        return None
+    db_admin.is_active = False
+    db.commit()
+    db.refresh(db_admin)
+    invalidate_admin(db_admin.email)
     return db_admin
 
 def create_global_admin_if_not_exists(db: Session):
@@ -22,10 +77,10 @@ def create_global_admin_if_not_exists(db: Session):
     """
     global_admin = get_admin_by_email(db, email=settings.GLOBAL_ADMIN_EMAIL)
     if not global_admin:
-        print(f"Global admin {settings.GLOBAL_ADMIN_EMAIL} not found, creating...")
+        logger.info("Global admin not found, creating", extra={"email": settings.GLOBAL_ADMIN_EMAIL})
         admin_in = AdminCreate(
             email=settings.GLOBAL_ADMIN_EMAIL,
             role=AdminRole.GLOBAL_ADMIN
         )
         create_admin(db, admin_in)
-        print("Global admin created successfully.")
\ No newline at end of file
+        logger.info("Global admin created", extra={"email": settings.GLOBAL_ADMIN_EMAIL})
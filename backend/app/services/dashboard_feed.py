@@ -0,0 +1,196 @@
+from collections import deque
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set
+from starlette.concurrency import run_in_threadpool
+from ..core.config import settings
+from ..core import metrics
+from ..db.session import SessionLocal
+from . import dashboard_service
+import asyncio, logging, threading, time
+import orjson
+
+# Live dashboard feed
+# -------------------
+# GET /dashboard/stream is a Server-Sent Events stream of dashboard stats.
+# One hub per worker process serves every connected admin:
+#
+#   * publish() is called by whatever records submissions (create_submission,
+#     bulk ingest), from any thread. It only adds to a pending buffer and
+#     wakes the hub, so it never waits on a subscriber.
+#   * The hub flushes at most once per DASHBOARD_STREAM_INTERVAL_SECONDS,
+#     coalescing a burst of entries into one "delta" event, and encodes each
+#     event once for all subscribers.
+#   * Each subscriber has a bounded queue. A client that falls that far
+#     behind has its backlog dropped and gets a fresh "stats" snapshot
+#     instead, so a slow connection never holds up the others.
+#   * Entries recorded by other workers (or the ingest command) are not
+#     published here; while anyone is connected, the hub re-reads the stats
+#     every DASHBOARD_STREAM_RESYNC_SECONDS (one uncached read of the
+#     counters on the primary, for all subscribers) and sends a snapshot
+#     when they differ from its own running totals.
+#
+# Streams end after DASHBOARD_STREAM_MAX_SECONDS, so workers can shut down;
+# the client then reconnects with a fresh short-lived stream token, which
+# re-checks the admin.
+
+logger = logging.getLogger(__name__)
+
+RECENT_LIMIT = 20
+KEEPALIVE_SECONDS = 15.0
+RECONNECT_MS = 3000
+
+# None in a queue means "you missed events; send a fresh snapshot"
+_RESYNC = None
+
+def _event(name: str, data: dict) -> bytes:
+    return b"event: " + name.encode() + b"\ndata: " + orjson.dumps(data, option=orjson.OPT_UTC_Z) + b"\n\n"
+
+class DashboardHub:
+    def __init__(self, interval: float, resync_interval: float, queue_size: int):
+        self.interval = interval
+        self.resync_interval = resync_interval
+        self.queue_size = queue_size
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pending_counts: Dict[str, int] = {}
+        self._pending_recent: deque = deque(maxlen=RECENT_LIMIT)
+        self._counts: Optional[Dict[str, int]] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._resynced_at = 0.0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, counts: Dict[str, int], recent: Iterable[dict] = ()):
+        """
+        Records new submissions (emirate -> how many, plus optional
+        {id, emirate, submitted_at} entries). Thread-safe and non-blocking;
+        a no-op while nobody is connected to this worker.
+        """
+        loop = self._loop
+        if loop is None or not self._subscribers:
+            return
+        with self._lock:
+            for emirate, count in counts.items():
+                self._pending_counts[emirate] = self._pending_counts.get(emirate, 0) + count
+            self._pending_recent.extend(recent)
+        try:
+            loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            # The loop has been closed (shutdown)
+            pass
+
+    def _snapshot(self) -> bytes:
+        counts = {emirate: count for emirate, count in self._counts.items() if count}
+        return _event("stats", {"total_submissions": sum(counts.values()), "submissions_by_emirate": counts})
+
+    def _broadcast(self, message: bytes):
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too slow: drop its backlog and resend the whole state instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_RESYNC)
+                self.dropped += 1
+
+    def _flush(self):
+        with self._lock:
+            counts, self._pending_counts = self._pending_counts, {}
+            recent = list(self._pending_recent)
+            self._pending_recent.clear()
+        if not counts:
+            return
+        for emirate, count in counts.items():
+            self._counts[emirate] = self._counts.get(emirate, 0) + count
+        # The new totals ride along, so a client never has to sum deltas itself
+        self._broadcast(_event("delta", {
+            "by_emirate": counts,
+            "total_submissions": sum(self._counts.values()),
+            "submissions_by_emirate": {emirate: count for emirate, count in self._counts.items() if count},
+            "recent": recent,
+        }))
+
+    def _read_counts(self) -> Dict[str, int]:
+        # From the primary and uncached: the running totals already include
+        # this worker's own commits, and a lagging replica or a cached
+        # snapshot would send them backwards
+        db = SessionLocal()
+        try:
+            return dashboard_service.read_emirate_counts(db)
+        finally:
+            db.close()
+
+    async def _resync(self):
+        counts = await run_in_threadpool(self._read_counts)
+        self._resynced_at = time.monotonic()
+        current = {emirate: count for emirate, count in self._counts.items() if count}
+        if counts != current:
+            self._counts = counts
+            self._broadcast(self._snapshot())
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.resync_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if not self._subscribers:
+                continue
+            self._flush()
+            if time.monotonic() - self._resynced_at >= self.resync_interval:
+                try:
+                    await self._resync()
+                except Exception:
+                    logger.exception("Dashboard feed resync failed")
+            # Coalescing window: whatever arrives meanwhile goes out as one event
+            await asyncio.sleep(self.interval)
+
+    async def _ensure_running(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        if self._counts is None or not self._subscribers:
+            # Nothing was tracked while nobody was connected
+            self._counts = await run_in_threadpool(self._read_counts)
+            self._resynced_at = time.monotonic()
+
+    async def stream(self, max_seconds: float):
+        """Yields SSE bytes for one client until it disconnects or `max_seconds` pass."""
+        await self._ensure_running()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield f"retry: {RECONNECT_MS}\n\n".encode() + self._snapshot()
+            deadline = time.monotonic() + max_seconds
+            while (remaining := deadline - time.monotonic()) > 0:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=min(KEEPALIVE_SECONDS, remaining))
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield self._snapshot() if message is _RESYNC else message
+        finally:
+            self._subscribers.discard(queue)
+
+hub = DashboardHub(
+    interval=settings.DASHBOARD_STREAM_INTERVAL_SECONDS,
+    resync_interval=settings.DASHBOARD_STREAM_RESYNC_SECONDS,
+    queue_size=settings.DASHBOARD_STREAM_QUEUE_SIZE,
+)
+
+def publish_submission(submission_id: int, emirate: str, submitted_at: Optional[datetime]):
+    hub.publish({emirate: 1}, [{"id": submission_id, "emirate": emirate, "submitted_at": submitted_at}])
+
+@metrics.register_collector
+def _feed_metrics():
+    yield metrics.Sample("dashboard_stream_subscribers", "gauge", "Admins connected to the live dashboard feed.", hub.subscribers)
+    yield metrics.Sample("dashboard_stream_dropped_total", "counter", "Times a slow feed subscriber had its backlog replaced by a snapshot.", hub.dropped)
@@ -1,39 +1,89 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql, sqlite
 from ..db.models.submission import Submission
+from ..db.models.stats import EmirateSubmissionCount
 from ..db.schemas.dashboard import DashboardStats
+from ..core.cache import TTLCache
+from ..core.config import settings
+from . import winner_selection
 from typing import Dict
-import random
+
+_STATS_KEY = "dashboard_stats"
+_stats_cache = TTLCache(maxsize=1, ttl=settings.DASHBOARD_STATS_TTL_SECONDS)
+
+def emirate_count_increment(dialect_name: str, emirate: str, delta: int = 1):
+    """
+    Builds an upsert that bumps one emirate's counter. Run it in the same
+    transaction as the INSERT so the counters never drift from the table.
+    """
+    insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+    stmt = insert(EmirateSubmissionCount).values(emirate=emirate, count=delta)
+    return stmt.on_conflict_do_update(
+        index_elements=[EmirateSubmissionCount.emirate],
+        set_={"count": EmirateSubmissionCount.count + stmt.excluded.count},
+    )
+
+def record_submission(db: Session, emirate: str, delta: int = 1):
+    """Bumps the emirate counter inside the caller's transaction (no commit)."""
+    db.execute(emirate_count_increment(db.get_bind().dialect.name, emirate, delta))
+
+def invalidate_stats_cache():
+    _stats_cache.invalidate(_STATS_KEY)
+
+def read_emirate_counts(db: Session) -> Dict[str, int]:
+    """The per-emirate counters as they are in `db` now (no cache)."""
+    return {
+        emirate: count
+        for emirate, count in db.query(EmirateSubmissionCount.emirate, EmirateSubmissionCount.count)
+        if count
+    }
 
 def get_dashboard_stats(db: Session) -> DashboardStats:
     """
     Calculates and returns key statistics for the admin dashboard.
+    Reads the per-emirate counters (one row per emirate) and keeps the
+    result in a short-lived in-process cache.
     """
-    total_submissions = db.query(Submission).count()
-    emirate_counts_query = db.query(
-        Submission.emirate, 
-        func.count(Submission.emirate).label("count")
-    ).group_by(Submission.emirate).all()
-    submissions_by_emirate: Dict[str, int] = {
-        emirate: count for emirate, count in emirate_counts_query
-    }
-    return DashboardStats(
-        total_submissions=total_submissions,
+    cached = _stats_cache.get(_STATS_KEY)
+    if cached is not None:
+        return cached
+
+    submissions_by_emirate = read_emirate_counts(db)
+    stats = DashboardStats(
+        total_submissions=sum(submissions_by_emirate.values()),
         submissions_by_emirate=submissions_by_emirate
     )
+    _stats_cache.set(_STATS_KEY, stats)
+    return stats
+
+def reconcile_counters(db: Session) -> Dict[str, int]:
+    """
+    Rebuilds the emirate counters from the submissions table.
+    On Postgres the counter table is locked first, so in-flight submissions
+    finish before the recount and new ones wait until it commits.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"LOCK TABLE {EmirateSubmissionCount.__tablename__} IN EXCLUSIVE MODE"))
+    counts = db.query(
+        Submission.emirate,
+        func.count(Submission.id).label("count")
+    ).group_by(Submission.emirate).all()
+
+    db.query(EmirateSubmissionCount).delete(synchronize_session=False)
+    db.add_all(EmirateSubmissionCount(emirate=emirate, count=count) for emirate, count in counts)
+    db.commit()
+    invalidate_stats_cache()
+    return {emirate: count for emirate, count in counts}
 
-def select_random_winner(db: Session) -> Submission | None:
+def select_random_winner(db: Session, drawn_by: str | None = None) -> Submission | None:
     """
     Selects a single random winner from all submissions.
+    The draw is recorded by the winner_selection engine so it can be audited.
     """
-    # Fetch all submission IDs first to be memory efficient
-    submission_ids = db.query(Submission.id).all()
-    if not submission_ids:
+    try:
+        draw = winner_selection.draw_winners(db, k=1, drawn_by=drawn_by)
+    except winner_selection.DrawError:
         return None
-    
-    # Choose a random ID from the list
-    random_submission_id = random.choice(submission_ids)[0]
-    
-    # Fetch the full submission object for the chosen ID
-    winner = db.query(Submission).filter(Submission.id == random_submission_id).first()
-    return winner
+    winners = winner_selection.get_winners(db, draw)
+    return winners[0] if winners else None
@@ -0,0 +1,253 @@
+from sqlalchemy import LargeBinary, type_coerce
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.types import TypeDecorator
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from ..core.config import settings
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import base64, hashlib, hmac, re
+
+# --- Blind indexes ---
+# A keyed HMAC of a normalised value, stored next to the ciphertext so
+# equality lookups and UNIQUE constraints work without decrypting anything.
+
+def _blind_index_key() -> bytes:
+    if settings.BLIND_INDEX_KEY:
+        return settings.BLIND_INDEX_KEY.encode()
+    # Derive a separate key rather than reusing the JWT/encryption secret as-is
+    return hmac.new(settings.SECRET_KEY.encode(), b"submissions-blind-index", hashlib.sha256).digest()
+
+_BLIND_INDEX_KEY = _blind_index_key()
+_non_digits_re = re.compile(r"\D+")
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+def normalize_mobile(mobile: str) -> str:
+    """Reduces UAE numbers to one canonical form, e.g. 971501234567."""
+    digits = _non_digits_re.sub("", mobile)
+    if digits.startswith("00"):
+        digits = digits[2:]
+    elif digits.startswith("0"):
+        digits = "971" + digits[1:]
+    return digits
+
+def blind_index(value: str, kind: str) -> str:
+    """HMAC-SHA256 of a normalised value; `kind` keeps email and mobile digests apart."""
+    message = f"{kind}:{value}".encode()
+    return hmac.new(_BLIND_INDEX_KEY, message, hashlib.sha256).hexdigest()
+
+def email_blind_index(email: str) -> str:
+    return blind_index(normalize_email(email), "email")
+
+def mobile_blind_index(mobile: str) -> str:
+    return blind_index(normalize_mobile(mobile), "mobile")
+
+# --- Column encryption ---
+# Compatible byte-for-byte with the sqlalchemy_utils EncryptedType(String, key)
+# columns this table was created with (AES-256-CBC, key = SHA-256(secret),
+# IV = key[:16], '*' padding, base64 stored as bytes), so existing rows read
+# back unchanged. The differences are that the cipher is built once per key
+# instead of once per value, values are decrypted only when an attribute is
+# read, and whole batches can be decrypted with a single OpenSSL call.
+
+_BLOCK = 16
+_PAD = b"*"
+
+class AesCipher:
+    def __init__(self, secret: str):
+        digest = hashes.Hash(hashes.SHA256())
+        digest.update(secret.encode() if isinstance(secret, str) else secret)
+        key = digest.finalize()
+        self._iv = key[:_BLOCK]
+        self._iv_int = int.from_bytes(self._iv, "big")
+        self._cbc = Cipher(algorithms.AES(key), modes.CBC(self._iv))
+        self._ecb = Cipher(algorithms.AES(key), modes.ECB())
+
+    def encrypt(self, value: str) -> bytes:
+        data = value.encode()
+        data += _PAD * (_BLOCK - len(data) % _BLOCK)
+        encryptor = self._cbc.encryptor()
+        return base64.b64encode(encryptor.update(data) + encryptor.finalize())
+
+    def decrypt(self, value: bytes) -> str:
+        decryptor = self._cbc.decryptor()
+        data = decryptor.update(base64.b64decode(value)) + decryptor.finalize()
+        return data.rstrip(_PAD).decode()
+
+    def encrypt_many(self, values: Sequence[Optional[str]]) -> List[Optional[bytes]]:
+        return [None if value is None else self.encrypt(value) for value in values]
+
+    def decrypt_many(self, values: Sequence[Optional[bytes]]) -> List[Optional[str]]:
+        """
+        Decrypts a batch with one ECB pass over the concatenated ciphertexts,
+        then applies each value's CBC chaining (XOR with the IV or the
+        previous ciphertext block) as a single big-integer XOR per value.
+        """
+        raw = [None if value is None else base64.b64decode(value) for value in values]
+        decryptor = self._ecb.decryptor()
+        blocks = decryptor.update(b"".join(r for r in raw if r)) + decryptor.finalize()
+
+        out: List[Optional[str]] = []
+        offset = 0
+        for ciphertext in raw:
+            if ciphertext is None:
+                out.append(None)
+                continue
+            size = len(ciphertext)
+            chain = (self._iv_int << (8 * (size - _BLOCK))) | int.from_bytes(ciphertext[:-_BLOCK], "big")
+            plain = int.from_bytes(blocks[offset:offset + size], "big") ^ chain
+            offset += size
+            out.append(plain.to_bytes(size, "big").rstrip(_PAD).decode())
+        return out
+
+@lru_cache(maxsize=None)
+def get_cipher(secret: str) -> AesCipher:
+    return AesCipher(secret)
+
+# --- Key versioning ---
+# Ciphertext written under key id N > 0 is stored as b"vN$" + base64. Values
+# without a prefix predate key versioning and belong to key 0, which is the
+# legacy SECRET_KEY unless ENCRYPTION_KEYS defines it explicitly. Base64
+# never contains "$", so the two forms cannot be confused.
+
+_key_prefix_re = re.compile(rb"^v(\d+)\$")
+
+def parse_keys(spec: str) -> Dict[int, str]:
+    """Parses ENCRYPTION_KEYS ("1:secret-one,2:secret-two") into {id: secret}."""
+    keys: Dict[int, str] = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        key_id, sep, secret = item.partition(":")
+        if not sep or not key_id.isdigit() or not secret:
+            raise ValueError(f"Malformed ENCRYPTION_KEYS entry: {item!r}")
+        keys[int(key_id)] = secret
+    return keys
+
+class Keyring:
+    """Encrypts with the active key and decrypts with whichever key wrote the value."""
+
+    def __init__(self, secrets: Dict[int, str], active_id: int):
+        if active_id not in secrets:
+            raise ValueError(f"Active encryption key {active_id} is not configured")
+        self.secrets = dict(secrets)
+        self.active_id = active_id
+        self._ciphers = {key_id: get_cipher(secret) for key_id, secret in secrets.items()}
+        self._prefix = f"v{active_id}$".encode() if active_id else b""
+
+    @staticmethod
+    def key_id(value: bytes) -> int:
+        match = _key_prefix_re.match(value)
+        return int(match.group(1)) if match else 0
+
+    def _split(self, value: bytes) -> tuple[AesCipher, bytes]:
+        match = _key_prefix_re.match(value)
+        key_id = int(match.group(1)) if match else 0
+        cipher = self._ciphers.get(key_id)
+        if cipher is None:
+            raise KeyError(f"Encryption key {key_id} is not configured")
+        return cipher, value[match.end():] if match else value
+
+    def encrypt(self, value: str) -> bytes:
+        return self._prefix + self._ciphers[self.active_id].encrypt(value)
+
+    def decrypt(self, value: bytes) -> str:
+        cipher, ciphertext = self._split(bytes(value))
+        return cipher.decrypt(ciphertext)
+
+    def encrypt_many(self, values: Sequence[Optional[str]]) -> List[Optional[bytes]]:
+        return [None if value is None else self.encrypt(value) for value in values]
+
+    def decrypt_many(self, values: Sequence[Optional[bytes]]) -> List[Optional[str]]:
+        """Batched decrypt; values are grouped by key so each key gets one pass."""
+        groups: Dict[int, tuple[AesCipher, list, list]] = {}
+        for position, value in enumerate(values):
+            if value is None:
+                continue
+            cipher, ciphertext = self._split(bytes(value))
+            group = groups.setdefault(id(cipher), (cipher, [], []))
+            group[1].append(position)
+            group[2].append(ciphertext)
+
+        out: List[Optional[str]] = [None] * len(values)
+        for cipher, positions, ciphertexts in groups.values():
+            for position, plain in zip(positions, cipher.decrypt_many(ciphertexts)):
+                out[position] = plain
+        return out
+
+def build_keyring(keys_spec: str, active_id: Optional[int], legacy_secret: str) -> Keyring:
+    secrets = {0: legacy_secret}
+    secrets.update(parse_keys(keys_spec))
+    return Keyring(secrets, max(secrets) if active_id is None else active_id)
+
+@lru_cache(maxsize=None)
+def get_keyring() -> Keyring:
+    return build_keyring(settings.ENCRYPTION_KEYS, settings.ENCRYPTION_KEY_ID, settings.SECRET_KEY)
+
+class EncryptedString(TypeDecorator):
+    """
+    Drop-in for EncryptedType(String, key) that reuses one cipher per key
+    and understands versioned keys. Used directly for column expressions;
+    ORM attributes go through encrypted_property so rows are only
+    decrypted when read.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else get_keyring().encrypt(str(value))
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else get_keyring().decrypt(value)
+
+_CACHE_ATTR = "_decrypted_values"
+
+def encrypted_property(name: str) -> hybrid_property:
+    """
+    Exposes the raw ciphertext column mapped as `_<name>` as a plaintext
+    attribute `<name>`.
+
+    On instances the value is decrypted on first read and cached until the
+    ciphertext changes. In queries it is an EncryptedString expression, so
+    select(Model.name) decrypts. Comparisons such as Model.email == x
+    encrypt x with the active key, so they only match rows already written
+    under that key.
+    """
+    ciphertext_attr = f"_{name}"
+
+    def fget(self):
+        ciphertext = getattr(self, ciphertext_attr)
+        if ciphertext is None:
+            return None
+        cache = self.__dict__.setdefault(_CACHE_ATTR, {})
+        cached = cache.get(name)
+        if cached is not None and cached[0] is ciphertext:
+            return cached[1]
+        value = get_keyring().decrypt(ciphertext)
+        cache[name] = (ciphertext, value)
+        return value
+
+    def fset(self, value):
+        ciphertext = None if value is None else get_keyring().encrypt(str(value))
+        setattr(self, ciphertext_attr, ciphertext)
+        if ciphertext is not None:
+            self.__dict__.setdefault(_CACHE_ATTR, {})[name] = (ciphertext, str(value))
+
+    def expr(cls):
+        return type_coerce(getattr(cls, ciphertext_attr), EncryptedString()).label(name)
+
+    return hybrid_property(fget, fset, expr=expr)
+
+def bulk_decrypt(rows: Sequence[Any], fields: Iterable[str]) -> Sequence[Any]:
+    """
+    Decrypts the given encrypted_property fields for a list of ORM rows in
+    one batch per field and primes each row's cache, so later attribute
+    reads (e.g. by Pydantic) cost nothing.
+    """
+    keyring = get_keyring()
+    for name in fields:
+        ciphertexts = [getattr(row, f"_{name}") for row in rows]
+        for row, ciphertext, value in zip(rows, ciphertexts, keyring.decrypt_many(ciphertexts)):
+            if ciphertext is not None:
+                row.__dict__.setdefault(_CACHE_ATTR, {})[name] = (ciphertext, value)
+    return rows
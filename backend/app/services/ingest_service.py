@@ -0,0 +1,369 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from fastapi import HTTPException
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import BinaryIO, Dict, Iterator, List, Optional, TextIO
+from concurrent.futures import ProcessPoolExecutor
+from ..db.models.submission import Submission, ENCRYPTED_FIELDS
+from ..db.schemas.submission import SubmissionCreate
+from ..core.config import settings
+from . import receipt_storage, submission_service, dashboard_service, dashboard_feed, encryption
+from .encryption import Keyring
+import csv, posixpath, time, zipfile
+
+# Bulk ingest
+# -----------
+# Loads offline batches (kiosks, partner retailers): a CSV with one row per
+# entry and a zip archive holding the receipts it names. The CSV is read as
+# a stream and handled in chunks of INGEST_BATCH_SIZE rows:
+#   * each row is validated like a web submission; bad rows are reported
+#     with their line number and skipped
+#   * rows that would break uniqueness (see below) are dropped before their
+#     receipts are stored
+#   * receipts go through the same content-addressed store as uploads, each
+#     archive member stored once however many rows use it; thumbnails are
+#     only queued for rows that were inserted. Receipts are shared, so
+#     files stored for rows the database still rejected are not deleted
+#     here (another entry may be about to use them); prune_receipts sweeps
+#     them once they have gone unused for a while
+#   * the chunk's PII is encrypted one field at a time (encrypt_many) and
+#     inserted with a single executemany, together with the emirate counter
+#     bumps, in one transaction
+# Validation (email checks dominate) and encryption are CPU-bound, so with
+# `workers` they run in a process pool, a bounded number of chunks ahead of
+# the inserts, which stay in file order in this process.
+# Uniqueness (ENFORCE_UNIQUE_*) is checked by the same blind indexes as the
+# web path: duplicates within the file or against the table are reported.
+# The insert itself still uses ON CONFLICT DO NOTHING, for rows that a web
+# submission claimed in the meantime.
+#
+# The admin endpoint takes batches up to INGEST_HTTP_MAX_ROWS; larger ones
+# go through `python -m app.commands.ingest`.
+
+REQUIRED_COLUMNS = ("name", "email", "mobile", "emirates_id", "emirate", "receipt")
+OPTIONAL_COLUMNS = ("submitted_at",)
+
+class IngestFormatError(ValueError):
+    """The CSV or archive cannot be read at all (as opposed to a bad row)."""
+
+@dataclass
+class RowError:
+    line: int
+    error: str
+
+@dataclass
+class IngestReport:
+    rows: int = 0
+    inserted: int = 0
+    errors: List[RowError] = field(default_factory=list)
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+class ReceiptArchive:
+    """
+    Resolves the receipt names used in the CSV to stored receipts. A name
+    may be the member's full path in the archive or, when unambiguous, just
+    its file name.
+    """
+    def __init__(self, fileobj: BinaryIO, queue_derivatives: bool = True):
+        try:
+            self._zip = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile as e:
+            raise IngestFormatError(f"Receipts archive is not a valid zip file: {e}")
+        self._members = {info.filename: info for info in self._zip.infolist() if not info.is_dir()}
+        by_basename: Dict[str, list] = {}
+        for info in self._members.values():
+            by_basename.setdefault(posixpath.basename(info.filename), []).append(info)
+        self._by_basename = by_basename
+        self._stored: Dict[str, tuple[str, str]] = {}
+        self._queued: set = set()
+        self.queue_derivatives = queue_derivatives
+
+    def _member(self, name: str) -> zipfile.ZipInfo:
+        name = name.strip().removeprefix("./").lstrip("/")
+        if name in self._members:
+            return self._members[name]
+        matches = self._by_basename.get(posixpath.basename(name), [])
+        if len(matches) == 1:
+            return matches[0]
+        raise ValueError(f"Receipt {name!r} is {'ambiguous' if matches else 'not'} in the archive")
+
+    def store(self, name: str) -> tuple[str, str]:
+        """Returns (receipt_url, sha256) for a receipt name, storing it on first use."""
+        info = self._member(name)
+        if info.filename in self._stored:
+            return self._stored[info.filename]
+        if info.file_size > receipt_storage.MAX_RECEIPT_SIZE:
+            raise ValueError(f"Receipt {info.filename!r} is larger than {settings.MAX_RECEIPT_SIZE_MB} MB")
+        with self._zip.open(info) as src:
+            try:
+                relpath, file_hash = receipt_storage.store_stream(src, receipt_storage.normalize_ext(info.filename))
+            except HTTPException as e:
+                raise ValueError(e.detail)
+        url = receipt_storage.receipt_url(relpath)
+        self._stored[info.filename] = (url, file_hash)
+        return url, file_hash
+
+    def settle(self, inserted: List[dict]):
+        """After a chunk: queues thumbnails for the receipts of inserted rows."""
+        if not self.queue_derivatives:
+            return
+        for params in inserted:
+            file_hash = params["receipt_hash"]
+            if file_hash not in self._queued:
+                self._queued.add(file_hash)
+                submission_service.queue_derivatives(params["receipt_url"], file_hash)
+
+    def close(self):
+        self._zip.close()
+
+def _parse_submitted_at(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"submitted_at {value!r} is not an ISO 8601 timestamp")
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+
+def _read_records(csv_file: TextIO, report: IngestReport) -> Iterator[tuple[int, dict]]:
+    """Yields (line number, stripped values) for every CSV record."""
+    reader = csv.DictReader(csv_file)
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or ())]
+    if missing:
+        raise IngestFormatError(f"CSV is missing columns: {', '.join(missing)}")
+    for record in reader:
+        report.rows += 1
+        yield reader.line_num, {key: (value or "").strip() for key, value in record.items() if key in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+
+def _chunks(records: Iterator, size: int) -> Iterator[list]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+_worker_keyring: Optional[Keyring] = None
+
+def _init_worker(secrets: dict, active_id: int):
+    global _worker_keyring
+    _worker_keyring = Keyring(secrets, active_id)
+
+def _prepare_chunk(records: List[tuple[int, dict]]) -> tuple[list, List[RowError]]:
+    """
+    Validates and encrypts a chunk of CSV records (in a worker process when
+    a pool is used). Returns ([(line, receipt name, insert params)], errors);
+    receipt_url/receipt_hash are filled in once the receipt is stored.
+    """
+    keyring = _worker_keyring or encryption.get_keyring()
+    valid, errors = [], []
+    for line, values in records:
+        try:
+            submission = SubmissionCreate(**{key: values[key] for key in REQUIRED_COLUMNS if key != "receipt"})
+            submitted_at = _parse_submitted_at(values.get("submitted_at"))
+            if not values["receipt"]:
+                raise ValueError("receipt is empty")
+        except ValidationError as e:
+            errors.append(RowError(line, _validation_message(e)))
+            continue
+        except ValueError as e:
+            errors.append(RowError(line, str(e)))
+            continue
+        valid.append((line, values["receipt"], submission, submitted_at))
+
+    ciphertexts = {name: keyring.encrypt_many([getattr(row[2], name) for row in valid]) for name in ENCRYPTED_FIELDS}
+    prepared = []
+    for i, (line, receipt, submission, submitted_at) in enumerate(valid):
+        prepared.append((line, receipt, {
+            **{name: ciphertexts[name][i] for name in ENCRYPTED_FIELDS},
+            "emirate": submission.emirate,
+            "email_bidx": encryption.email_blind_index(submission.email) if settings.ENFORCE_UNIQUE_EMAIL else None,
+            "mobile_bidx": encryption.mobile_blind_index(submission.mobile) if settings.ENFORCE_UNIQUE_MOBILE else None,
+            "submitted_at": submitted_at,
+        }))
+    return prepared, errors
+
+def _attach_receipts(prepared: list, archive: ReceiptArchive, report: IngestReport) -> List[tuple[int, dict]]:
+    """Stores each row's receipt; returns (line, params) for the rows whose receipt could be stored."""
+    now = datetime.now(timezone.utc)
+    rows = []
+    for line, receipt, params in prepared:
+        try:
+            params["receipt_url"], params["receipt_hash"] = archive.store(receipt)
+        except (ValueError, OSError, zipfile.BadZipFile) as e:
+            report.errors.append(RowError(line, str(e)))
+            continue
+        # Executemany needs the same keys in every row, so the server
+        # default cannot be used for rows without a timestamp
+        params["submitted_at"] = params["submitted_at"] or now
+        rows.append((line, params))
+    return rows
+
+def _unique_key(params: dict) -> tuple:
+    return params["email_bidx"], params["mobile_bidx"]
+
+def _duplicate_field(params: dict, taken_emails: set, taken_mobiles: set) -> str:
+    if params["email_bidx"] and params["email_bidx"] in taken_emails:
+        return "email"
+    if params["mobile_bidx"] and params["mobile_bidx"] in taken_mobiles:
+        return "mobile number"
+    return "email or mobile number"
+
+def _existing_keys(db: Session, params: list) -> tuple[set, set]:
+    """The email/mobile blind indexes among `params` that the table already holds."""
+    table = Submission.__table__
+    emails = [values["email_bidx"] for values in params if values["email_bidx"]]
+    mobiles = [values["mobile_bidx"] for values in params if values["mobile_bidx"]]
+    existing_emails = set(db.scalars(select(table.c.email_bidx).where(table.c.email_bidx.in_(emails)))) if emails else set()
+    existing_mobiles = set(db.scalars(select(table.c.mobile_bidx).where(table.c.mobile_bidx.in_(mobiles)))) if mobiles else set()
+    return existing_emails, existing_mobiles
+
+def _drop_duplicates(db: Session, prepared: list, report: IngestReport) -> list:
+    """
+    Reports and drops rows that repeat an earlier row's email/mobile or one
+    already in the table, before their receipts are stored.
+    """
+    if not (settings.ENFORCE_UNIQUE_EMAIL or settings.ENFORCE_UNIQUE_MOBILE):
+        return prepared
+    existing_emails, existing_mobiles = _existing_keys(db, [params for _, _, params in prepared])
+    # Earlier rows in the file win, as they would have over the web
+    taken_emails, taken_mobiles, kept = set(), set(), []
+    for line, receipt, values in prepared:
+        if (values["email_bidx"] and values["email_bidx"] in existing_emails) or (values["mobile_bidx"] and values["mobile_bidx"] in existing_mobiles):
+            field_name = _duplicate_field(values, existing_emails, existing_mobiles)
+            report.errors.append(RowError(line, str(submission_service.DuplicateSubmissionError(field_name))))
+        elif (values["email_bidx"] and values["email_bidx"] in taken_emails) or (values["mobile_bidx"] and values["mobile_bidx"] in taken_mobiles):
+            field_name = _duplicate_field(values, taken_emails, taken_mobiles)
+            report.errors.append(RowError(line, f"A submission with this {field_name} already appears earlier in the file."))
+        else:
+            taken_emails.add(values["email_bidx"])
+            taken_mobiles.add(values["mobile_bidx"])
+            kept.append((line, receipt, values))
+    return kept
+
+def _insert_chunk(db: Session, rows: List[tuple[int, dict]], report: IngestReport) -> List[dict]:
+    """
+    Inserts one chunk and bumps the counters in a single transaction.
+    Returns the params of the rows that were inserted.
+    """
+    table = Submission.__table__
+    inserted = rows
+
+    if settings.ENFORCE_UNIQUE_EMAIL or settings.ENFORCE_UNIQUE_MOBILE:
+        # Only rows claimed since _drop_duplicates can still conflict
+        insert = sqlite.insert if db.get_bind().dialect.name == "sqlite" else postgresql.insert
+        stmt = insert(table).on_conflict_do_nothing().returning(table.c.email_bidx, table.c.mobile_bidx)
+        created = {tuple(result) for result in db.execute(stmt, [values for _, values in rows])}
+        inserted = [(line, values) for line, values in rows if _unique_key(values) in created]
+        rejected = [(line, values) for line, values in rows if _unique_key(values) not in created]
+        if rejected:
+            existing_emails, existing_mobiles = _existing_keys(db, [values for _, values in rejected])
+            for line, values in rejected:
+                report.errors.append(RowError(line, str(submission_service.DuplicateSubmissionError(_duplicate_field(values, existing_emails, existing_mobiles)))))
+    elif rows:
+        db.execute(table.insert(), [values for _, values in rows])
+
+    counts = Counter(values["emirate"] for _, values in inserted)
+    for emirate, count in counts.items():
+        dashboard_service.record_submission(db, emirate, count)
+    db.commit()
+    dashboard_feed.hub.publish(counts)
+    report.inserted += len(inserted)
+    return [values for _, values in inserted]
+
+def _insert_isolating_failures(db: Session, rows: List[tuple[int, dict]], report: IngestReport) -> List[dict]:
+    """
+    Inserts a chunk; if the database rejects it as a whole, retries row by
+    row so one bad row costs only itself. Returns the inserted rows' params.
+    """
+    if not rows:
+        return []
+    try:
+        return _insert_chunk(db, rows, report)
+    except SQLAlchemyError as e:
+        db.rollback()
+        if len(rows) == 1:
+            report.errors.append(RowError(rows[0][0], f"Database error: {e.__class__.__name__}"))
+            return []
+        inserted = []
+        for row in rows:
+            inserted.extend(_insert_isolating_failures(db, [row], report))
+        return inserted
+
+def count_rows(csv_file: TextIO) -> int:
+    """Counts a CSV's records (without the header) and rewinds it."""
+    try:
+        rows = sum(1 for _ in csv.reader(csv_file)) - 1
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise IngestFormatError(f"CSV could not be read: {e}")
+    finally:
+        csv_file.seek(0)
+    return max(rows, 0)
+
+def ingest(
+    db: Session,
+    csv_file: TextIO,
+    receipts: BinaryIO,
+    batch_size: Optional[int] = None,
+    workers: int = 0,
+    queue_derivatives: bool = True,
+) -> IngestReport:
+    """
+    Loads a CSV batch whose `receipt` column names files in the `receipts`
+    zip archive. Returns counts and per-row errors; raises IngestFormatError
+    only when the input cannot be read at all. Each chunk is committed as it
+    goes, so a report with errors still reflects the rows that were loaded.
+
+    With workers > 1, validation and encryption run in that many processes.
+    """
+    report = IngestReport()
+    start = time.perf_counter()
+    archive = ReceiptArchive(receipts, queue_derivatives=queue_derivatives)
+
+    def load(prepared, errors):
+        report.errors.extend(errors)
+        rows = _attach_receipts(_drop_duplicates(db, prepared, report), archive, report)
+        archive.settle(_insert_isolating_failures(db, rows, report))
+
+    chunks = _chunks(_read_records(csv_file, report), batch_size or settings.INGEST_BATCH_SIZE)
+    try:
+        if workers > 1:
+            keyring = encryption.get_keyring()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(keyring.secrets, keyring.active_id)) as pool:
+                in_flight = deque()
+                for records in chunks:
+                    in_flight.append(pool.submit(_prepare_chunk, records))
+                    if len(in_flight) >= 2 * workers:
+                        load(*in_flight.popleft().result())
+                while in_flight:
+                    load(*in_flight.popleft().result())
+        else:
+            for records in chunks:
+                load(*_prepare_chunk(records))
+    except (UnicodeDecodeError, csv.Error) as e:
+        if not report.rows:
+            raise IngestFormatError(f"CSV could not be read: {e}")
+        # Chunks before the unreadable line are already committed
+        report.errors.append(RowError(report.rows + 1, f"CSV could not be read past this row: {e}"))
+    finally:
+        archive.close()
+        if report.inserted:
+            dashboard_service.invalidate_stats_cache()
+            submission_service.invalidate_names_cache()
+    report.errors.sort(key=lambda error: error.line)
+    report.seconds = time.perf_counter() - start
+    return report
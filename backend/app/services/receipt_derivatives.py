@@ -0,0 +1,178 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from ..core.config import settings
+from ..core import metrics
+from . import receipt_storage
+import logging, multiprocessing, os, tempfile, threading
+
+# Receipt derivatives
+# -------------------
+# Every stored receipt image gets two downscaled JPEGs next to the
+# content-addressed store, keyed by the receipt's SHA-256:
+#   {UPLOAD_DIRECTORY}/derived/ab/cd/{hash}_thumb.jpg   grid thumbnail
+#   {UPLOAD_DIRECTORY}/derived/ab/cd/{hash}_review.jpg  review-sized copy
+# They are rendered in a process pool after the upload has been stored, so
+# neither the request nor the event loop waits on image decoding. Receipts
+# Pillow cannot read (e.g. PDFs) simply get no derivatives, and the admin UI
+# falls back to the original. Pillow itself is optional; without it the
+# pipeline is disabled.
+#
+# The same decode also yields the receipt's perceptual hash, which
+# receipt_similarity.py records to catch re-photographed duplicates.
+
+logger = logging.getLogger(__name__)
+
+DERIVED_DIR = "derived"
+VARIANTS = {
+    "thumb": (settings.THUMBNAIL_SIZE, settings.THUMBNAIL_QUALITY),
+    "review": (settings.REVIEW_IMAGE_SIZE, settings.REVIEW_IMAGE_QUALITY),
+}
+
+def derivative_relpath(file_hash: str, variant: str) -> str:
+    return os.path.join(DERIVED_DIR, receipt_storage.shard_dir(file_hash), f"{file_hash}_{variant}.jpg")
+
+def derivative_path(file_hash: str, variant: str) -> str:
+    return os.path.join(receipt_storage.UPLOAD_DIRECTORY, derivative_relpath(file_hash, variant))
+
+def derivative_url(file_hash: Optional[str], variant: str) -> Optional[str]:
+    """URL of a rendered derivative, or None if it does not exist (yet)."""
+    if not file_hash:
+        return None
+    try:
+        path = derivative_path(file_hash, variant)
+    except ValueError:
+        return None
+    return receipt_storage.receipt_url(derivative_relpath(file_hash, variant)) if os.path.isfile(path) else None
+
+def has_derivatives(file_hash: str) -> bool:
+    return all(os.path.isfile(derivative_path(file_hash, variant)) for variant in VARIANTS)
+
+def pillow_available() -> bool:
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def perceptual_hash(image) -> int:
+    """
+    64-bit difference hash (dHash) of a Pillow image: each bit says whether a
+    pixel of the 9x8 grayscale thumbnail is brighter than its right-hand
+    neighbour. Survives rescaling, recompression and small crops or
+    lighting changes.
+    """
+    from PIL import Image
+
+    pixels = list(image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+def render_derivatives(src_path: str, file_hash: str) -> Optional[int]:
+    """
+    Renders every variant of one receipt and returns its perceptual hash.
+    Runs in a worker process. Returns None if the file is not an image
+    Pillow can read.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    largest = max(size for size, _ in VARIANTS.values())
+    try:
+        with Image.open(src_path) as image:
+            # Let the JPEG decoder downscale while decoding (much faster for big photos)
+            image.draft("RGB", (largest, largest))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            directory = os.path.dirname(derivative_path(file_hash, "thumb"))
+            os.makedirs(directory, exist_ok=True)
+            # Largest first so each smaller variant is resized from the previous one
+            for variant, (size, quality) in sorted(VARIANTS.items(), key=lambda item: -item[1][0]):
+                image.thumbnail((size, size), Image.Resampling.LANCZOS)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=receipt_storage.TEMP_PREFIX, suffix=".part")
+                try:
+                    with os.fdopen(fd, "wb") as out:
+                        image.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+                    os.chmod(tmp_path, 0o644)
+                    os.replace(tmp_path, derivative_path(file_hash, variant))
+                except BaseException:
+                    os.unlink(tmp_path)
+                    raise
+            # From the smallest variant; cheap and just as good
+            return perceptual_hash(image)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        return None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending: set[str] = set()
+_lock = threading.Lock()
+
+def get_pool(replace_broken: Optional[ProcessPoolExecutor] = None) -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is not None and _pool is replace_broken:
+            # A worker died (e.g. OOM on a huge image); start a fresh pool
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+        if _pool is None:
+            # spawn: forking a threaded server process is not safe
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.DERIVATIVE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+def _finished(file_hash: str, future: Future):
+    with _lock:
+        _pending.discard(file_hash)
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        logger.warning("Rendering derivatives failed", extra={"receipt_hash": file_hash, "error": str(future.exception())})
+        return
+    phash = future.result()
+    if phash is not None and settings.DUPLICATE_DETECTION_ENABLED:
+        # Imported here: receipt_similarity needs the models, which import this module
+        from . import receipt_similarity
+        try:
+            receipt_similarity.record(file_hash, phash)
+        except Exception:
+            logger.exception("Recording receipt fingerprint failed", extra={"receipt_hash": file_hash})
+
+def schedule(src_path: str, file_hash: str) -> Optional[Future]:
+    """
+    Queues derivative rendering for a stored receipt and returns at once.
+    Does nothing if the pipeline is disabled or the hash is already queued.
+    """
+    if not settings.DERIVATIVES_ENABLED or not pillow_available():
+        return None
+    with _lock:
+        if file_hash in _pending:
+            return None
+        _pending.add(file_hash)
+    try:
+        pool = get_pool()
+        try:
+            future = pool.submit(render_derivatives, src_path, file_hash)
+        except BrokenProcessPool:
+            future = get_pool(replace_broken=pool).submit(render_derivatives, src_path, file_hash)
+    except BaseException:
+        with _lock:
+            _pending.discard(file_hash)
+        raise
+    future.add_done_callback(lambda f: _finished(file_hash, f))
+    return future
+
+def shutdown_pool(wait: bool = True):
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=not wait)
+
+@metrics.register_collector
+def _derivative_metrics():
+    with _lock:
+        pending = len(_pending)
+    yield metrics.Sample("receipt_derivatives_pending", "gauge", "Receipts queued or rendering in the derivative pool.", pending)
@@ -0,0 +1,331 @@
+from array import array
+from itertools import combinations
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core import metrics
+from ..db.session import SessionLocal
+from ..db.models.receipt_fingerprint import ReceiptFingerprint, ReceiptMatch
+from ..db.models.submission import Submission
+from . import receipt_derivatives
+import logging, threading, time
+
+# Near-duplicate receipts
+# -----------------------
+# receipt_hash only matches byte-identical files. Re-photographed,
+# re-cropped or recompressed receipts are caught by their perceptual hash
+# (receipt_derivatives.perceptual_hash), computed by the derivative workers
+# off the request path: images that look alike differ in few of its 64 bits.
+#
+# Each new fingerprint is stored in receipt_fingerprints and looked up in an
+# in-memory multi-index hash table; every receipt within
+# DUPLICATE_MAX_DISTANCE bits is stored as a pair in receipt_matches.
+# Suspected duplicate clusters are the connected components of those pairs,
+# kept in receipt_fingerprints.cluster_id as pairs are added, so listing
+# them never compares images or walks every pair.
+#
+# The index is per process. It is loaded from receipt_fingerprints at
+# startup (two integer columns, a few seconds per million receipts) and
+# topped up from the table before every lookup, so fingerprints recorded by
+# other workers are matched too. Lookups are serialized across workers (see
+# record()), so of two look-alikes recorded at once the later one always
+# sees the earlier.
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+LOAD_BATCH_SIZE = 50_000
+
+def _to_signed(value: int) -> int:
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+def _to_unsigned(value: int) -> int:
+    return value & ((1 << HASH_BITS) - 1)
+
+def _flip_masks(bits: int, radius: int) -> List[int]:
+    """Every `bits`-wide mask with at most `radius` bits set."""
+    return [sum(1 << bit for bit in combo) for r in range(radius + 1) for combo in combinations(range(bits), r)]
+
+class HammingIndex:
+    """
+    Multi-index hashing over 64-bit hashes. Each hash is split into four
+    16-bit chunks, with one table per chunk. Two hashes within k bits of
+    each other differ in at most k // 4 bits on at least one chunk, so a
+    lookup only probes the buckets that close to its own chunks (137 per
+    chunk for k = 8) and checks the few hashes found there, instead of
+    scanning every stored hash.
+    """
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        self._masks = _flip_masks(CHUNK_BITS, max_distance // CHUNKS)
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(CHUNKS)]
+        self._ids = array("q")
+        self._hashes = array("Q")
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, item_id: int, value: int):
+        position = len(self._ids)
+        self._ids.append(item_id)
+        self._hashes.append(value)
+        for chunk, table in enumerate(self._tables):
+            key = (value >> (chunk * CHUNK_BITS)) & CHUNK_MASK
+            bucket = table.get(key)
+            if bucket is None:
+                table[key] = [position]
+            else:
+                bucket.append(position)
+
+    def search(self, value: int, max_distance: Optional[int] = None) -> List[Tuple[int, int]]:
+        """(id, distance) of every stored hash within `max_distance` bits of `value`."""
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        hashes, ids = self._hashes, self._ids
+        seen = set()
+        found = []
+        for chunk, table in enumerate(self._tables):
+            key = (value >> (chunk * CHUNK_BITS)) & CHUNK_MASK
+            for mask in self._masks:
+                bucket = table.get(key ^ mask)
+                if not bucket:
+                    continue
+                for position in bucket:
+                    if position in seen:
+                        continue
+                    seen.add(position)
+                    distance = (hashes[position] ^ value).bit_count()
+                    if distance <= limit:
+                        found.append((ids[position], distance))
+        return found
+
+_index: Optional[HammingIndex] = None
+_loaded_through = 0
+# Ids below _loaded_through not seen yet, with when they were first missed.
+# Postgres hands out ids before commit, so a lower id can still appear
+# after a higher one has been loaded; rolled-back ids never do, and are
+# forgotten after GAP_SECONDS.
+_gaps: Dict[int, float] = {}
+_lock = threading.Lock()
+
+GAP_WINDOW = 1000
+GAP_SECONDS = 300.0
+# Arbitrary key for pg_advisory_xact_lock, unique among this app's locks
+RECORD_LOCK_KEY = 7_023_001
+
+def _refresh(db: Session) -> HammingIndex:
+    """
+    Adds fingerprints recorded since the last call (all of them the first
+    time), including late commits of ids that were skipped. Hold _lock.
+    """
+    global _index, _loaded_through
+    if _index is None:
+        _index = HammingIndex(settings.DUPLICATE_MAX_DISTANCE)
+    now = time.monotonic()
+    for gap in [gap for gap, missed_at in _gaps.items() if now - missed_at > GAP_SECONDS]:
+        del _gaps[gap]
+
+    while True:
+        condition = ReceiptFingerprint.id > _loaded_through
+        if _gaps:
+            condition = or_(condition, ReceiptFingerprint.id.in_(list(_gaps)))
+        rows = db.execute(
+            select(ReceiptFingerprint.id, ReceiptFingerprint.phash)
+            .where(condition)
+            .order_by(ReceiptFingerprint.id)
+            .limit(LOAD_BATCH_SIZE)
+        ).all()
+        previous = _loaded_through
+        for fingerprint_id, phash in rows:
+            _index.add(fingerprint_id, _to_unsigned(phash))
+            _gaps.pop(fingerprint_id, None)
+        if rows and rows[-1][0] > previous:
+            _loaded_through = rows[-1][0]
+            loaded = {fingerprint_id for fingerprint_id, _ in rows}
+            for missing in range(max(previous + 1, _loaded_through - GAP_WINDOW), _loaded_through):
+                if missing not in loaded:
+                    _gaps.setdefault(missing, now)
+        if len(rows) < LOAD_BATCH_SIZE:
+            return _index
+
+def load_index():
+    """
+    Builds this process's index from receipt_fingerprints. Safe to call
+    again; a failed load is retried by the next record().
+    """
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        with _lock:
+            size = len(_refresh(db))
+    except Exception:
+        logger.exception("Loading the receipt similarity index failed")
+        return
+    finally:
+        db.close()
+    logger.info("Receipt similarity index loaded", extra={"fingerprints": size, "seconds": round(time.perf_counter() - started, 2)})
+
+def _insert(dialect_name: str, model):
+    return (sqlite.insert if dialect_name == "sqlite" else postgresql.insert)(model)
+
+def _merge_clusters(db: Session, fingerprint_id: int, matched_ids: List[int]):
+    """
+    Puts a new fingerprint and everything it matched into one cluster,
+    merging their existing clusters. A cluster's id is its lowest
+    fingerprint id.
+    """
+    members = [fingerprint_id, *matched_ids]
+    existing = set(db.scalars(
+        select(ReceiptFingerprint.cluster_id)
+        .where(ReceiptFingerprint.id.in_(matched_ids), ReceiptFingerprint.cluster_id.is_not(None))
+    ))
+    target = min(existing | set(members))
+    db.execute(
+        update(ReceiptFingerprint)
+        .where(or_(ReceiptFingerprint.id.in_(members), ReceiptFingerprint.cluster_id.in_(existing)))
+        .values(cluster_id=target)
+    )
+
+def record(file_hash: str, phash: int) -> int:
+    """
+    Stores a receipt's perceptual hash and its pairs with every known
+    receipt within DUPLICATE_MAX_DISTANCE bits, and updates its cluster.
+    Returns how many receipts it matched; 0 also if it was already recorded.
+
+    Recorders are serialized across processes until they commit, so two
+    look-alike receipts fingerprinted at the same moment in different
+    workers still find each other: on Postgres with an advisory lock, on
+    SQLite by the write lock the insert takes.
+    """
+    matches: List[Tuple[int, int]] = []
+    db = SessionLocal()
+    try:
+        dialect_name = db.get_bind().dialect.name
+        with _lock:
+            if dialect_name == "postgresql":
+                db.execute(select(func.pg_advisory_xact_lock(RECORD_LOCK_KEY)))
+            fingerprint_id = db.execute(
+                _insert(dialect_name, ReceiptFingerprint)
+                .values(receipt_hash=file_hash, phash=_to_signed(phash))
+                .on_conflict_do_nothing(index_elements=[ReceiptFingerprint.receipt_hash])
+                .returning(ReceiptFingerprint.id)
+            ).scalar_one_or_none()
+            if fingerprint_id is None:
+                db.rollback()
+                return 0
+            # Only now, holding the lock: sees everything committed before us
+            index = _refresh(db)
+            matches = [(other, distance) for other, distance in index.search(phash) if other != fingerprint_id]
+            if matches:
+                db.execute(
+                    _insert(dialect_name, ReceiptMatch).on_conflict_do_nothing(),
+                    [
+                        {"fingerprint_id": max(fingerprint_id, other), "match_id": min(fingerprint_id, other), "distance": distance}
+                        for other, distance in matches
+                    ],
+                )
+                _merge_clusters(db, fingerprint_id, [other for other, _ in matches])
+            db.commit()
+    finally:
+        db.close()
+    if matches:
+        logger.info("Receipt resembles earlier receipts", extra={"receipt_hash": file_hash, "matches": len(matches)})
+    return len(matches)
+
+def find_clusters(db: Session, max_distance: Optional[int] = None, skip: int = 0, limit: int = 100) -> List[dict]:
+    """
+    One page of suspected duplicate clusters, largest first, with the
+    submissions that used each receipt. Clusters are maintained by record(),
+    so only the page's own fingerprints and pairs are read. A `max_distance`
+    tighter than DUPLICATE_MAX_DISTANCE splits each cluster on the page
+    along its closer pairs (parts left with one receipt are dropped).
+    """
+    size = func.count().label("size")
+    page = db.execute(
+        select(ReceiptFingerprint.cluster_id, size)
+        .where(ReceiptFingerprint.cluster_id.is_not(None))
+        .group_by(ReceiptFingerprint.cluster_id)
+        .order_by(size.desc(), ReceiptFingerprint.cluster_id)
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    if not page:
+        return []
+
+    receipt_hashes: Dict[int, str] = {}
+    clusters: Dict[int, List[int]] = {cluster_id: [] for cluster_id, _ in page}
+    for fingerprint_id, cluster_id, receipt_hash in db.execute(
+        select(ReceiptFingerprint.id, ReceiptFingerprint.cluster_id, ReceiptFingerprint.receipt_hash)
+        .where(ReceiptFingerprint.cluster_id.in_(list(clusters)))
+        .order_by(ReceiptFingerprint.id)
+    ):
+        receipt_hashes[fingerprint_id] = receipt_hash
+        clusters[cluster_id].append(fingerprint_id)
+
+    query = select(ReceiptMatch.fingerprint_id, ReceiptMatch.match_id, ReceiptMatch.distance).where(
+        ReceiptMatch.fingerprint_id.in_(list(receipt_hashes))
+    )
+    if max_distance is not None:
+        query = query.where(ReceiptMatch.distance <= max_distance)
+
+    # Union-find over the page's pairs (one part per cluster unless max_distance splits it)
+    parent: Dict[int, int] = {}
+    def root(node: int) -> int:
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    pairs = db.execute(query).all()
+    for a, b, _ in pairs:
+        ra, rb = root(a), root(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    widest: Dict[int, int] = {}
+    for a, _, distance in pairs:
+        group = root(a)
+        widest[group] = max(widest.get(group, 0), distance)
+
+    submissions: Dict[str, List[int]] = {}
+    urls: Dict[str, str] = {}
+    for submission_id, receipt_hash, receipt_url in db.execute(
+        select(Submission.id, Submission.receipt_hash, Submission.receipt_url)
+        .where(Submission.receipt_hash.in_(list(receipt_hashes.values())))
+        .order_by(Submission.id)
+    ):
+        submissions.setdefault(receipt_hash, []).append(submission_id)
+        urls.setdefault(receipt_hash, receipt_url)
+
+    result = []
+    for members in clusters.values():
+        parts: Dict[int, List[int]] = {}
+        for node in members:
+            parts.setdefault(root(node), []).append(node)
+        for group, nodes in parts.items():
+            if len(nodes) < 2:
+                continue
+            receipts = [
+                {
+                    "receipt_hash": receipt_hashes[node],
+                    "receipt_url": urls.get(receipt_hashes[node]),
+                    "thumbnail_url": receipt_derivatives.derivative_url(receipt_hashes[node], "thumb"),
+                    "submission_ids": submissions.get(receipt_hashes[node], []),
+                }
+                for node in nodes
+            ]
+            result.append({
+                "receipts": receipts,
+                "submissions": sum(len(receipt["submission_ids"]) for receipt in receipts),
+                "max_distance": widest.get(group, 0),
+            })
+    return result
+
+@metrics.register_collector
+def _similarity_metrics():
+    index = _index
+    if index is not None:
+        yield metrics.Sample("receipt_similarity_index_size", "gauge", "Receipt fingerprints in this process's similarity index.", len(index))
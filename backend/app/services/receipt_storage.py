@@ -0,0 +1,154 @@
+from fastapi import UploadFile, HTTPException
+from typing import BinaryIO, Optional
+from ..core.config import settings
+from ..core import metrics
+import hashlib, os, re, tempfile, time
+
+# Receipts are stored content-addressed under nested hash-prefix directories:
+#   {UPLOAD_DIRECTORY}/ab/cd/abcd1234...{ext}
+# so each unique file is written once and no directory grows without bound.
+UPLOAD_DIRECTORY = settings.UPLOAD_DIRECTORY
+UPLOAD_URL_PREFIX = "/uploads"
+MAX_RECEIPT_SIZE = settings.MAX_RECEIPT_SIZE_MB * 1024 * 1024
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+_hash_re = re.compile(r"^[0-9a-f]{64}$")
+_ext_re = re.compile(r"^\.[a-z0-9]{1,10}$")
+TEMP_PREFIX = ".upload-"
+
+def _receipt_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Receipt file is too large. The maximum size is {settings.MAX_RECEIPT_SIZE_MB} MB.",
+    )
+
+def normalize_ext(filename: Optional[str]) -> str:
+    """Returns a safe, lower-case extension (including the dot) or ''."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    return ext if _ext_re.match(ext) else ""
+
+def shard_dir(file_hash: str) -> str:
+    """Returns the directory (relative to UPLOAD_DIRECTORY) that holds a hash."""
+    if not _hash_re.match(file_hash):
+        raise ValueError(f"Not a SHA-256 hex digest: {file_hash!r}")
+    parts = [file_hash[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS)]
+    return os.path.join(*parts)
+
+def receipt_relpath(file_hash: str, ext: str) -> str:
+    return os.path.join(shard_dir(file_hash), f"{file_hash}{ext}")
+
+def receipt_url(relpath: str) -> str:
+    return f"{UPLOAD_URL_PREFIX}/{relpath.replace(os.sep, '/')}"
+
+def find_stored(file_hash: str) -> Optional[str]:
+    """
+    Returns the relative path of an already-stored copy of this content,
+    whatever extension it was first uploaded with, or None.
+    """
+    directory = os.path.join(UPLOAD_DIRECTORY, shard_dir(file_hash))
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith(file_hash) and entry.is_file():
+                    return os.path.join(shard_dir(file_hash), entry.name)
+    except FileNotFoundError:
+        pass
+    return None
+
+def hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(settings.UPLOAD_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def _stream_to_temp(src: BinaryIO, max_size: int) -> tuple[str, str, int]:
+    """
+    Copies src into a temp file inside UPLOAD_DIRECTORY in fixed-size chunks,
+    hashing as it goes. Returns (temp_path, sha256_hex, size).
+    """
+    os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIRECTORY, prefix=TEMP_PREFIX, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := src.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise _receipt_too_large()
+                hasher.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, hasher.hexdigest(), size
+
+def commit_file(tmp_path: str, file_hash: str, ext: str) -> str:
+    """
+    Moves a fully written temp file into its content-addressed location.
+    If the content is already stored, the temp file is discarded instead.
+    Returns the relative path of the stored copy.
+    """
+    existing = find_stored(file_hash)
+    if existing:
+        os.unlink(tmp_path)
+        touch_stored(existing)
+        return existing
+
+    relpath = receipt_relpath(file_hash, ext)
+    os.makedirs(os.path.join(UPLOAD_DIRECTORY, shard_dir(file_hash)), exist_ok=True)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, os.path.join(UPLOAD_DIRECTORY, relpath))
+    return relpath
+
+def stream_upload(file: UploadFile) -> tuple[str, str]:
+    """
+    Streams an upload into a temp file, enforcing MAX_RECEIPT_SIZE.
+    Returns (temp_path, sha256_hex); pass them to commit_file or discard_temp.
+    """
+    # Reject early when the client already told us the size
+    if file.size is not None and file.size > MAX_RECEIPT_SIZE:
+        raise _receipt_too_large()
+    start = time.perf_counter()
+    tmp_path, file_hash, size = _stream_to_temp(file.file, MAX_RECEIPT_SIZE)
+    metrics.upload_duration.observe(time.perf_counter() - start)
+    metrics.upload_bytes.observe(size)
+    return tmp_path, file_hash
+
+def store_stream(src: BinaryIO, ext: str) -> tuple[str, str]:
+    """
+    Stores a file-like object (e.g. a member of an uploaded archive) the
+    same way as an upload. Returns (relative path, sha256_hex).
+    """
+    tmp_path, file_hash, _ = _stream_to_temp(src, MAX_RECEIPT_SIZE)
+    try:
+        return commit_file(tmp_path, file_hash, ext), file_hash
+    except BaseException:
+        discard_temp(tmp_path)
+        raise
+
+def discard_temp(tmp_path: str):
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+
+def touch_stored(relpath: str):
+    """
+    Marks a stored receipt as just used. A file can be reused before the
+    row that refers to it is committed; the prune_receipts command leaves
+    recently touched files alone for that reason.
+    """
+    try:
+        os.utime(os.path.join(UPLOAD_DIRECTORY, relpath))
+    except FileNotFoundError:
+        pass
+
+def path_for_url(url: str) -> Optional[str]:
+    """Maps a /uploads/... receipt_url back to its absolute path on disk."""
+    if not url or not url.startswith(UPLOAD_URL_PREFIX + "/"):
+        return None
+    relpath = os.path.normpath(url[len(UPLOAD_URL_PREFIX) + 1:])
+    if relpath.startswith(".."):
+        return None
+    return os.path.join(UPLOAD_DIRECTORY, relpath)
@@ -1,66 +1,373 @@
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
-from ..db.models.submission import Submission
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from ..db.models.submission import Submission, ENCRYPTED_FIELDS
 from ..db.schemas.submission import SubmissionCreate
-from typing import List, Tuple, Optional
-from pathlib import Path
-from fastapi import UploadFile, HTTPException
-import hashlib, os, uuid, secrets, re
+from . import receipt_storage, receipt_derivatives, dashboard_service, dashboard_feed, winner_selection, encryption
+from ..core.cache import TTLCache
+from ..core.config import settings
+from typing import List, Tuple, Optional, Sequence
+from datetime import datetime
+from fastapi import UploadFile
+import base64, json, os
 
-# IMPORTANT: this path must be the SAME directory we mount as a Docker volume
-UPLOAD_DIRECTORY = os.getenv("UPLOAD_DIRECTORY", "/app/uploads")
-_slug_re = re.compile(r"[^A-Za-z0-9_.-]+")
+def _known_receipt_url(db: Session, file_hash: str) -> Optional[str]:
+    """
+    Looks up an earlier submission with the same content via the indexed
+    receipt_hash column, so legacy (pre-sharding) copies are reused too.
+    """
+    row = (
+        db.query(Submission.receipt_url)
+        .filter(Submission.receipt_hash == file_hash)
+        .first()
+    )
+    if row is None:
+        return None
+    path = receipt_storage.path_for_url(row.receipt_url)
+    return row.receipt_url if path and os.path.isfile(path) else None
 
-def _slugify(name: str) -> str:
-    name = os.path.basename(name or "")
-    name = _slug_re.sub("_", name).strip("._-")
-    return name[:40] or "file"
+def queue_derivatives(receipt_url: str, file_hash: str):
+    """Queues thumbnail/review rendering unless this content already has them."""
+    path = receipt_storage.path_for_url(receipt_url)
+    if path and not receipt_derivatives.has_derivatives(file_hash):
+        receipt_derivatives.schedule(path, file_hash)
 
-def save_receipt_file(file: UploadFile) -> tuple[str, str]:
-    os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
+def save_receipt_file(file: UploadFile, db: Optional[Session] = None) -> tuple[str, str]:
+    """
+    Streams the receipt into the content-addressed store and returns
+    (receipt_url, sha256). Identical content is only ever stored once.
+    Derivatives are rendered in the background.
+    """
+    tmp_path, file_hash = receipt_storage.stream_upload(file)
+    try:
+        stored = receipt_storage.find_stored(file_hash)
+        known_url = _known_receipt_url(db, file_hash) if not stored and db is not None else None
+        if stored or known_url:
+            receipt_storage.discard_temp(tmp_path)
+            if stored:
+                receipt_storage.touch_stored(stored)
+            url = receipt_storage.receipt_url(stored) if stored else known_url
+        else:
+            relpath = receipt_storage.commit_file(tmp_path, file_hash, receipt_storage.normalize_ext(file.filename))
+            # Return URL path for API
+            url = receipt_storage.receipt_url(relpath)
+    except BaseException:
+        receipt_storage.discard_temp(tmp_path)
+        raise
 
-    # Read file content and hash
-    file_content = file.file.read()
-    file_hash = hashlib.sha256(file_content).hexdigest()
+    queue_derivatives(url, file_hash)
+    return url, file_hash
 
-    # Safe name
-    base, ext = os.path.splitext(file.filename or "")
-    slug = _slugify(base)
-    ext = (ext or "").lower()
-    safe_name = f"{file_hash[:8]}-{slug}{ext}"
+async def _known_receipt_url_async(db: AsyncSession, file_hash: str) -> Optional[str]:
+    result = await db.execute(
+        select(Submission.receipt_url).where(Submission.receipt_hash == file_hash).limit(1)
+    )
+    url = result.scalar_one_or_none()
+    if url is None:
+        return None
+    path = receipt_storage.path_for_url(url)
+    exists = await run_in_threadpool(os.path.isfile, path) if path else False
+    return url if exists else None
 
-    # Save file
-    file_path = os.path.join(UPLOAD_DIRECTORY, safe_name)
-    with open(file_path, "wb") as out:
-        out.write(file_content)
+async def save_receipt_file_async(file: UploadFile, db: Optional[AsyncSession] = None) -> tuple[str, str]:
+    """
+    Async variant of save_receipt_file. All disk I/O runs in the threadpool
+    so the event loop never blocks on the upload.
+    """
+    tmp_path, file_hash = await run_in_threadpool(receipt_storage.stream_upload, file)
+    try:
+        stored = await run_in_threadpool(receipt_storage.find_stored, file_hash)
+        known_url = await _known_receipt_url_async(db, file_hash) if not stored and db is not None else None
+        if stored or known_url:
+            await run_in_threadpool(receipt_storage.discard_temp, tmp_path)
+            if stored:
+                await run_in_threadpool(receipt_storage.touch_stored, stored)
+            url = receipt_storage.receipt_url(stored) if stored else known_url
+        else:
+            relpath = await run_in_threadpool(
+                receipt_storage.commit_file, tmp_path, file_hash, receipt_storage.normalize_ext(file.filename)
+            )
+            url = receipt_storage.receipt_url(relpath)
+    except BaseException:
+        await run_in_threadpool(receipt_storage.discard_temp, tmp_path)
+        raise
 
-    # Return URL path for API
-    return f"/uploads/{safe_name}", file_hash
+    await run_in_threadpool(queue_derivatives, url, file_hash)
+    return url, file_hash
 
 # --- Database Services ---
 
-def get_submission_by_email(db: Session, email: str) -> Optional[Submission]:
-    return db.query(Submission).filter(Submission.email == email).first()
+class DuplicateSubmissionError(Exception):
+    """Raised when a submission collides with an existing email or mobile."""
+    def __init__(self, field: str):
+        super().__init__(f"A submission with this {field} already exists.")
+        self.field = field
 
-def get_submission_by_mobile(db: Session, mobile: str) -> Optional[Submission]:
-    return db.query(Submission).filter(Submission.mobile == mobile).first()
+def _blind_indexes(submission: SubmissionCreate) -> dict:
+    """The email_bidx/mobile_bidx values for a submission (None while not enforced)."""
+    return dict(
+        email_bidx=encryption.email_blind_index(submission.email) if settings.ENFORCE_UNIQUE_EMAIL else None,
+        mobile_bidx=encryption.mobile_blind_index(submission.mobile) if settings.ENFORCE_UNIQUE_MOBILE else None,
+    )
 
-def create_submission(db: Session, submission: SubmissionCreate, receipt_url: str, receipt_hash: str) -> Submission:
-    db_submission = Submission(
-        name=submission.name,
-        email=submission.email,
-        mobile=submission.mobile,
-        emirates_id=submission.emirates_id,
+def _submission_values(submission: SubmissionCreate, receipt_url: str, receipt_hash: str) -> dict:
+    cipher = encryption.get_keyring()
+    return dict(
+        _name=cipher.encrypt(submission.name),
+        _email=cipher.encrypt(submission.email),
+        _mobile=cipher.encrypt(submission.mobile),
+        _emirates_id=cipher.encrypt(submission.emirates_id),
         emirate=submission.emirate,
         receipt_url=receipt_url,
-        receipt_hash=receipt_hash
+        receipt_hash=receipt_hash,
+        **_blind_indexes(submission),
     )
-    db.add(db_submission)
+
+def _insert_submission(dialect_name: str, values: dict):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING *. A duplicate email/mobile
+    (via the unique blind indexes) simply returns no row, so uniqueness is
+    checked in the same statement and cannot race.
+    """
+    insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+    return insert(Submission).values(**values).on_conflict_do_nothing().returning(Submission)
+
+def _conflict_checks(values: dict) -> list:
+    """(field, condition) pairs used to report which value collided."""
+    checks = []
+    if values["email_bidx"]:
+        checks.append(("email", Submission.email_bidx == values["email_bidx"]))
+    if values["mobile_bidx"]:
+        checks.append(("mobile number", Submission.mobile_bidx == values["mobile_bidx"]))
+    return checks
+
+def _taken_query(values: dict):
+    """One indexed query for whichever of the email/mobile is already taken, or None."""
+    checks = _conflict_checks(values)
+    if not checks:
+        return None
+    return select(Submission.email_bidx, Submission.mobile_bidx).where(or_(*(condition for _, condition in checks))).limit(1)
+
+def _taken_field(values: dict, row) -> str:
+    return "email" if values["email_bidx"] and row.email_bidx == values["email_bidx"] else "mobile number"
+
+def ensure_unique(db: Session, submission: SubmissionCreate):
+    """
+    Raises DuplicateSubmissionError if the email/mobile is already taken.
+    Called before the receipt is stored, so a rejected entry leaves no
+    receipt, thumbnails or fingerprint behind. The INSERT in
+    create_submission still settles races between concurrent entries.
+    """
+    values = _blind_indexes(submission)
+    query = _taken_query(values)
+    row = db.execute(query).first() if query is not None else None
+    if row is not None:
+        raise DuplicateSubmissionError(_taken_field(values, row))
+
+def create_submission(db: Session, submission: SubmissionCreate, receipt_url: str, receipt_hash: str) -> Submission:
+    values = _submission_values(submission, receipt_url, receipt_hash)
+    db_submission = db.scalars(_insert_submission(db.get_bind().dialect.name, values)).first()
+    if db_submission is None:
+        # Only the (rare) conflict path pays for a second query
+        db.rollback()
+        query = _taken_query(values)
+        row = db.execute(query).first() if query is not None else None
+        raise DuplicateSubmissionError(_taken_field(values, row) if row is not None else "email or mobile number")
+
+    dashboard_service.record_submission(db, submission.emirate)
+    # RETURNING already loaded every column; keep commit from expiring them
+    db.expunge(db_submission)
     db.commit()
-    db.refresh(db_submission)
+    dashboard_service.invalidate_stats_cache()
+    invalidate_names_cache()
+    dashboard_feed.publish_submission(db_submission.id, db_submission.emirate, db_submission.submitted_at)
     return db_submission
 
-def get_submissions(db: Session, skip: int = 0, limit: int = 100) -> List[Submission]:
-    return db.query(Submission).offset(skip).limit(limit).all()
+# Columns the admin listing needs, selected as plain tuples (no ORM
+# entities) and turned straight into response dicts by _listing_rows.
+_table = Submission.__table__
+LISTING_COLUMNS = (
+    _table.c.id,
+    _table.c.name,
+    _table.c.email,
+    _table.c.mobile,
+    _table.c.emirates_id,
+    _table.c.emirate,
+    _table.c.receipt_url,
+    _table.c.receipt_hash,
+    _table.c.submitted_at,
+)
+
+def _derivative_urls(receipt_hash: Optional[str], cache: dict) -> tuple[Optional[str], Optional[str]]:
+    """(thumbnail_url, review_url) of a receipt, looked up once per hash in `cache`."""
+    if receipt_hash not in cache:
+        cache[receipt_hash] = (
+            receipt_derivatives.derivative_url(receipt_hash, "thumb"),
+            receipt_derivatives.derivative_url(receipt_hash, "review"),
+        )
+    return cache[receipt_hash]
+
+def _listing_rows(rows: Sequence) -> List[dict]:
+    """
+    Builds the listing payload (the fields of schemas.Submission) from
+    LISTING_COLUMNS rows: one decrypt_many per PII column, and one
+    derivative lookup per distinct receipt.
+    """
+    keyring = encryption.get_keyring()
+    plain = {name: keyring.decrypt_many([getattr(row, name) for row in rows]) for name in ENCRYPTED_FIELDS}
+    derivatives = {}
+    items = []
+    for i, row in enumerate(rows):
+        thumbnail_url, review_url = _derivative_urls(row.receipt_hash, derivatives)
+        items.append({
+            "id": row.id,
+            "name": plain["name"][i],
+            "email": plain["email"][i],
+            "mobile": plain["mobile"][i],
+            "emirates_id": plain["emirates_id"][i],
+            "emirate": row.emirate,
+            "receipt_url": row.receipt_url,
+            "thumbnail_url": thumbnail_url,
+            "review_url": review_url,
+            "submitted_at": row.submitted_at,
+        })
+    return items
+
+def submission_payloads(submissions: Sequence[Submission]) -> List[dict]:
+    """
+    The schemas.Submission payload for loaded submissions (e.g. draw
+    winners), with their derivative URLs resolved once per receipt.
+    """
+    derivatives = {}
+    items = []
+    for submission in submissions:
+        thumbnail_url, review_url = _derivative_urls(submission.receipt_hash, derivatives)
+        items.append({
+            "id": submission.id,
+            "name": submission.name,
+            "email": submission.email,
+            "mobile": submission.mobile,
+            "emirates_id": submission.emirates_id,
+            "emirate": submission.emirate,
+            "receipt_url": submission.receipt_url,
+            "thumbnail_url": thumbnail_url,
+            "review_url": review_url,
+            "submitted_at": submission.submitted_at,
+        })
+    return items
+
+def get_submissions(db: Session, skip: int = 0, limit: int = 100) -> List[dict]:
+    rows = db.execute(select(*LISTING_COLUMNS).offset(skip).limit(limit)).all()
+    return _listing_rows(rows)
+
+def filter_submissions(query, emirate: Optional[str] = None, submitted_from: Optional[datetime] = None, submitted_to: Optional[datetime] = None):
+    """Applies the admin listing filters to a Query or a select()."""
+    if emirate:
+        query = query.filter(Submission.emirate == emirate)
+    if submitted_from:
+        query = query.filter(Submission.submitted_at >= submitted_from)
+    if submitted_to:
+        query = query.filter(Submission.submitted_at < submitted_to)
+    return query
+
+def encode_cursor(submitted_at: datetime, submission_id: int) -> str:
+    """Packs a (submitted_at, id) position into an opaque, URL-safe token."""
+    raw = json.dumps({"t": submitted_at.isoformat(), "i": submission_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Reverses encode_cursor. Raises ValueError for anything malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["t"]), int(data["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def get_submissions_page(
+    db: Session,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    emirate: Optional[str] = None,
+    submitted_from: Optional[datetime] = None,
+    submitted_to: Optional[datetime] = None,
+) -> tuple[List[dict], Optional[str]]:
+    """
+    Keyset pagination over (submitted_at, id). Each page is an index range
+    scan that starts right after the cursor, so deep pages cost the same as
+    the first one. Returns (rows, next_cursor); next_cursor is None on the
+    last page. Rows are plain dicts in the shape of schemas.Submission.
+    """
+    query = filter_submissions(select(*LISTING_COLUMNS), emirate, submitted_from, submitted_to)
+    if cursor:
+        after_submitted_at, after_id = decode_cursor(cursor)
+        query = query.filter(tuple_(Submission.submitted_at, Submission.id) > tuple_(after_submitted_at, after_id))
+
+    # Fetch one extra row to learn whether another page exists
+    rows = db.execute(query.order_by(Submission.submitted_at, Submission.id).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = _listing_rows(rows[:limit])
+    if not has_more:
+        return rows, None
+    last = rows[-1]
+    return rows, encode_cursor(last["submitted_at"], last["id"])
 
 def get_all_submission_names(db: Session) -> List[str]:
-    return [name for (name,) in db.query(Submission.name).all()]
\ No newline at end of file
+    return [name for (name,) in db.query(Submission.name).all()]
+
+# A random sample of names is cached per sample size. While the table holds
+# more rows than the sample, a new entry does not make the cached sample any
+# less random, so it simply expires. A sample that still holds *every* name
+# is dropped as soon as a new submission arrives, so the new name shows up.
+_names_cache = TTLCache(maxsize=8, ttl=settings.NAMES_CACHE_TTL_SECONDS)
+_names_cache_has_complete_sample = False
+
+def get_sample_submission_names(db: Session, sample_size: int) -> List[str]:
+    """Returns up to sample_size random names, decrypting only those rows."""
+    global _names_cache_has_complete_sample
+    cached = _names_cache.get(sample_size)
+    if cached is not None:
+        return cached
+
+    ids = winner_selection.sample_ids(db, sample_size)
+    names = [name for (name,) in db.query(Submission.name).filter(Submission.id.in_(ids))] if ids else []
+    if len(names) < sample_size:
+        _names_cache_has_complete_sample = True
+    _names_cache.set(sample_size, names)
+    return names
+
+def invalidate_names_cache():
+    global _names_cache_has_complete_sample
+    if _names_cache_has_complete_sample:
+        _names_cache_has_complete_sample = False
+        _names_cache.clear()
+
+# --- Async Database Services (USE_ASYNC_DB) ---
+
+async def ensure_unique_async(db: AsyncSession, submission: SubmissionCreate):
+    """Async variant of ensure_unique."""
+    values = _blind_indexes(submission)
+    query = _taken_query(values)
+    row = (await db.execute(query)).first() if query is not None else None
+    if row is not None:
+        raise DuplicateSubmissionError(_taken_field(values, row))
+
+async def create_submission_async(db: AsyncSession, submission: SubmissionCreate, receipt_url: str, receipt_hash: str) -> Submission:
+    values = _submission_values(submission, receipt_url, receipt_hash)
+    dialect_name = db.bind.dialect.name
+    db_submission = (await db.scalars(_insert_submission(dialect_name, values))).first()
+    if db_submission is None:
+        await db.rollback()
+        query = _taken_query(values)
+        row = (await db.execute(query)).first() if query is not None else None
+        raise DuplicateSubmissionError(_taken_field(values, row) if row is not None else "email or mobile number")
+
+    await db.execute(dashboard_service.emirate_count_increment(dialect_name, submission.emirate))
+    db.expunge(db_submission)
+    await db.commit()
+    dashboard_service.invalidate_stats_cache()
+    invalidate_names_cache()
+    dashboard_feed.publish_submission(db_submission.id, db_submission.emirate, db_submission.submitted_at)
+    return db_submission
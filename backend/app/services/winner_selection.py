@@ -0,0 +1,217 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from ..db.models.submission import Submission
+from ..db.models.draw import WinnerDraw
+from ..db.models.stats import EmirateSubmissionCount
+from ..core.config import settings
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+import random, secrets
+
+# Draw engine
+# -----------
+# Winners are sampled by probing random ids in [id_min, id_max] and keeping
+# the ones that exist (and match the stratum), in the order the RNG produced
+# them. Each probe is a primary-key lookup, so a draw costs a couple of
+# indexed queries no matter how many rows there are, and gaps left by
+# deleted ids are handled by simple rejection.
+#
+# All randomness comes from random.Random(f"{seed}:{stratum}"), and the
+# probe sequence does not depend on batch sizes or timing. Replaying a draw
+# with its recorded seed and id bounds therefore yields the same winners.
+#
+# Ids are handed out before commit, so a row below id_max may still be
+# uncommitted while the draw runs and show up on replay. Draws therefore
+# only include rows submitted DRAW_SETTLE_SECONDS before the draw (the
+# cutoff), and record how many eligible rows there were and their id sum,
+# so a replay can tell a changed eligible set from a non-reproducible draw.
+
+PROBE_BATCH_MIN = 16
+# Rejection budget per requested winner. Strata sparse enough to exhaust it
+# fall back to rank sampling, which counts the stratum once.
+MAX_PROBES_PER_WINNER = 64
+
+class DrawError(Exception):
+    pass
+
+def _eligible(query, emirate: Optional[str] = None, cutoff: Optional[datetime] = None):
+    if emirate is not None:
+        query = query.where(Submission.emirate == emirate)
+    if cutoff is not None:
+        query = query.where(Submission.submitted_at <= cutoff)
+    return query
+
+def _id_bounds(db: Session, emirate: Optional[str] = None, lo: Optional[int] = None, hi: Optional[int] = None, cutoff: Optional[datetime] = None) -> Optional[tuple[int, int]]:
+    query = _eligible(select(func.min(Submission.id), func.max(Submission.id)), emirate, cutoff)
+    if lo is not None:
+        query = query.where(Submission.id >= lo)
+    if hi is not None:
+        query = query.where(Submission.id <= hi)
+    low, high = db.execute(query).one()
+    return None if low is None else (low, high)
+
+def _eligible_summary(db: Session, lo: int, hi: int, emirate: Optional[str], cutoff: Optional[datetime]) -> tuple[int, int]:
+    """(count, sum of ids) of the rows a draw chooses from."""
+    query = _eligible(select(func.count(), func.coalesce(func.sum(Submission.id), 0)).where(Submission.id.between(lo, hi)), emirate, cutoff)
+    count, id_sum = db.execute(query).one()
+    return int(count), int(id_sum)
+
+def _probe_sample(db: Session, rng: random.Random, k: int, lo: int, hi: int, emirate: Optional[str], cutoff: Optional[datetime]) -> Optional[List[int]]:
+    """
+    Rejection sampling over the id range. Returns None if the probe budget
+    runs out before k distinct winners are found.
+    """
+    chosen: List[int] = []
+    seen = set()
+    budget = MAX_PROBES_PER_WINNER * k
+    while len(chosen) < k:
+        if budget <= 0:
+            return None
+        batch = min(max(PROBE_BATCH_MIN, 2 * (k - len(chosen))), budget)
+        budget -= batch
+        candidates = [rng.randint(lo, hi) for _ in range(batch)]
+
+        query = _eligible(select(Submission.id).where(Submission.id.in_(set(candidates))), emirate, cutoff)
+        existing = set(db.scalars(query))
+
+        for candidate in candidates:
+            if candidate in existing and candidate not in seen:
+                seen.add(candidate)
+                chosen.append(candidate)
+                if len(chosen) == k:
+                    break
+    return chosen
+
+def _rank_sample(db: Session, rng: random.Random, k: int, lo: int, hi: int, emirate: Optional[str], cutoff: Optional[datetime] = None) -> List[int]:
+    """
+    Samples by rank within the stratum. Used only for very sparse strata.
+    Ranks are looked up in ascending order, each continuing from the id of
+    the previous one, so all k lookups together walk the index once.
+    """
+    base = _eligible(select(Submission.id).where(Submission.id.between(lo, hi)), emirate, cutoff)
+    total = db.scalar(select(func.count()).select_from(base.subquery()))
+    if total <= k:
+        everyone = list(db.scalars(base.order_by(Submission.id)))
+        rng.shuffle(everyone)
+        return everyone
+    ranks = rng.sample(range(total), k)
+
+    by_rank = {}
+    after, position = lo - 1, -1  # id and rank of the last row found
+    for rank in sorted(ranks):
+        winner = db.scalar(base.where(Submission.id > after).order_by(Submission.id).offset(rank - position - 1).limit(1))
+        if winner is None:
+            break
+        by_rank[rank] = winner
+        after, position = winner, rank
+    return [by_rank[rank] for rank in ranks if rank in by_rank]
+
+def _sample_stratum(db: Session, seed: str, k: int, lo: int, hi: int, emirate: Optional[str], cutoff: Optional[datetime] = None) -> List[int]:
+    bounds = _id_bounds(db, emirate, lo, hi, cutoff) if emirate is not None else (lo, hi)
+    if bounds is None:
+        return []
+    rng = random.Random(f"{seed}:{emirate or '*'}")
+    chosen = _probe_sample(db, rng, k, *bounds, emirate, cutoff)
+    if chosen is None:
+        chosen = _rank_sample(db, rng, k, *bounds, emirate, cutoff)
+    return chosen
+
+def _select_winner_ids(db: Session, seed: str, k: int, per_emirate: bool, emirate: Optional[str], lo: int, hi: int, cutoff: Optional[datetime]) -> List[int]:
+    if not per_emirate:
+        winner_ids = _sample_stratum(db, seed, k, lo, hi, emirate, cutoff)
+        if len(winner_ids) < k:
+            raise DrawError(f"Not enough submissions to draw {k} winner(s).")
+        return winner_ids
+
+    # Stratified: k winners from every emirate (or all of a smaller one)
+    strata = db.scalars(select(EmirateSubmissionCount.emirate).order_by(EmirateSubmissionCount.emirate))
+    winner_ids: List[int] = []
+    for stratum in strata:
+        winner_ids.extend(_sample_stratum(db, seed, k, lo, hi, stratum, cutoff))
+    return winner_ids
+
+def sample_ids(db: Session, k: int, emirate: Optional[str] = None) -> List[int]:
+    """
+    Returns up to k distinct random submission ids (all of them if there
+    are fewer) without recording a draw. Not meant for picking winners.
+    """
+    bounds = _id_bounds(db)
+    if bounds is None:
+        return []
+    rng_seed = secrets.token_hex(16)
+    # Small tables: skip the probe budget and take everyone
+    total = db.scalar(select(func.sum(EmirateSubmissionCount.count)))
+    if emirate is None and total is not None and total <= k:
+        return _rank_sample(db, random.Random(rng_seed), k, *bounds, None)
+    return _sample_stratum(db, rng_seed, k, *bounds, emirate)
+
+def draw_winners(
+    db: Session,
+    k: int = 1,
+    per_emirate: bool = False,
+    emirate: Optional[str] = None,
+    seed: Optional[str] = None,
+    drawn_by: Optional[str] = None,
+) -> WinnerDraw:
+    """
+    Draws k winners without replacement (k per emirate when per_emirate is
+    set, or only from `emirate` when given) and records an auditable
+    WinnerDraw with the seed, the id range and cutoff that took part, and
+    the size of the eligible set.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.DRAW_SETTLE_SECONDS)
+    bounds = _id_bounds(db, cutoff=cutoff)
+    if bounds is None:
+        raise DrawError("No submissions found to select a winner from.")
+    seed = seed or secrets.token_hex(16)
+    id_min, id_max = bounds
+
+    winner_ids = _select_winner_ids(db, seed, k, per_emirate, emirate, id_min, id_max, cutoff)
+    if not winner_ids:
+        raise DrawError("No submissions found to select a winner from.")
+    eligible_count, eligible_id_sum = _eligible_summary(db, id_min, id_max, None if per_emirate else emirate, cutoff)
+
+    draw = WinnerDraw(
+        seed=seed,
+        winners_per_stratum=k,
+        per_emirate=per_emirate,
+        emirate=emirate,
+        id_min=id_min,
+        id_max=id_max,
+        cutoff=cutoff,
+        eligible_count=eligible_count,
+        eligible_id_sum=eligible_id_sum,
+        winner_ids=winner_ids,
+        drawn_by=drawn_by,
+    )
+    db.add(draw)
+    db.commit()
+    db.refresh(draw)
+    return draw
+
+def replay_draw(db: Session, draw: WinnerDraw) -> List[int]:
+    """Re-runs a recorded draw from its seed, bounds and cutoff and returns the winner ids."""
+    try:
+        return _select_winner_ids(
+            db, draw.seed, draw.winners_per_stratum, draw.per_emirate, draw.emirate, draw.id_min, draw.id_max, draw.cutoff
+        )
+    except DrawError:
+        return []
+
+def eligible_unchanged(db: Session, draw: WinnerDraw) -> Optional[bool]:
+    """
+    Whether the rows the draw chose from are still the same (by count and
+    id sum). None for draws recorded before this was tracked.
+    """
+    if draw.eligible_count is None:
+        return None
+    emirate = None if draw.per_emirate else draw.emirate
+    return _eligible_summary(db, draw.id_min, draw.id_max, emirate, draw.cutoff) == (draw.eligible_count, draw.eligible_id_sum)
+
+def get_draw(db: Session, draw_id: int) -> Optional[WinnerDraw]:
+    return db.get(WinnerDraw, draw_id)
+
+def get_winners(db: Session, draw: WinnerDraw) -> List[Submission]:
+    """Loads the winning submissions in draw order."""
+    rows = {row.id: row for row in db.query(Submission).filter(Submission.id.in_(draw.winner_ids))}
+    return [rows[winner_id] for winner_id in draw.winner_ids if winner_id in rows]
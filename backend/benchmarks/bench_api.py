@@ -0,0 +1,301 @@
+"""
+Latency and throughput of the API hot paths, driving the real ASGI app
+in-process through httpx (no network, no uvicorn).
+
+    cd backend && python -m benchmarks.bench_api [--requests 200] [--concurrency 16] \\
+        [--scenarios submit,list_deep,stats,winner,auth] [--json out.json] [--compare old.json]
+
+Run it against a database filled by `python -m benchmarks.seed` (10k, 100k
+or 1m rows) so results are comparable between runs. Each scenario issues
+`--requests` requests from `--concurrency` concurrent clients, after a few
+warm-up requests, and reports requests/s and p50/p95/p99 latency:
+
+    submit      POST /submissions/ with receipts of realistic (log-normal) size
+    list_deep   GET /submissions/ pages starting deep in the table (cursor),
+                plus the legacy ?skip= offset page at the same depth
+    stats       GET /dashboard/stats
+    winner      POST /dashboard/generate-winner
+    auth        POST /auth/request-otp then /auth/verify-otp (sequential, as
+                codes are per email); the code is read from the file outbox
+
+With `--json` the results (and the table size they were taken at) are
+written out; `--compare` prints each figure against an earlier such file.
+"""
+import os, tempfile
+
+# Settings are read at import time. Admission control would throttle the
+# single benchmark client, and the auth flow reads OTPs from the outbox.
+os.environ.setdefault("ADMISSION_CONTROL_ENABLED", "false")
+os.environ.setdefault("EMAIL_TRANSPORT", "file")
+os.environ.setdefault("EMAIL_FILE_PATH", tempfile.mkdtemp(prefix="bench-outbox-"))
+
+import argparse, asyncio, io, json, math, random, re, statistics, subprocess, time, uuid
+import httpx
+from sqlalchemy import func, select
+from app.main import app
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.core.mailer import shutdown_dispatcher
+from app.db.session import SessionLocal, engine
+from app.db.models.submission import Submission
+from app.services import admin_service, submission_service
+from app.services.receipt_derivatives import shutdown_pool, pillow_available
+
+SCENARIOS = ("submit", "list_deep", "stats", "winner", "auth")
+WARMUP = 5
+PAGE_SIZE = 100
+# Phone photos of receipts: median ~600 KB, long tail into several MB
+RECEIPT_MEDIAN_BYTES = 600_000
+RECEIPT_SIGMA = 0.8
+_otp_re = re.compile(r">\s*(\d{6})\s*<")
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(values) * 1000 if values else None,
+        "p50_ms": percentile(values, 50) * 1000 if values else None,
+        "p95_ms": percentile(values, 95) * 1000 if values else None,
+        "p99_ms": percentile(values, 99) * 1000 if values else None,
+        "max_ms": values[-1] * 1000 if values else None,
+    }
+
+async def run_load(call, requests: int, concurrency: int) -> dict:
+    """
+    Runs `call(i)` for i in range(requests) from `concurrency` workers.
+    `call` returns the httpx response; anything but 2xx counts as an error.
+    """
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            response = await call(i)
+            elapsed = time.perf_counter() - start
+            if response.is_success:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    for i in range(WARMUP):
+        await call(requests + i)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+def _jpeg_base() -> bytes:
+    """A real JPEG to pad, so derivative rendering does its usual work."""
+    if not pillow_available():
+        return b"\xff\xd8\xff\xe0"
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.effect_noise((1200, 1600), 64).convert("RGB").save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+def _receipt_sizes(rng: random.Random, count: int) -> list[int]:
+    limit = settings.MAX_RECEIPT_SIZE_MB * 1024 * 1024
+    return [min(limit, int(rng.lognormvariate(math.log(RECEIPT_MEDIAN_BYTES), RECEIPT_SIGMA))) for _ in range(count)]
+
+def submit_scenario(client: httpx.AsyncClient, rng: random.Random, requests: int):
+    base = _jpeg_base()
+    sizes = _receipt_sizes(rng, requests + WARMUP)
+    padding = rng.randbytes(max(sizes))
+
+    async def call(i):
+        # Bytes after the JPEG end marker are ignored by decoders; the unique
+        # tag keeps every upload a new, stored file.
+        tag = uuid.uuid4().bytes
+        body = base + tag + padding[:max(0, sizes[i] - len(base) - len(tag))]
+        return await client.post(
+            "/api/v1/submissions/",
+            data={
+                "name": f"Bench User {i}",
+                "email": f"bench.{tag.hex()}@example.com",
+                "mobile": f"05{int.from_bytes(tag[:4], 'big') % 10**8:08d}",
+                "emirates_id": f"784-1990-{i % 10**7:07d}-1",
+                "emirate": rng.choice(("Dubai", "Abu Dhabi", "Sharjah")),
+            },
+            files={"receipt": ("receipt.jpg", body, "image/jpeg")},
+        )
+    return call
+
+def deep_cursors(depths: list[int]) -> list[tuple[int, str]]:
+    """Cursors (with their offsets) that start pages at the given depths."""
+    db = SessionLocal()
+    try:
+        cursors = []
+        for depth in depths:
+            row = db.execute(
+                select(Submission.submitted_at, Submission.id)
+                .order_by(Submission.submitted_at.desc(), Submission.id.desc())
+                .offset(depth - 1)
+                .limit(1)
+            ).first()
+            if row:
+                cursors.append((depth, submission_service.encode_cursor(row.submitted_at, row.id)))
+        return cursors
+    finally:
+        db.close()
+
+def list_deep_scenarios(client: httpx.AsyncClient, rng: random.Random, table_size: int, headers: dict):
+    # Pages from the deepest half of the table, where offset paging hurts most
+    span = max(1, table_size - PAGE_SIZE)
+    depths = sorted(rng.randint(span // 2, span) for _ in range(16)) if table_size > PAGE_SIZE else [1]
+    cursors = deep_cursors(depths)
+
+    async def cursor_call(i):
+        _, cursor = cursors[i % len(cursors)]
+        return await client.get("/api/v1/submissions/", params={"limit": PAGE_SIZE, "cursor": cursor}, headers=headers)
+
+    async def offset_call(i):
+        depth, _ = cursors[i % len(cursors)]
+        return await client.get("/api/v1/submissions/", params={"limit": PAGE_SIZE, "skip": depth}, headers=headers)
+
+    return cursor_call, offset_call
+
+def _read_otp(outbox: str, email: str, seen: set, timeout: float = 10.0) -> str:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for name in sorted(os.listdir(outbox)):
+            if name.startswith(".") or name in seen:
+                continue
+            seen.add(name)
+            with open(os.path.join(outbox, name)) as fh:
+                message = json.load(fh)
+            match = _otp_re.search(message["html"])
+            if message["to"] == email and match:
+                return match.group(1)
+        time.sleep(0.002)
+    raise RuntimeError(f"No OTP email for {email} within {timeout}s; is EMAIL_TRANSPORT=file?")
+
+async def auth_scenario(client: httpx.AsyncClient, requests: int) -> dict:
+    email = settings.GLOBAL_ADMIN_EMAIL
+    outbox = settings.EMAIL_FILE_PATH
+    seen = set(os.listdir(outbox)) if os.path.isdir(outbox) else set()
+    request_latencies, verify_latencies = [], []
+    request_errors = verify_errors = 0
+    start = time.perf_counter()
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        response = await client.post("/api/v1/auth/request-otp", json={"email": email})
+        request_latencies.append(time.perf_counter() - t0)
+        if not response.is_success:
+            request_errors += 1
+            continue
+        otp = await asyncio.to_thread(_read_otp, outbox, email, seen)
+        t0 = time.perf_counter()
+        response = await client.post("/api/v1/auth/verify-otp", json={"email": email, "otp": otp})
+        verify_latencies.append(time.perf_counter() - t0)
+        verify_errors += not response.is_success
+    elapsed = time.perf_counter() - start
+    # Per-step throughput is what one client achieves back to back; the flow
+    # figure also includes waiting for the email to be delivered.
+    return {
+        "request_otp": summarize(request_latencies, request_errors, sum(request_latencies)),
+        "verify_otp": summarize(verify_latencies, verify_errors, sum(verify_latencies)),
+        "flow": {"flows": requests, "errors": request_errors + verify_errors, "throughput_rps": requests / elapsed},
+    }
+
+def _table_size() -> int:
+    db = SessionLocal()
+    try:
+        admin_service.create_global_admin_if_not_exists(db)
+        return db.scalar(select(func.count()).select_from(Submission.__table__))
+    finally:
+        db.close()
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _print_result(name: str, result: dict, previous: dict | None):
+    line = f"{name:<20} {result['throughput_rps']:9.1f} req/s"
+    if "p50_ms" in result:
+        line += f"   p50 {result['p50_ms']:8.1f}   p95 {result['p95_ms']:8.1f}   p99 {result['p99_ms']:8.1f} ms"
+    if result.get("errors"):
+        line += f"   errors {result['errors']}"
+    if previous and previous.get("p95_ms") and result.get("p95_ms"):
+        line += f"   (p95 {(result['p95_ms'] / previous['p95_ms'] - 1) * 100:+.0f}% vs baseline)"
+    print(line)
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    table_size = _table_size()
+    token = create_access_token({"sub": settings.GLOBAL_ADMIN_EMAIL})
+    headers = {"Authorization": f"Bearer {token}"}
+    results = {}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for scenario in args.scenarios:
+            if scenario == "submit":
+                results["submit"] = await run_load(submit_scenario(client, rng, args.requests), args.requests, args.concurrency)
+            elif scenario == "list_deep":
+                cursor_call, offset_call = list_deep_scenarios(client, rng, table_size, headers)
+                results["list_deep_cursor"] = await run_load(cursor_call, args.requests, args.concurrency)
+                results["list_deep_offset"] = await run_load(offset_call, args.requests, args.concurrency)
+            elif scenario == "stats":
+                results["stats"] = await run_load(lambda i: client.get("/api/v1/dashboard/stats", headers=headers), args.requests, args.concurrency)
+            elif scenario == "winner":
+                results["winner"] = await run_load(lambda i: client.post("/api/v1/dashboard/generate-winner", headers=headers), args.requests, args.concurrency)
+            elif scenario == "auth":
+                for name, result in (await auth_scenario(client, args.requests)).items():
+                    results[f"auth_{name}"] = result
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "revision": _git_revision(),
+            "database": engine.dialect.name,
+            "table_rows": table_size,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--compare", help="Earlier --json output to compare p95 latencies against.")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        shutdown_dispatcher()
+        shutdown_pool(wait=True)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = json.load(fh).get("results", {})
+    meta = report["meta"]
+    print(f"{meta['database']}, {meta['table_rows']:,} rows, {args.requests} requests x {args.concurrency} clients")
+    for name, result in report["results"].items():
+        _print_result(name, result, baseline.get(name))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
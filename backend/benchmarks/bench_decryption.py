@@ -0,0 +1,51 @@
+"""
+Decryption cost of a large listing: the old sqlalchemy_utils EncryptedType
+versus services/encryption.py (per value and batched).
+
+    cd backend && python -m benchmarks.bench_decryption [--rows 100000]
+
+Each run decrypts the four PII fields of `--rows` synthetic submissions.
+"""
+import argparse, random, string, time, warnings
+from sqlalchemy import String
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    from sqlalchemy_utils import EncryptedType
+
+from app.services.encryption import get_cipher
+
+SECRET = "benchmark-secret"
+FIELDS = 4
+
+def _random_value(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=rng.randint(8, 30)))
+
+def _timed(label: str, fn, rows: int) -> float:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<38} {elapsed * 1000:9.1f} ms   {rows / elapsed:12,.0f} rows/s")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        old_type = EncryptedType(String, SECRET)
+    ciphertexts = [old_type.process_bind_param(_random_value(rng), None) for _ in range(args.rows * FIELDS)]
+    cipher = get_cipher(SECRET)
+    assert cipher.decrypt_many(ciphertexts[:100]) == [old_type.process_result_value(c, None) for c in ciphertexts[:100]]
+
+    print(f"Decrypting {FIELDS} fields x {args.rows:,} rows")
+    baseline = _timed("EncryptedType.process_result_value", lambda: [old_type.process_result_value(c, None) for c in ciphertexts], args.rows)
+    per_value = _timed("AesCipher.decrypt (per value)", lambda: [cipher.decrypt(c) for c in ciphertexts], args.rows)
+    batched = _timed("AesCipher.decrypt_many (batched)", lambda: cipher.decrypt_many(ciphertexts), args.rows)
+    print(f"speed-up: per value x{baseline / per_value:.1f}, batched x{baseline / batched:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+CPU cost per 1,000 rows of the admin listing and NDJSON export payloads:
+ORM entities validated through the Pydantic response model and encoded
+by pydantic-core (the old path) versus column projection encoded straight
+with orjson (core/responses.py).
+
+    cd backend && python -m benchmarks.bench_serialization [--rows 1000] [--repeat 20] [--json out.json]
+
+Reads the first `--rows` submissions of the database DATABASE_URL points
+at, so fill it first (python -m benchmarks.seed). Times are process CPU
+time, median of `--repeat` runs, and include the query and decryption.
+"""
+import argparse, json, statistics, time
+import orjson
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from app.db.session import SessionLocal
+from app.db.models.submission import Submission, ENCRYPTED_FIELDS
+from app.db.schemas.submission import Submission as SubmissionSchema
+from app.core.responses import FastJSONResponse
+from app.services import encryption, export_service, submission_service
+
+_listing_adapter = TypeAdapter(List[SubmissionSchema])
+
+def listing_old(db, rows: int) -> bytes:
+    entities = db.query(Submission).order_by(Submission.submitted_at, Submission.id).limit(rows).all()
+    encryption.bulk_decrypt(entities, ENCRYPTED_FIELDS)
+    # What FastAPI does with response_model=List[Submission] and the default
+    # response class: validate, then TypeAdapter.dump_json (serialize_json),
+    # with no jsonable_encoder or json.dumps step
+    return _listing_adapter.dump_json(_listing_adapter.validate_python(entities, from_attributes=True))
+
+def listing_new(db, rows: int) -> bytes:
+    result = db.execute(select(*submission_service.LISTING_COLUMNS).order_by(Submission.submitted_at, Submission.id).limit(rows)).all()
+    return FastJSONResponse(submission_service._listing_rows(result)).body
+
+def ndjson_old(batch: list) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(export_service.EXPORT_FIELDS, row)), default=export_service._format_value) + "\n"
+        for row in batch
+    ).encode()
+
+def ndjson_new(batch: list) -> bytes:
+    return b"".join(
+        orjson.dumps(dict(zip(export_service.EXPORT_FIELDS, row)), option=orjson.OPT_APPEND_NEWLINE)
+        for row in batch
+    )
+
+def _cpu_ms(fn, repeat: int) -> float:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        samples.append(time.process_time() - start)
+    return statistics.median(samples) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        assert json.loads(listing_old(db, 50)) == json.loads(listing_new(db, 50)), "payloads differ"
+        batch = next(export_service._iter_batches(batch_size=args.rows), [])
+        rows = min(args.rows, len(batch))
+        if not rows:
+            parser.error("No submissions; run python -m benchmarks.seed first.")
+        per_1k = 1000 / rows
+
+        results = {}
+        for name, old, new in (
+            ("listing", lambda: listing_old(db, rows), lambda: listing_new(db, rows)),
+            ("export_ndjson", lambda: ndjson_old(batch), lambda: ndjson_new(batch)),
+        ):
+            old_ms, new_ms = _cpu_ms(old, args.repeat) * per_1k, _cpu_ms(new, args.repeat) * per_1k
+            results[name] = {"old_ms_per_1k": old_ms, "new_ms_per_1k": new_ms, "saving_ms_per_1k": old_ms - new_ms}
+            print(f"{name:<14} old {old_ms:8.1f} ms   new {new_ms:8.1f} ms   per 1,000 rows (x{old_ms / new_ms:.1f})")
+    finally:
+        db.close()
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"rows": rows, "results": results}, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Near-duplicate lookups in the receipt similarity index
+(services/receipt_similarity.py) versus comparing against every stored hash.
+
+    cd backend && python -m benchmarks.bench_similarity [--receipts 1000000] [--queries 1000] [--max-distance 8]
+
+Stores `--receipts` random 64-bit hashes, then looks up `--queries` hashes
+that each sit a random 0..max-distance bits from a stored one, and checks
+the index finds exactly what the full scan finds. Real perceptual hashes
+are less uniform than random ones, so buckets are somewhat fuller in
+production.
+"""
+import argparse, random, statistics, time
+from app.services.receipt_similarity import HammingIndex
+
+def _near(rng: random.Random, value: int, max_distance: int) -> int:
+    for bit in rng.sample(range(64), rng.randint(0, max_distance)):
+        value ^= 1 << bit
+    return value
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--receipts", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--max-distance", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(args.receipts)]
+    queries = [_near(rng, rng.choice(hashes), args.max_distance) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    index = HammingIndex(args.max_distance)
+    for item_id, value in enumerate(hashes):
+        index.add(item_id, value)
+    build = time.perf_counter() - start
+    print(f"build {len(index):,} hashes            {build:8.2f} s")
+
+    index_ms = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        index_ms.append((time.perf_counter() - start) * 1000)
+
+    # The full scan is slow; a sample is enough for its latency and to check recall
+    checked = queries[:min(len(queries), 50)]
+    scan_ms = []
+    for query in checked:
+        start = time.perf_counter()
+        expected = sorted((i, (value ^ query).bit_count()) for i, value in enumerate(hashes) if (value ^ query).bit_count() <= args.max_distance)
+        scan_ms.append((time.perf_counter() - start) * 1000)
+        assert sorted(index.search(query)) == expected, "index missed a match"
+
+    print(f"index lookup  p50 {statistics.median(index_ms):8.3f} ms   max {max(index_ms):8.3f} ms")
+    print(f"full scan     p50 {statistics.median(scan_ms):8.3f} ms   ({len(checked)} queries, same results)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Worker cold-start time: a fresh interpreter importing the ASGI app and
+running its startup hooks, as each uvicorn worker does.
+
+    cd backend && python -m benchmarks.bench_startup [--runs 10] [--target app.main:app]
+
+Each run is a separate process, so nothing is cached between runs
+(other than the OS page cache, warmed by one discarded run).
+"""
+import argparse, json, statistics, subprocess, sys
+
+_PROBE = """
+import asyncio, time
+start = time.perf_counter()
+module_name, _, attr = {target!r}.partition(":")
+module = __import__(module_name, fromlist=[attr])
+app = getattr(module, attr)
+imported = time.perf_counter()
+
+async def lifespan():
+    messages = [{{"type": "lifespan.startup"}}]
+    async def receive():
+        return messages.pop(0) if messages else await asyncio.Event().wait()
+    async def send(message):
+        if message["type"].startswith("lifespan.startup"):
+            raise StopAsyncIteration
+    try:
+        await app({{"type": "lifespan", "asgi": {{"version": "3.0"}}}}, receive, send)
+    except StopAsyncIteration:
+        pass
+
+asyncio.run(lifespan())
+ready = time.perf_counter()
+print(imported - start, ready - start)
+"""
+
+def _run_once(target: str) -> tuple[float, float]:
+    out = subprocess.run([sys.executable, "-c", _PROBE.format(target=target)], check=True, capture_output=True, text=True).stdout
+    imported, ready = map(float, out.split()[-2:])
+    return imported, ready
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--target", default="app.main:app")
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    _run_once(args.target)
+    samples = [_run_once(args.target) for _ in range(args.runs)]
+    result = {}
+    for label, values in (("import", [s[0] for s in samples]), ("ready", [s[1] for s in samples])):
+        result[label] = {"median_ms": statistics.median(values) * 1000, "max_ms": max(values) * 1000}
+        print(f"{label:<8} median {result[label]['median_ms']:8.1f} ms   max {result[label]['max_ms']:8.1f} ms")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(result, fh, indent=2)
+
+if __name__ == "__main__":
+    main()
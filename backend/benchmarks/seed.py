@@ -0,0 +1,118 @@
+"""
+Fills a local database with synthetic, encrypted submissions for the
+benchmarks.
+
+    cd backend && python -m benchmarks.seed --rows 100k [--seed 0] [--days 60] [--batch-size 5000]
+
+`--rows` takes a count or one of the standard sizes 10k, 100k and 1m. Rows
+are appended to whatever DATABASE_URL points at, so point it at a
+throwaway database that `alembic upgrade head` has been run against. The
+same `--seed` always produces the same rows.
+
+Values are encrypted with the active key, blind indexes are filled when
+uniqueness is enforced, and the dashboard counters are rebuilt at the end.
+Receipts are drawn from a small pool of stored files, as most real
+duplicates would be.
+"""
+import argparse, os, random, string, tempfile, time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.models.submission import Submission
+from app.services import admin_service, dashboard_service, encryption, receipt_storage
+
+EMIRATES = ["Abu Dhabi", "Dubai", "Sharjah", "Ajman", "Umm Al Quwain", "Ras Al Khaimah", "Fujairah"]
+# Rough population weights, so per-emirate filters see realistic skew
+EMIRATE_WEIGHTS = [30, 35, 17, 6, 1, 5, 6]
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+RECEIPT_POOL = 32
+
+def parse_rows(value: str) -> int:
+    value = value.lower().replace("_", "")
+    if value in SIZES:
+        return SIZES[value]
+    try:
+        return int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a count or one of {', '.join(SIZES)}")
+
+def _store_receipts(rng: random.Random, count: int) -> list[tuple[str, str]]:
+    """Stores `count` distinct receipt files; returns their (url, sha256)."""
+    receipts = []
+    for _ in range(count):
+        fd, tmp_path = tempfile.mkstemp(dir=receipt_storage.UPLOAD_DIRECTORY, prefix=receipt_storage.TEMP_PREFIX)
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(rng.randbytes(rng.randint(50_000, 500_000)))
+        file_hash = receipt_storage.hash_file(tmp_path)
+        relpath = receipt_storage.commit_file(tmp_path, file_hash, ".jpg")
+        receipts.append((receipt_storage.receipt_url(relpath), file_hash))
+    return receipts
+
+def _person(rng: random.Random, n: int) -> tuple[str, str, str, str]:
+    first = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))).capitalize()
+    last = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))).capitalize()
+    return (
+        f"{first} {last}",
+        f"{first.lower()}.{last.lower()}.{n}@example.com",
+        f"05{rng.randint(0, 9)}{n:07d}"[-10:],
+        f"784-{rng.randint(1960, 2015)}-{rng.randint(0, 9_999_999):07d}-{rng.randint(0, 9)}",
+    )
+
+def seed(db, rows: int, rng: random.Random, days: int = 60, batch_size: int = 5000) -> int:
+    """Appends `rows` submissions, oldest first; returns the new table size."""
+    keyring = encryption.get_keyring()
+    receipts = _store_receipts(rng, RECEIPT_POOL)
+    table = Submission.__table__
+    start_n = db.scalar(select(func.coalesce(func.max(Submission.id), 0)))
+    end = datetime.now(timezone.utc)
+    start = end - timedelta(days=days)
+    step = (end - start) / max(rows, 1)
+    began = time.perf_counter()
+
+    for offset in range(0, rows, batch_size):
+        count = min(batch_size, rows - offset)
+        people = [_person(rng, start_n + offset + i + 1) for i in range(count)]
+        columns = {field: keyring.encrypt_many([p[i] for p in people]) for i, field in enumerate(("name", "email", "mobile", "emirates_id"))}
+        emirates = rng.choices(EMIRATES, weights=EMIRATE_WEIGHTS, k=count)
+        params = []
+        for i, person in enumerate(people):
+            receipt_url, receipt_hash = rng.choice(receipts)
+            params.append({
+                "name": columns["name"][i],
+                "email": columns["email"][i],
+                "mobile": columns["mobile"][i],
+                "emirates_id": columns["emirates_id"][i],
+                "emirate": emirates[i],
+                "email_bidx": encryption.email_blind_index(person[1]) if settings.ENFORCE_UNIQUE_EMAIL else None,
+                "mobile_bidx": encryption.mobile_blind_index(person[2]) if settings.ENFORCE_UNIQUE_MOBILE else None,
+                "receipt_url": receipt_url,
+                "receipt_hash": receipt_hash,
+                "submitted_at": start + step * (offset + i),
+            })
+        db.execute(table.insert(), params)
+        db.commit()
+        done = offset + count
+        print(f"... {done:,}/{rows:,} rows ({done / (time.perf_counter() - began):,.0f} rows/s)")
+
+    dashboard_service.reconcile_counters(db)
+    admin_service.create_global_admin_if_not_exists(db)
+    return db.scalar(select(func.count()).select_from(table))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=parse_rows, default=SIZES["10k"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=60, help="Spread submitted_at over this many days.")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        total = seed(db, args.rows, random.Random(args.seed), days=args.days, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Seeded {args.rows:,} rows; submissions now holds {total:,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Baseline: the schema previously created by Base.metadata.create_all
+
+Databases that were set up by the old create_all-at-import code already
+have these tables. `python -m app.commands.migrate` (the deploy's migrate
+step) detects them and stamps 0001_baseline before upgrading; by hand,
+that is `alembic stamp 0001_baseline` once, then `alembic upgrade head`.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "admins",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("role", sa.Enum("GLOBAL_ADMIN", "ADMIN", name="adminrole"), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+    )
+    op.create_index("ix_admins_id", "admins", ["id"])
+    op.create_index("ix_admins_email", "admins", ["email"], unique=True)
+
+    op.create_table(
+        "submissions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.LargeBinary(), nullable=False),
+        sa.Column("email", sa.LargeBinary(), nullable=False),
+        sa.Column("mobile", sa.LargeBinary(), nullable=False),
+        sa.Column("emirates_id", sa.LargeBinary(), nullable=False),
+        sa.Column("emirate", sa.String(), nullable=False),
+        sa.Column("receipt_url", sa.String(), nullable=False),
+        sa.Column("receipt_hash", sa.String(), nullable=True),
+        sa.Column("submitted_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_submissions_id", "submissions", ["id"])
+    op.create_index("ix_submissions_email", "submissions", ["email"])
+    op.create_index("ix_submissions_mobile", "submissions", ["mobile"])
+    op.create_index("ix_submissions_emirate", "submissions", ["emirate"])
+    op.create_index("ix_submissions_receipt_hash", "submissions", ["receipt_hash"])
+
+def downgrade():
+    op.drop_table("submissions")
+    op.drop_table("admins")
+    sa.Enum(name="adminrole").drop(op.get_bind(), checkfirst=True)
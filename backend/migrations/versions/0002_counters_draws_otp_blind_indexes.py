@@ -0,0 +1,71 @@
+"""Listing/draw indexes, blind indexes, dashboard counters, draws and OTP codes
+
+Revision ID: 0002_counters_draws_otp
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_counters_draws_otp"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("submissions", sa.Column("email_bidx", sa.String(64), nullable=True))
+    op.add_column("submissions", sa.Column("mobile_bidx", sa.String(64), nullable=True))
+    op.create_index("ix_submissions_submitted_at_id", "submissions", ["submitted_at", "id"])
+    op.create_index("ix_submissions_emirate_submitted_at_id", "submissions", ["emirate", "submitted_at", "id"])
+    op.create_index("ix_submissions_emirate_id", "submissions", ["emirate", "id"])
+    for column in ("email_bidx", "mobile_bidx"):
+        op.create_index(
+            f"uq_submissions_{column}", "submissions", [column], unique=True,
+            postgresql_where=sa.text(f"{column} IS NOT NULL"), sqlite_where=sa.text(f"{column} IS NOT NULL"),
+        )
+
+    op.create_table(
+        "emirate_submission_counts",
+        sa.Column("emirate", sa.String(), primary_key=True),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+    )
+    # Seed the counters from existing rows (same as app.commands.reconcile_stats)
+    op.execute(
+        "INSERT INTO emirate_submission_counts (emirate, count) "
+        "SELECT emirate, COUNT(*) FROM submissions GROUP BY emirate"
+    )
+
+    op.create_table(
+        "winner_draws",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("seed", sa.String(), nullable=False),
+        sa.Column("winners_per_stratum", sa.Integer(), nullable=False),
+        sa.Column("per_emirate", sa.Boolean(), nullable=False),
+        sa.Column("emirate", sa.String(), nullable=True),
+        sa.Column("id_min", sa.Integer(), nullable=False),
+        sa.Column("id_max", sa.Integer(), nullable=False),
+        sa.Column("winner_ids", sa.JSON(), nullable=False),
+        sa.Column("drawn_by", sa.String(), nullable=True),
+        sa.Column("drawn_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index("ix_winner_draws_id", "winner_draws", ["id"])
+
+    op.create_table(
+        "otp_codes",
+        sa.Column("email", sa.String(), primary_key=True),
+        sa.Column("code_hash", sa.String(64), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_otp_codes_expires_at", "otp_codes", ["expires_at"])
+
+def downgrade():
+    op.drop_table("otp_codes")
+    op.drop_table("winner_draws")
+    op.drop_table("emirate_submission_counts")
+    for name in (
+        "uq_submissions_mobile_bidx", "uq_submissions_email_bidx", "ix_submissions_emirate_id",
+        "ix_submissions_emirate_submitted_at_id", "ix_submissions_submitted_at_id",
+    ):
+        op.drop_index(name, table_name="submissions")
+    op.drop_column("submissions", "mobile_bidx")
+    op.drop_column("submissions", "email_bidx")
@@ -0,0 +1,33 @@
+"""Receipt perceptual hashes and near-duplicate pairs
+
+Revision ID: 0003_receipt_fingerprints
+Revises: 0002_counters_draws_otp
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_receipt_fingerprints"
+down_revision = "0002_counters_draws_otp"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "receipt_fingerprints",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("receipt_hash", sa.String(64), nullable=False, unique=True),
+        sa.Column("phash", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_table(
+        "receipt_matches",
+        sa.Column("fingerprint_id", sa.Integer(), sa.ForeignKey("receipt_fingerprints.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("match_id", sa.Integer(), sa.ForeignKey("receipt_fingerprints.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("distance", sa.SmallInteger(), nullable=False),
+    )
+    # Existing receipts are fingerprinted by app.commands.backfill_derivatives
+
+def downgrade():
+    op.drop_table("receipt_matches")
+    op.drop_table("receipt_fingerprints")
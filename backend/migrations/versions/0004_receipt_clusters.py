@@ -0,0 +1,38 @@
+"""Near-duplicate cluster ids on receipt fingerprints
+
+Revision ID: 0004_receipt_clusters
+Revises: 0003_receipt_fingerprints
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_receipt_clusters"
+down_revision = "0003_receipt_fingerprints"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("receipt_fingerprints", sa.Column("cluster_id", sa.Integer(), nullable=True))
+    op.create_index("ix_receipt_fingerprints_cluster_id", "receipt_fingerprints", ["cluster_id"])
+
+    # Label the clusters formed by pairs recorded so far (connected
+    # components; a cluster's id is its lowest fingerprint id)
+    bind = op.get_bind()
+    parent = {}
+    def root(node):
+        while parent.setdefault(node, node) != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+    for a, b in bind.execute(sa.text("SELECT fingerprint_id, match_id FROM receipt_matches")):
+        ra, rb = root(a), root(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    updates = [{"id": node, "cluster_id": root(node)} for node in list(parent)]
+    if updates:
+        bind.execute(sa.text("UPDATE receipt_fingerprints SET cluster_id = :cluster_id WHERE id = :id"), updates)
+
+def downgrade():
+    op.drop_index("ix_receipt_fingerprints_cluster_id", table_name="receipt_fingerprints")
+    op.drop_column("receipt_fingerprints", "cluster_id")
@@ -0,0 +1,22 @@
+"""Store existing SQLite submission timestamps in SQLAlchemy's format
+
+Revision ID: 0005_sqlite_submitted_at
+Revises: 0004_receipt_clusters
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0005_sqlite_submitted_at"
+down_revision = "0004_receipt_clusters"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Rows stamped by SQLite's CURRENT_TIMESTAMP lack the fraction that
+    # bound datetimes carry ("...:34" vs "...:34.000000"), so the two sort
+    # wrongly as text. Postgres stores real timestamps; nothing to do there.
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("UPDATE submissions SET submitted_at = submitted_at || '.000000' WHERE length(submitted_at) = 19")
+
+def downgrade():
+    pass
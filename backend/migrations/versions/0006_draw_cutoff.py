@@ -0,0 +1,23 @@
+"""Draw cutoff and eligible-set size
+
+Revision ID: 0006_draw_cutoff
+Revises: 0005_sqlite_submitted_at
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_draw_cutoff"
+down_revision = "0005_sqlite_submitted_at"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("winner_draws", sa.Column("cutoff", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("winner_draws", sa.Column("eligible_count", sa.Integer(), nullable=True))
+    op.add_column("winner_draws", sa.Column("eligible_id_sum", sa.BigInteger(), nullable=True))
+
+def downgrade():
+    op.drop_column("winner_draws", "eligible_id_sum")
+    op.drop_column("winner_draws", "eligible_count")
+    op.drop_column("winner_draws", "cutoff")
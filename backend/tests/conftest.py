@@ -0,0 +1,55 @@
+import os, shutil, sys, tempfile
+
+# Importable as `app` whether pytest runs from backend/ or the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The app reads its settings at import time; point it at a throwaway SQLite
+# database before any test imports it.
+_db_dir = tempfile.mkdtemp(prefix="campaign-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_db_dir, 'test.db')}")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("UPLOAD_DIRECTORY", os.path.join(_db_dir, "uploads"))
+
+import pytest
+
+@pytest.fixture
+def db():
+    from app.db.base import Base
+    from app.db.session import engine, SessionLocal
+    from app.db.models import admin, submission, stats, draw, otp, receipt_fingerprint  # noqa: F401 (registers tables)
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def uploads():
+    """An empty receipt store; waits for queued thumbnail renders afterwards."""
+    from app.services import receipt_storage, receipt_derivatives, receipt_similarity
+
+    shutil.rmtree(receipt_storage.UPLOAD_DIRECTORY, ignore_errors=True)
+    # The similarity index outlives the tables the db fixture drops
+    receipt_similarity._index, receipt_similarity._loaded_through = None, 0
+    receipt_similarity._gaps.clear()
+    yield receipt_storage.UPLOAD_DIRECTORY
+    receipt_derivatives.shutdown_pool(wait=True)
+
+@pytest.fixture
+def client(db, uploads):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    return TestClient(app)
+
+@pytest.fixture
+def admin_headers(db):
+    """Authorization header of the global admin."""
+    from app.core.config import settings
+    from app.core.security import create_access_token
+    from app.services import admin_service
+
+    admin_service.create_global_admin_if_not_exists(db)
+    return {"Authorization": "Bearer " + create_access_token({"sub": settings.GLOBAL_ADMIN_EMAIL})}
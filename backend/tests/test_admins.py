@@ -0,0 +1,22 @@
+from app.core.security import create_access_token
+
+def test_deactivated_admin_is_rejected_at_once_despite_the_auth_cache(client, admin_headers):
+    from app.services import admin_service
+
+    created = client.post("/api/v1/admins/", headers=admin_headers, json={"email": "staff@example.com"})
+    assert created.status_code == 201
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'staff@example.com'})}"}
+
+    # Two requests, so the second is served from this worker's cache
+    hits = admin_service.admin_cache_stats()["hits"]
+    for _ in range(2):
+        assert client.get("/api/v1/submissions/", headers=headers).status_code == 200
+    assert admin_service.admin_cache_stats()["hits"] > hits
+
+    response = client.post(f"/api/v1/admins/{created.json()['id']}/deactivate", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+
+    # Well within ADMIN_CACHE_TTL_SECONDS
+    response = client.get("/api/v1/submissions/", headers=headers)
+    assert response.status_code == 401
@@ -0,0 +1,89 @@
+import warnings
+import pytest
+from sqlalchemy import String, select
+from sqlalchemy.dialects import sqlite
+from app.services import encryption
+from app.services.encryption import EncryptedString, Keyring
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    from sqlalchemy_utils import EncryptedType
+
+LEGACY_SECRET = "legacy-secret"
+# Around the block size, empty and non-ASCII
+VALUES = ["", "a", "x" * 15, "x" * 16, "x" * 17, "Fatima Al Mansoori", "فاطمة المنصوري", "user@example.com", "784-1990-1234567-1"]
+
+_dialect = sqlite.dialect()
+
+def _legacy_type():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return EncryptedType(String, LEGACY_SECRET)
+
+@pytest.fixture
+def keyring(monkeypatch):
+    """Key 0 (the legacy secret) active, as before any rotation."""
+    ring = Keyring({0: LEGACY_SECRET}, 0)
+    monkeypatch.setattr(encryption, "get_keyring", lambda: ring)
+    return ring
+
+@pytest.fixture
+def rotated(monkeypatch):
+    """Key 2 active; values without a prefix still belong to key 0."""
+    ring = Keyring({0: LEGACY_SECRET, 2: "second-secret"}, 2)
+    monkeypatch.setattr(encryption, "get_keyring", lambda: ring)
+    return ring
+
+def test_reads_values_written_by_encrypted_type(keyring):
+    legacy = _legacy_type()
+    ciphertexts = [legacy.process_bind_param(value, _dialect) for value in VALUES]
+
+    assert [EncryptedString().process_result_value(c, _dialect) for c in ciphertexts] == VALUES
+    assert keyring.decrypt_many(ciphertexts) == VALUES
+
+def test_writes_values_encrypted_type_can_read(keyring):
+    legacy = _legacy_type()
+    for value in VALUES:
+        ciphertext = EncryptedString().process_bind_param(value, _dialect)
+        # Byte for byte the same, so a rollback to EncryptedType columns still reads them
+        assert ciphertext == legacy.process_bind_param(value, _dialect)
+        assert legacy.process_result_value(ciphertext, _dialect) == value
+
+def test_decrypt_many_matches_decrypt(rotated):
+    legacy = _legacy_type()
+    ciphertexts = [legacy.process_bind_param(value, _dialect) for value in VALUES]
+    ciphertexts += [rotated.encrypt(value) for value in VALUES] + [None]
+    assert rotated.decrypt_many(ciphertexts) == [None if c is None else rotated.decrypt(c) for c in ciphertexts]
+    assert rotated.decrypt_many(ciphertexts) == VALUES + VALUES + [None]
+
+def test_versioned_keys(rotated):
+    ciphertext = rotated.encrypt("user@example.com")
+    assert ciphertext.startswith(b"v2$")
+    assert Keyring.key_id(ciphertext) == 2
+    assert Keyring.key_id(_legacy_type().process_bind_param("user@example.com", _dialect)) == 0
+    # The part after the prefix is plain EncryptedType output under key 2's secret
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        second = EncryptedType(String, "second-secret")
+    assert second.process_result_value(ciphertext[len(b"v2$"):], _dialect) == "user@example.com"
+
+    with pytest.raises(KeyError):
+        Keyring({0: LEGACY_SECRET}, 0).decrypt(ciphertext)
+
+def test_rows_written_by_encrypted_type_load_through_the_model(db, rotated):
+    from app.db.models.submission import Submission, ENCRYPTED_FIELDS
+
+    legacy = _legacy_type()
+    plain = {"name": "Fatima Al Mansoori", "email": "fatima@example.com", "mobile": "0501234567", "emirates_id": "784-1990-1234567-1"}
+    old = Submission(emirate="Dubai", receipt_url="/uploads/a.jpg")
+    for name, value in plain.items():
+        setattr(old, f"_{name}", legacy.process_bind_param(value, _dialect))
+    new = Submission(emirate="Dubai", receipt_url="/uploads/b.jpg", **{name: value.upper() for name, value in plain.items()})
+    db.add_all([old, new])
+    db.commit()
+    db.expunge_all()
+
+    rows = db.query(Submission).order_by(Submission.id).all()
+    encryption.bulk_decrypt(rows, ENCRYPTED_FIELDS)
+    assert [{name: getattr(row, name) for name in ENCRYPTED_FIELDS} for row in rows] == [plain, {name: value.upper() for name, value in plain.items()}]
+    assert list(db.scalars(select(Submission.email).order_by(Submission.id))) == ["fatima@example.com", "FATIMA@EXAMPLE.COM"]
@@ -0,0 +1,77 @@
+import io, os, zipfile
+import pytest
+from app.core.config import settings
+
+HEADER = "name,email,mobile,emirates_id,emirate,receipt\n"
+
+def _row(n: int, email: str = None, mobile: str = None, receipt: str = None) -> str:
+    return f"User {n},{email or f'user{n}@example.com'},{mobile or f'05000000{n:02d}'},784-1990-1234567-1,Dubai,{receipt or f'r{n}.jpg'}\n"
+
+def _archive(names) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name in names:
+            archive.writestr(name, f"receipt {name}".encode())
+    return buffer.getvalue()
+
+def _ingest(client, headers, csv_text: str, archive: bytes):
+    return client.post(
+        "/api/v1/submissions/ingest",
+        headers=headers,
+        files={
+            "entries": ("entries.csv", io.BytesIO(csv_text.encode()), "text/csv"),
+            "receipts": ("receipts.zip", io.BytesIO(archive), "application/zip"),
+        },
+    )
+
+def _stored_files(directory: str) -> set:
+    return {os.path.relpath(os.path.join(root, name), directory) for root, _, names in os.walk(directory) for name in names}
+
+@pytest.fixture
+def unique_entries(monkeypatch):
+    monkeypatch.setattr(settings, "ENFORCE_UNIQUE_EMAIL", True)
+    monkeypatch.setattr(settings, "ENFORCE_UNIQUE_MOBILE", True)
+
+def test_ingest_loads_rows_and_reports_the_rest(client, admin_headers, uploads, unique_entries):
+    from app.services.receipt_derivatives import shutdown_pool
+
+    first = _ingest(client, admin_headers, HEADER + _row(1), _archive(["r1.jpg"]))
+    assert first.json()["inserted"] == 1
+    shutdown_pool(wait=True)
+    before = _stored_files(uploads)
+
+    csv_text = HEADER + "".join([
+        _row(2),
+        _row(3, email="user2@example.com"),   # line 3: email earlier in the file
+        _row(4, mobile="0500000001"),         # line 4: mobile already in the table
+        _row(5, receipt="missing.jpg"),       # line 5: not in the archive
+        _row(6),
+    ])
+    response = _ingest(client, admin_headers, csv_text, _archive(["r2.jpg", "r3.jpg", "r4.jpg", "r6.jpg"]))
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["rows"], body["inserted"], body["failed"]) == (5, 2, 3)
+    errors = {error["line"]: error["error"] for error in body["errors"]}
+    assert errors[3] == "A submission with this email already appears earlier in the file."
+    assert errors[4] == "A submission with this mobile number already exists."
+    assert "not in the archive" in errors[5]
+
+    # Only the receipts of the two loaded rows (and their thumbnails) were added
+    shutdown_pool(wait=True)
+    added = {os.path.basename(path) for path in _stored_files(uploads) - before}
+    receipts = {name for name in added if not name.endswith(("_thumb.jpg", "_review.jpg"))}
+    assert len(receipts) == 2
+
+@pytest.mark.parametrize("setting, value, detail", [
+    ("INGEST_HTTP_MAX_ROWS", 1, "CSV has over 1 rows."),
+    ("INGEST_HTTP_MAX_CSV_MB", 0, "CSV is over 0 MB."),
+    ("INGEST_HTTP_MAX_ARCHIVE_MB", 0, "Receipts archive is over 0 MB."),
+])
+def test_ingest_over_the_http_caps_is_refused(client, admin_headers, uploads, monkeypatch, setting, value, detail):
+    monkeypatch.setattr(settings, setting, value)
+    response = _ingest(client, admin_headers, HEADER + _row(1) + _row(2), _archive(["r1.jpg", "r2.jpg"]))
+    assert response.status_code == 413
+    assert response.json()["detail"].startswith(detail)
+    assert "app.commands.ingest" in response.json()["detail"]
+    assert _stored_files(uploads) == set()
+    assert client.get("/api/v1/submissions/", headers=admin_headers).json() == []
@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from app.db.models.submission import Submission
+from app.db.schemas.submission import SubmissionCreate
+from app.services import submission_service
+
+def _create(db, count: int) -> list[int]:
+    ids = []
+    for i in range(count):
+        entry = SubmissionCreate(name=f"User {i}", email=f"user{i}@example.com", mobile=f"05000000{i:02d}", emirates_id="784", emirate="Dubai")
+        ids.append(submission_service.create_submission(db, entry, f"/uploads/{i}.jpg", f"{i:064x}").id)
+    return ids
+
+def _walk(db, limit: int, **filters) -> list[int]:
+    seen, cursor = [], None
+    while True:
+        rows, cursor = submission_service.get_submissions_page(db, limit=limit, cursor=cursor, **filters)
+        seen.extend(row["id"] for row in rows)
+        if cursor is None:
+            return seen
+
+def test_pages_cover_rows_created_within_the_same_second(db):
+    ids = _create(db, 7)
+    assert _walk(db, limit=2) == ids
+
+def test_pages_cover_rows_sharing_a_timestamp(db):
+    ids = _create(db, 7)
+    shared = datetime(2026, 10, 18, 7, 44, 34, tzinfo=timezone.utc)
+    db.query(Submission).update({Submission.submitted_at: shared})
+    db.commit()
+    # Ties are broken by id, so every page starts exactly after the last row
+    for limit in (1, 2, 3, 7, 10):
+        assert _walk(db, limit=limit) == ids
+    assert _walk(db, limit=3, emirate="Dubai") == ids
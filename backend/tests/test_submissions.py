@@ -0,0 +1,54 @@
+import io, os
+import pytest
+from PIL import Image
+from app.core.config import settings
+
+def _jpeg(shade: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (300, 400), (shade, 40, 90)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+def _post(client, email: str, mobile: str, receipt: bytes):
+    return client.post(
+        "/api/v1/submissions/",
+        data=dict(name="Test User", email=email, mobile=mobile, emirates_id="784-1990-1234567-1", emirate="Dubai"),
+        files={"receipt": ("receipt.jpg", io.BytesIO(receipt), "image/jpeg")},
+    )
+
+def _stored_files(directory: str) -> set:
+    return {os.path.relpath(os.path.join(root, name), directory) for root, _, names in os.walk(directory) for name in names}
+
+@pytest.fixture
+def unique_entries(monkeypatch):
+    monkeypatch.setattr(settings, "ENFORCE_UNIQUE_EMAIL", True)
+    monkeypatch.setattr(settings, "ENFORCE_UNIQUE_MOBILE", True)
+
+def test_duplicate_email_or_mobile_is_rejected_without_storing_its_receipt(client, uploads, unique_entries):
+    from app.services.receipt_derivatives import shutdown_pool
+
+    assert _post(client, "first@example.com", "0501111111", _jpeg(10)).status_code == 201
+    shutdown_pool(wait=True)  # let its thumbnails land
+    before = _stored_files(uploads)
+    assert any(name.endswith("_thumb.jpg") for name in before)
+
+    cases = [
+        ("first@example.com", "0502222222", "email"),
+        ("other@example.com", "0501111111", "mobile number"),
+    ]
+    for shade, (email, mobile, field) in enumerate(cases, start=1):
+        for _ in range(2):
+            response = _post(client, email, mobile, _jpeg(10 + 60 * shade))
+            assert response.status_code == 400
+            assert response.json()["detail"] == f"A submission with this {field} already exists."
+
+    shutdown_pool(wait=True)
+    assert _stored_files(uploads) == before
+
+def test_rejected_duplicates_leave_no_fingerprint(client, uploads, unique_entries, admin_headers):
+    from app.services.receipt_derivatives import shutdown_pool
+
+    assert _post(client, "first@example.com", "0501111111", _jpeg(10)).status_code == 201
+    # Near-identical receipt, so a stored fingerprint would form a cluster
+    assert _post(client, "first@example.com", "0503333333", _jpeg(12)).status_code == 400
+    shutdown_pool(wait=True)
+    assert client.get("/api/v1/submissions/duplicates", headers=admin_headers).json() == []
@@ -0,0 +1,42 @@
+import random
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from app.db.models.submission import Submission
+from app.services import winner_selection
+
+def _add(db, count: int, submitted_at: datetime, emirate: str = "Dubai") -> list[int]:
+    rows = [
+        Submission(name=f"User {i}", email=f"user{i}@example.com", mobile="0500000000", emirates_id="784",
+                   emirate=emirate, receipt_url=f"/uploads/{i}.jpg", submitted_at=submitted_at)
+        for i in range(count)
+    ]
+    db.add_all(rows)
+    db.commit()
+    return [row.id for row in rows]
+
+def test_rank_sample_matches_offset_lookups(db):
+    ids = _add(db, 40, datetime(2026, 10, 1, tzinfo=timezone.utc))
+    # Thin the stratum out so ranks and ids differ
+    db.query(Submission).filter(Submission.id.in_(ids[::3])).delete(synchronize_session=False)
+    db.commit()
+    remaining = list(db.scalars(select(Submission.id).order_by(Submission.id)))
+
+    chosen = winner_selection._rank_sample(db, random.Random("seed"), 5, ids[0], ids[-1], None)
+    ranks = random.Random("seed").sample(range(len(remaining)), 5)
+    assert chosen == [remaining[rank] for rank in ranks]
+
+def test_draw_ignores_rows_after_the_cutoff_and_replays(db):
+    old = _add(db, 20, datetime.now(timezone.utc) - timedelta(hours=1))
+    draw = winner_selection.draw_winners(db, k=3, seed="fixed")
+    assert set(draw.winner_ids) <= set(old)
+    assert (draw.eligible_count, draw.eligible_id_sum) == (len(old), sum(old))
+
+    # Submitted before the cutoff but committed after the draw, inside its id range
+    db.query(Submission).filter(Submission.id == old[-1]).update({Submission.submitted_at: datetime.now(timezone.utc)})
+    db.commit()
+    assert winner_selection.eligible_unchanged(db, draw) is False
+
+    db.query(Submission).filter(Submission.id == old[-1]).update({Submission.submitted_at: datetime.now(timezone.utc) - timedelta(hours=1)})
+    _add(db, 5, datetime.now(timezone.utc))
+    assert winner_selection.replay_draw(db, draw) == draw.winner_ids
+    assert winner_selection.eligible_unchanged(db, draw) is True
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Box, Typography, Grid, Paper, CircularProgress, Alert } from '@mui/material';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
-import { getDashboardStats } from '../../services/api';
+import { getDashboardStats, openDashboardStream } from '../../services/api';
 
 const DashboardPage = ({ token }) => {
     const [stats, setStats] = useState(null);
@@ -29,6 +29,23 @@ const DashboardPage = ({ token }) => {
         fetchStats();
     }, [token]);
 
+    // Live updates pushed by the server instead of polling
+    useEffect(() => {
+        const storedToken = token || localStorage.getItem("adminToken");
+        if (!storedToken) return undefined;
+        const source = openDashboardStream(storedToken, {
+            onStats: (data) => {
+                // Keep the placeholder data until there are real submissions
+                if (data.total_submissions > 0) setStats(data);
+            },
+            onDelta: (delta) => setStats({
+                total_submissions: delta.total_submissions,
+                submissions_by_emirate: delta.submissions_by_emirate,
+            }),
+        });
+        return () => source.close();
+    }, [token]);
+
     const chartData = stats?.submissions_by_emirate
         ? Object.entries(stats.submissions_by_emirate).map(([name, value]) => ({
             name,
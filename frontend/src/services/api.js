@@ -51,6 +51,64 @@ export const getDashboardStats = async (token) => {
     return data;
 };
 
+/**
+ * Issues a short-lived token for URLs that cannot send the Authorization header.
+ * @param {string} token - Admin access token.
+ * @param {string} scope - 'dashboard_stream' or 'uploads'.
+ * @returns {Promise<{token: string, scope: string, expires_in: number}>}
+ */
+export const createLinkToken = (token, scope) => {
+    return apiFetch(`/auth/link-token?scope=${encodeURIComponent(scope)}`, {
+        method: 'POST',
+        headers: { 'Authorization': `Bearer ${token}` },
+    });
+};
+
+/**
+ * Subscribes to the live dashboard feed (Server-Sent Events).
+ * EventSource cannot set headers, so each connection uses a fresh short-lived
+ * stream token in the URL instead of the access token; when the stream ends
+ * or fails, it reconnects with a new one.
+ * @param {string} token - Admin access token.
+ * @param {object} handlers - onStats(stats) for full snapshots, onDelta(delta) for new submissions.
+ * @returns {{close: Function}} - Call .close() to unsubscribe.
+ */
+export const openDashboardStream = (token, { onStats, onDelta }) => {
+    let source = null;
+    let retryTimer = null;
+    let closed = false;
+
+    const retry = () => {
+        if (!closed) retryTimer = setTimeout(connect, 3000);
+    };
+    const connect = async () => {
+        try {
+            const { token: streamToken } = await createLinkToken(token, 'dashboard_stream');
+            if (closed) return;
+            source = new EventSource(`${API_BASE_URL}/dashboard/stream?token=${encodeURIComponent(streamToken)}`);
+            source.addEventListener('stats', (event) => onStats(JSON.parse(event.data)));
+            source.addEventListener('delta', (event) => onDelta(JSON.parse(event.data)));
+            // The stream token has expired by the time the browser would
+            // reconnect on its own, so reconnect with a new one instead
+            source.onerror = () => {
+                source.close();
+                retry();
+            };
+        } catch {
+            retry();
+        }
+    };
+
+    connect();
+    return {
+        close: () => {
+            closed = true;
+            clearTimeout(retryTimer);
+            if (source) source.close();
+        },
+    };
+};
+
 // --- Submissions ---
 export const getSubmissions = async (token, page, limit) => {
     const data = await apiFetch(`/submissions?skip=${page * limit}&limit=${limit}`, {